@@ -1,26 +1,56 @@
+# %% [markdown]
+# # 第一天：量化交易基础概念与环境准备
+#
+# 在这个Notebook中，我们将学习如何使用Python获取股票数据，这是量化交易的第一步。
+#
+# ## 学习目标
+# - 了解如何使用yfinance库获取股票历史数据
+# - 使用pandas处理股票数据
+# - 使用matplotlib可视化股票价格走势
+
+# %%
+# 导入所需的库
 import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
+from data_cache import OHLCVCache
+
+# %% [markdown]
+# ## 1. 获取股票数据
+#
+# 首先，我们定义一个函数，用于获取指定股票的历史数据。
 
-def get_stock_data(symbol='AAPL', days=10):
+# %%
+def get_stock_data(symbol='AAPL', days=10, cache=None):
     """
     获取指定股票的历史数据
     
     参数:
         symbol (str): 股票代码
         days (int): 获取最近多少天的数据
+        cache (OHLCVCache): 本地数据缓存，为None时直接从yfinance下载
     """
     # 计算起始日期
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
+    # 优先从本地缓存读取，只下载缺少的部分
+    if cache is not None:
+        return cache.get(symbol, start=start_date)
+    
     # 获取股票数据
     stock = yf.Ticker(symbol)
     hist = stock.history(start=start_date, end=end_date)
     
     return hist
 
+# %% [markdown]
+# ## 2. 可视化股票价格
+#
+# 接下来，我们定义一个函数，用于绘制股票收盘价走势图。
+
+# %%
 def plot_stock_price(data):
     """
     绘制股票收盘价走势图
@@ -39,13 +69,32 @@ def plot_stock_price(data):
     plt.tight_layout()
     plt.show()
 
+# %% [markdown]
+# ## 3. 获取并分析股票数据
+#
+# 现在，让我们使用上面定义的函数来获取苹果公司最近10天的股票数据，并进行可视化。
+
 if __name__ == "__main__":
+    # %%
     # 获取苹果公司最近10天的股票数据
-    stock_data = get_stock_data('AAPL', 10)
+    cache = OHLCVCache('data_cache')
+    stock_data = get_stock_data('AAPL', 10, cache=cache)
     
     # 打印数据
     print("\n最近的股票数据:")
     print(stock_data.tail())
+    print(f"\n缓存统计: {cache.stats}")
     
+    # %%
     # 绘制走势图
-    plot_stock_price(stock_data) 
\ No newline at end of file
+    plot_stock_price(stock_data)
+
+# %% [markdown]
+# ## 小结
+#
+# 在这个Notebook中，我们学习了：
+# 1. 如何使用yfinance库获取股票历史数据
+# 2. 如何处理和查看数据
+# 3. 如何绘制股票价格走势图
+#
+# 这是量化交易的第一步，接下来我们将深入学习更多数据分析和处理技术。
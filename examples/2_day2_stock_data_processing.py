@@ -1,34 +1,106 @@
+# %% [markdown]
+# # 第二天：股票数据基础与Python处理
+#
+# 在这个Notebook中，我们将深入学习股票市场数据的基本结构与来源，以及使用Python处理历史行情数据的方法。
+#
+# ## 学习目标
+# - 了解股票数据的基本构成（日期、开盘价、收盘价、最高价、最低价、成交量等）
+# - 获取和分析股票历史数据
+# - 使用pandas处理时间序列数据
+# - 对股票数据进行基本统计分析和可视化
+
+# %%
+# 导入所需的库
 import yfinance as yf
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from datetime import datetime, timedelta
+from data_cache import OHLCVCache
+from trading_calendar import nyse_calendar
+from validation import validate_frame
+from candlestick import date_to_num, plot_candlestick
+from downsample import bucket_max, downsample_line, kde_counts, pixel_width
+from indicators import IndicatorEngine
+from backtest import crossover_positions, run_backtest
+from analysis import StockAnalysis
+from risk import drawdown, historical_var, parametric_var
+from instrumentation import count_artists, enable_from_env, finish, span, traced, untimed
+
+# 指标计算引擎：同一份数据重复计算时直接返回缓存，追加新K线时只增量计算新的部分
+indicator_engine = IndicatorEngine()
 
-def get_stock_data(symbol='AAPL', period='3y'):
+# %% [markdown]
+# ## 1. 获取股票数据
+#
+# 首先，我们定义一个函数，用于获取指定股票的历史数据。
+
+# %%
+@traced
+def get_stock_data(symbol='AAPL', period='3y', cache=None, interval='1d'):
     """
     获取指定股票的历史数据
     
     参数:
         symbol (str): 股票代码
         period (str): 获取数据的时间跨度，例如 '1d', '5d', '1mo', '3mo', '1y', '2y', '5y', '10y', 'ytd', 'max'
+        cache (OHLCVCache): 本地数据缓存，为None时直接从yfinance下载
+        interval (str): K线周期，例如 '1d'、'1h'、'5m'、'1m'（yfinance 的日内数据只能获取最近一段时间）；
+                        需要其他周期时可以用 ticks.resample_bars 从更小的周期合成
     
     返回:
         pd.DataFrame: 包含股票历史数据的DataFrame
     """
+    # 优先从本地缓存读取，只下载缺少的部分
+    if cache is not None:
+        return cache.get(symbol, period=period, interval=interval)
+    
     # 获取股票数据
     stock = yf.Ticker(symbol)
-    hist = stock.history(period=period)
+    hist = stock.history(period=period, interval=interval)
     
     return hist
 
-def basic_data_analysis(data):
+if __name__ == "__main__":
+    # %%
+    # 设置环境变量 STOCK_TRACE=day2_trace.json 运行时，记录每个阶段的耗时和计数（获取的行数和字节数、
+    # 缓存命中、绘制的图形元素等），结束时打印汇总表并写出 Chrome trace；未设置时几乎没有额外开销
+    enable_from_env()
+    
+    # 设置要分析的股票代码
+    stock_symbol = 'AAPL'
+    
+    # 1. 获取过去3年的股票数据
+    print(f"正在获取 {stock_symbol} 过去3年的历史数据...")
+    cache = OHLCVCache('data_cache')
+    stock_data = get_stock_data(stock_symbol, '3y', cache=cache)
+    print(f"缓存统计: {cache.stats}")
+    
+    # 检查数据质量：缺失的交易日、成交量为0、最高价低于最低价、异常收益、长期不变的价格等
+    quality = validate_frame(stock_data, stock_symbol, calendar=nyse_calendar())
+    print(quality)
+
+# %% [markdown]
+# ## 2. 基本数据分析
+#
+# 接下来，我们对获取的股票数据进行基本分析，了解数据的基本特征和统计信息。
+
+# %%
+@traced
+def basic_data_analysis(data, analysis=None):
     """
     对股票数据进行基本分析
     
     参数:
-        data (pd.DataFrame): 股票历史数据
+        data (pd.DataFrame): 股票历史数据，不会被修改
+        analysis (StockAnalysis): 已有的分析结果，为None时新建
+    
+    返回:
+        StockAnalysis: 分析结果，日收益率等派生列从这里获取
     """
+    if analysis is None:
+        analysis = StockAnalysis(data)
+    
     # 打印数据基本信息
     print("\n=== 数据基本信息 ===")
     print(f"数据起始日期: {data.index.min().strftime('%Y-%m-%d')}")
@@ -40,92 +112,156 @@ def basic_data_analysis(data):
     print("\n=== 数据前5行 ===")
     print(data.head())
     
-    # 计算基本统计值
+    # 计算基本统计值（StockAnalysis 用 RunningStats 统计，新数据到来时可以增量更新）
+    close_stats = analysis.close_stats
     print("\n=== 收盘价基本统计值 ===")
-    print(f"均值: {data['Close'].mean():.2f}")
-    print(f"标准差: {data['Close'].std():.2f}")
-    print(f"最小值: {data['Close'].min():.2f}")
-    print(f"最大值: {data['Close'].max():.2f}")
-    print(f"中位数: {data['Close'].median():.2f}")
-    
-    # 计算每日收益率
-    data['Daily_Return'] = data['Close'].pct_change() * 100
-    
+    print(f"均值: {close_stats.mean:.2f}")
+    print(f"标准差: {close_stats.std:.2f}")
+    print(f"最小值: {close_stats.min:.2f}")
+    print(f"最大值: {close_stats.max:.2f}")
+    print(f"中位数: {close_stats.median:.2f}")
+    
+    # 计算每日收益率（结果保存在 analysis 中，不往 data 里添加列）
+    return_stats = analysis.return_stats
     print("\n=== 日收益率基本统计值 ===")
-    print(f"均值: {data['Daily_Return'].mean():.2f}%")
-    print(f"标准差: {data['Daily_Return'].std():.2f}%")
-    print(f"最小值: {data['Daily_Return'].min():.2f}%")
-    print(f"最大值: {data['Daily_Return'].max():.2f}%")
-    
-    return data
+    print(f"均值: {return_stats.mean:.2f}%")
+    print(f"标准差: {return_stats.std:.2f}%")
+    print(f"最小值: {return_stats.min:.2f}%")
+    print(f"最大值: {return_stats.max:.2f}%")
+    
+    # 风险指标：单日损失的 95% VaR/CVaR（历史模拟和正态假设两种方法）和最大回撤
+    daily_return = analysis.values('Daily_Return') / 100
+    hist_var, hist_cvar = historical_var(daily_return, alpha=0.05)
+    normal_var, normal_cvar = parametric_var(daily_return, alpha=0.05)
+    _, max_drawdown = drawdown(daily_return)
+    print("\n=== 风险指标 ===")
+    print(f"历史VaR(95%): {hist_var * 100:.2f}%，CVaR: {hist_cvar * 100:.2f}%")
+    print(f"正态VaR(95%): {normal_var * 100:.2f}%，CVaR: {normal_cvar * 100:.2f}%")
+    print(f"最大回撤: {max_drawdown[-1] * 100:.2f}%")
+    
+    return analysis
+
+if __name__ == "__main__":
+    # %%
+    # 2. 进行基本数据分析（派生列保存在 analysis 中，stock_data 保持不变）
+    print(f"\n对 {stock_symbol} 进行基本数据分析...")
+    analysis = StockAnalysis(stock_data, stock_symbol, engine=indicator_engine)
+    basic_data_analysis(stock_data, analysis)
 
-def visualize_stock_data(data, symbol):
+# %% [markdown]
+# ## 3. 数据可视化
+#
+# 数据可视化是理解数据模式的重要工具。接下来，我们将通过多种图表来可视化股票数据。
+
+# %%
+@traced
+def visualize_stock_data(data, symbol, analysis=None):
     """
     可视化股票数据
     
     参数:
         data (pd.DataFrame): 股票历史数据
         symbol (str): 股票代码
+        analysis (StockAnalysis): basic_data_analysis 返回的分析结果，为None时新建
     """
+    if analysis is None:
+        analysis = StockAnalysis(data)
+    
     # 设置绘图风格
     sns.set_style("whitegrid")
     
     # 创建一个2x2的子图布局
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     
+    # 折线和成交量柱子降采样到坐标轴的像素宽度（保留每个像素内的最高点和最低点），
+    # 20年日线或分钟数据也只绘制几千个点
+    x = date_to_num(data.index)
+    
     # 1. 股票收盘价走势图
-    axes[0, 0].plot(data.index, data['Close'], color='blue')
+    axes[0, 0].plot(*downsample_line(x, analysis.close, pixel_width(axes[0, 0])), color='blue')
+    axes[0, 0].xaxis_date()
     axes[0, 0].set_title(f'{symbol} 收盘价走势')
     axes[0, 0].set_ylabel('价格')
     axes[0, 0].tick_params(axis='x', rotation=45)
     
-    # 2. 成交量走势图
-    axes[0, 1].bar(data.index, data['Volume'], color='green', alpha=0.7)
+    # 2. 成交量走势图（每根柱子取所在像素内的最大成交量）
+    left, width, volume = bucket_max(x, data['Volume'].to_numpy(dtype=float), pixel_width(axes[0, 1]))
+    axes[0, 1].bar(left, volume, width=width, align='edge', color='green', alpha=0.7)
+    axes[0, 1].xaxis_date()
     axes[0, 1].set_title(f'{symbol} 成交量走势')
     axes[0, 1].set_ylabel('成交量')
     axes[0, 1].tick_params(axis='x', rotation=45)
     
-    # 3. 收盘价的直方图
-    sns.histplot(data['Close'], bins=30, kde=True, ax=axes[1, 0], color='purple')
+    # 3. 收盘价的直方图（密度曲线用分箱+FFT计算，耗时与数据长度基本无关）
+    sns.histplot(data['Close'], bins=30, ax=axes[1, 0], color='purple')
+    axes[1, 0].plot(*kde_counts(analysis.close, bins=30), color='purple')
     axes[1, 0].set_title(f'{symbol} 收盘价分布')
     axes[1, 0].set_xlabel('价格')
     
     # 4. 日收益率的直方图
-    sns.histplot(data['Daily_Return'].dropna(), bins=50, kde=True, ax=axes[1, 1], color='red')
+    daily_return = analysis['Daily_Return'].dropna()
+    sns.histplot(daily_return, bins=50, ax=axes[1, 1], color='red')
+    axes[1, 1].plot(*kde_counts(daily_return, bins=50), color='red')
     axes[1, 1].set_title(f'{symbol} 日收益率分布')
     axes[1, 1].set_xlabel('日收益率 (%)')
     
     plt.tight_layout()
-    plt.show()
+    # 只计时绘制；plt.show() 在交互式后端会一直阻塞到窗口关闭，这段时间不计入任何区间
+    with span('pyplot.draw'):
+        count_artists(plt.gcf())
+        plt.gcf().canvas.draw()
+    with untimed():
+        plt.show()
+
+if __name__ == "__main__":
+    # %%
+    # 3. 数据可视化
+    print(f"\n对 {stock_symbol} 进行数据可视化...")
+    visualize_stock_data(stock_data, stock_symbol, analysis)
+
+# %% [markdown]
+# ## 4. 时间序列分析
+#
+# 时间序列分析是量化交易中的重要工具，可以帮助我们发现价格趋势和模式。
 
-def time_series_analysis(data, symbol):
+# %%
+@traced
+def time_series_analysis(data, symbol, analysis=None):
     """
     对股票数据进行时间序列分析
     
     参数:
-        data (pd.DataFrame): 股票历史数据
+        data (pd.DataFrame): 股票历史数据，不会被修改
         symbol (str): 股票代码
+        analysis (StockAnalysis): 分析结果，为None时新建
+    
+    返回:
+        StockAnalysis: 分析结果，移动平均线从这里获取
     """
+    if analysis is None:
+        analysis = StockAnalysis(data, symbol, engine=indicator_engine)
+    
     # 创建一个图形
     plt.figure(figsize=(14, 10))
     
-    # 1. 计算不同周期的移动平均线
-    data['MA50'] = data['Close'].rolling(window=50).mean()
-    data['MA200'] = data['Close'].rolling(window=200).mean()
-    
-    # 绘制原始收盘价和移动平均线
-    plt.subplot(2, 1, 1)
-    plt.plot(data.index, data['Close'], label='收盘价', alpha=0.5)
-    plt.plot(data.index, data['MA50'], label='50日移动平均线', linewidth=1.5)
-    plt.plot(data.index, data['MA200'], label='200日移动平均线', linewidth=1.5)
+    # 1. 计算不同周期的移动平均线（一次累加同时得到两个窗口，结果按数据版本缓存）
+    ma50 = analysis.values('MA50')
+    ma200 = analysis.values('MA200')
+    
+    # 绘制原始收盘价和移动平均线（降采样到坐标轴的像素宽度）
+    ax = plt.subplot(2, 1, 1)
+    x, pixels = date_to_num(data.index), pixel_width(ax)
+    plt.plot(*downsample_line(x, analysis.close, pixels), label='收盘价', alpha=0.5)
+    plt.plot(*downsample_line(x, ma50, pixels), label='50日移动平均线', linewidth=1.5)
+    plt.plot(*downsample_line(x, ma200, pixels), label='200日移动平均线', linewidth=1.5)
+    ax.xaxis_date()
     plt.title(f'{symbol} 收盘价与移动平均线')
     plt.ylabel('价格')
     plt.legend()
     plt.grid(True)
     
     # 2. 重采样按月计算
-    monthly_data = data['Close'].resample('M').last()
-    monthly_returns = monthly_data.pct_change() * 100
+    monthly_returns = analysis.monthly_returns()
     
     plt.subplot(2, 1, 2)
     monthly_returns.plot(kind='bar', color='blue', alpha=0.7)
@@ -134,20 +270,58 @@ def time_series_analysis(data, symbol):
     plt.grid(True)
     plt.tight_layout()
     
-    plt.show()
+    with span('pyplot.draw'):
+        count_artists(plt.gcf())
+        plt.gcf().canvas.draw()
+    with untimed():
+        plt.show()
+    
+    return analysis
+
+if __name__ == "__main__":
+    # %%
+    # 4. 时间序列分析
+    print(f"\n对 {stock_symbol} 进行时间序列分析...")
+    time_series_analysis(stock_data, stock_symbol, analysis)
+
+# %% [markdown]
+# ## 5. 均线交叉策略回测
+#
+# 用50日和200日移动平均线的交叉作为买卖信号，计入手续费和滑点，看看这个简单策略在历史数据上的表现。
+
+if __name__ == "__main__":
+    # %%
+    # 5. 用MA50/MA200交叉信号回测（计入手续费和滑点）
+    print(f"\n回测 {stock_symbol} 的均线交叉策略...")
+    positions = crossover_positions(analysis.values('MA50'), analysis.values('MA200'))
+    result = run_backtest(stock_data['Close'], positions, cost_bps=5, slippage_bps=5, symbols=[stock_symbol])
+    print(result.summary().T)
+    print(result.trades[['direction', 'entry_time', 'exit_time', 'bars', 'return']])
+
+# %% [markdown]
+# ## 6. 分析特定时间段的数据
+#
+# 为了更深入地了解特定时间段的市场表现，我们可以截取数据的子集进行分析。
 
-def analyze_specific_timeframe(data, symbol, start_date, end_date):
+# %%
+@traced
+def analyze_specific_timeframe(data, symbol, start_date, end_date, cache=None):
     """
     分析特定时间段的股票数据
     
     参数:
-        data (pd.DataFrame): 股票历史数据
+        data (pd.DataFrame): 股票历史数据，提供 cache 时可以为None
         symbol (str): 股票代码
         start_date (str): 开始日期，格式为'YYYY-MM-DD'
         end_date (str): 结束日期，格式为'YYYY-MM-DD'
+        cache (OHLCVCache): 本地数据缓存，提供时直接从磁盘读取该时间段，不需要加载全部历史
     """
     # 截取特定时间段的数据
-    period_data = data.loc[start_date:end_date]
+    if cache is not None:
+        period_data = cache.get(symbol, start=start_date, end=pd.Timestamp(end_date) + pd.Timedelta(days=1))
+    else:
+        # 在交易日历上换算区间边界后二分查找，日内数据也包含结束日期当天的全部K线
+        period_data = nyse_calendar().slice(data, start_date, end_date)
     
     print(f"\n=== {start_date} 至 {end_date} 期间 {symbol} 的表现 ===")
     print(f"期间收盘价变化: {period_data['Close'].iloc[-1] - period_data['Close'].iloc[0]:.2f}")
@@ -157,49 +331,42 @@ def analyze_specific_timeframe(data, symbol, start_date, end_date):
     print(f"期间最低价: {period_data['Low'].min():.2f}")
     
     # 绘制特定时间段的K线图
-    plt.figure(figsize=(12, 6))
-    
-    # 计算调整后的Open, High, Low, Close
-    period_data['Centered'] = (period_data['Open'] + period_data['Close']) / 2
-    period_data['Height'] = abs(period_data['Close'] - period_data['Open'])
+    fig, ax = plt.subplots(figsize=(12, 6))
     
-    # 绘制K线图
-    for idx, row in period_data.iterrows():
-        color = 'green' if row['Close'] >= row['Open'] else 'red'
-        plt.plot([idx, idx], [row['Low'], row['High']], color=color)
-        plt.plot([idx, idx], [row['Open'], row['Close']], color=color, linewidth=4)
+    # 绘制K线图（period_data 是原始数据的切片，不往里面写入新列，避免 pandas 复制整段数据）：所有影线和实体各用一个集合批量绘制，而不是每根K线调用两次plot
+    plot_candlestick(ax, period_data)
     
     plt.title(f'{symbol} 在 {start_date} 至 {end_date} 期间的价格走势')
     plt.ylabel('价格')
     plt.grid(True)
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    with span('pyplot.draw'):
+        count_artists(plt.gcf())
+        plt.gcf().canvas.draw()
+    with untimed():
+        plt.show()
 
 if __name__ == "__main__":
-    # 设置要分析的股票代码
-    stock_symbol = 'AAPL'
-    
-    # 1. 获取过去3年的股票数据
-    print(f"正在获取 {stock_symbol} 过去3年的历史数据...")
-    stock_data = get_stock_data(stock_symbol, '3y')
-    
-    # 2. 进行基本数据分析
-    print(f"\n对 {stock_symbol} 进行基本数据分析...")
-    stock_data = basic_data_analysis(stock_data)
-    
-    # 3. 数据可视化
-    print(f"\n对 {stock_symbol} 进行数据可视化...")
-    visualize_stock_data(stock_data, stock_symbol)
-    
-    # 4. 时间序列分析
-    print(f"\n对 {stock_symbol} 进行时间序列分析...")
-    time_series_analysis(stock_data, stock_symbol)
-    
-    # 5. 分析最近一年的数据
+    # %%
+    # 6. 分析最近一年（252个交易日，不含周末和交易所假日）的数据
     print(f"\n分析 {stock_symbol} 最近一年的数据...")
-    one_year_ago = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-    today = datetime.now().strftime('%Y-%m-%d')
-    analyze_specific_timeframe(stock_data, stock_symbol, one_year_ago, today)
+    first_session, last_session = nyse_calendar().trailing(252)
+    analyze_specific_timeframe(stock_data, stock_symbol, first_session.strftime('%Y-%m-%d'),
+                               last_session.strftime('%Y-%m-%d'))
     
-    print("\n分析完成！现在你已经了解了如何获取和分析股票数据的基本方法。") 
\ No newline at end of file
+    print("\n分析完成！现在你已经了解了如何获取和分析股票数据的基本方法。")
+    finish()
+
+# %% [markdown]
+# ## 小结
+#
+# 在这个Notebook中，我们学习了：
+# 1. 如何获取股票的长期历史数据
+# 2. 如何进行基本数据分析（计算统计值、显示数据特征）
+# 3. 如何通过多种图表可视化股票数据
+# 4. 如何进行时间序列分析（移动平均线、月度重采样）
+# 5. 如何用均线交叉信号回测一个简单策略
+# 6. 如何分析特定时间段的股票表现
+#
+# 这些知识和技能将为我们后续开发交易策略打下坚实的基础。
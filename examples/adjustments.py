@@ -0,0 +1,315 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import PRICE_COLUMNS
+
+ACTIONS_FILE = 'corporate_actions.json'
+ACTION_COLUMNS = ('split', 'dividend', 'prev_close')
+ADJUST_MODES = ('all', 'splits', None)
+
+
+def cumulative_factors(event_ts, event_factors, bar_ts):
+    """
+    每根K线之后所有事件的累计调整系数
+
+    事件按时间排序后从后往前累乘，得到"该事件及之后所有事件"的系数；每根K线用二分查找找到
+    第一个严格晚于它的事件，取对应的累乘值。除息日/拆股日当天及之后的K线不受该事件影响。
+
+    参数:
+        event_ts (np.ndarray): 事件日期（int64 UTC纳秒，升序）
+        event_factors (np.ndarray): 每个事件的系数
+        bar_ts (np.ndarray): K线时间戳（int64 UTC纳秒）
+
+    返回:
+        np.ndarray: 每根K线的累计系数
+    """
+    suffix = np.ones(len(event_factors) + 1)
+    suffix[:-1] = np.cumprod(np.asarray(event_factors, dtype=float)[::-1])[::-1]
+    return suffix[np.searchsorted(event_ts, bar_ts, side='right')]
+
+
+class AdjustedPriceStore:
+    """
+    保存未复权价格和公司行动（拆股、分红）事件表，读取时再计算复权价格
+
+    yfinance 返回的价格在下载时就已经复权，每次拆股或分红之后，缓存中的所有历史价格都会过时，
+    只能重新下载全部历史。这里把价格还原为未复权价格保存在 ColumnarStore 中，拆股和分红单独
+    记录在每只股票一个的小事件表里；读取时用向量化的累计调整系数得到复权视图。新的公司行动
+    只需要更新事件表，价格数据不用重写。
+
+    复权方式与 Yahoo 一致：拆股日之前的价格除以拆股比例、成交量乘以拆股比例；除息日之前的价格
+    乘以 (1 - 每股分红 / 除息日前一根K线的收盘价)。每只股票的系数索引（排序后的事件日期和累乘值）
+    会缓存起来，事件表没有变化时直接复用。
+
+    参数:
+        store (ColumnarStore): 保存未复权价格的仓库；事件表保存在 store.root/股票代码/ 下
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._factor_cache = {}
+
+    def actions(self, symbol):
+        """
+        读取公司行动事件表
+
+        参数:
+            symbol (str): 股票代码
+
+        返回:
+            pd.DataFrame: 以除息/拆股日期（UTC）为索引，列为 split（拆股比例，例如 4 表示一拆四）、
+                          dividend（未复权的每股分红）、prev_close（前一根K线的未复权收盘价），
+                          没有对应事件的位置为 NaN
+        """
+        path = self._actions_path(symbol)
+        if not os.path.exists(path):
+            return _empty_actions()
+        with open(path) as f:
+            table = json.load(f)
+        data = {column: np.array(table[column], dtype=float) for column in ACTION_COLUMNS}
+        index = pd.DatetimeIndex(np.array(table['timestamp'], dtype=np.int64).view('datetime64[ns]'), tz='UTC')
+        return pd.DataFrame(data, index=index.rename('Date'))
+
+    def record_actions(self, symbol, events):
+        """
+        合并新的公司行动，同一天已有的事件中非空的字段会被新值覆盖
+
+        参数:
+            symbol (str): 股票代码
+            events (pd.DataFrame): 以日期为索引，包含 split / dividend / prev_close 中的任意列
+        """
+        if events.empty:
+            return
+        events = events.reindex(columns=list(ACTION_COLUMNS)).astype(float)
+        index = events.index if events.index.tz is not None else events.index.tz_localize('UTC')
+        events.index = index.tz_convert('UTC')
+        table = events.combine_first(self.actions(symbol)).sort_index()
+
+        path = self._actions_path(symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {'timestamp': table.index.asi8.tolist()}
+        # 缺失值写成 null，保持标准 JSON
+        record.update({column: [None if np.isnan(v) else float(v) for v in table[column]]
+                       for column in ACTION_COLUMNS})
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f, indent=1)
+        os.replace(tmp_path, path)
+        self._factor_cache.pop(symbol.upper(), None)
+
+    def add_action(self, symbol, date, split=None, dividend=None, dataset='1d_raw'):
+        """
+        记录一次公司行动，不需要重新下载或重写价格
+
+        参数:
+            symbol (str): 股票代码
+            date (str | datetime): 拆股日或除息日
+            split (float | None): 拆股比例，例如一拆四为 4，十合一为 0.1
+            dividend (float | None): 未复权的每股分红
+            dataset (str): 用来查找除息日前一根K线收盘价的数据集
+        """
+        manifest = self.store.info(symbol, dataset)
+        tz = manifest['tz'] if manifest else 'UTC'
+        date = pd.Timestamp(date)
+        date = date.tz_localize(tz) if date.tzinfo is None else date
+        event = {'split': split, 'dividend': dividend}
+        if dividend is not None and manifest is not None:
+            event['prev_close'] = self._close_before(symbol, date, dataset)
+        events = pd.DataFrame([event], index=pd.DatetimeIndex([date]), dtype=float)
+        self.record_actions(symbol, events)
+
+    def ingest(self, symbol, data, dataset='1d_raw'):
+        """
+        保存一段下载时已经复权的数据：记录其中的拆股和分红，把价格还原为未复权后追加到仓库
+
+        data 的价格应当按下载时已知的所有拆股复权过（yfinance 的 history 默认如此，auto_adjust=False
+        时只按拆股复权），所以还原时使用事件表中所有晚于每根K线的拆股。不能是按分红复权的价格。
+
+        参数:
+            symbol (str): 股票代码
+            data (pd.DataFrame): 包含 Open/High/Low/Close/Volume，以及可选的 Dividends/Stock Splits 列
+            dataset (str): 未复权数据集的名称
+
+        返回:
+            pd.DataFrame: 实际保存的未复权数据（不含 Dividends、Stock Splits、Adj Close 等列）
+        """
+        splits = data['Stock Splits'] if 'Stock Splits' in data else pd.Series(dtype=float)
+        splits = splits[splits.fillna(0) != 0]
+        self.record_actions(symbol, pd.DataFrame({'split': splits}))
+
+        raw = data.drop(columns=[c for c in data.columns if c not in PRICE_COLUMNS + ('Volume',)])
+        raw = raw.drop(columns=['Adj Close'], errors='ignore')
+        ts = _utc_ns(raw.index)
+        split_after = self._factors(symbol)[1](ts)
+        for column in raw.columns:
+            if column == 'Volume':
+                raw[column] = np.round(raw[column].to_numpy(dtype=float) / split_after).astype(np.int64)
+            else:
+                raw[column] = raw[column].to_numpy(dtype=float) * split_after
+
+        dividends = data['Dividends'] if 'Dividends' in data else pd.Series(dtype=float)
+        dividends = dividends[dividends.fillna(0) != 0]
+        if len(dividends):
+            rows = raw.index.get_indexer(dividends.index)
+            amounts = dividends.to_numpy(dtype=float) * split_after[rows]
+            prev_close = [raw['Close'].iloc[row - 1] if row > 0 else self._close_before(symbol, date, dataset)
+                          for row, date in zip(rows, dividends.index)]
+            self.record_actions(symbol, pd.DataFrame({'dividend': amounts, 'prev_close': prev_close},
+                                                     index=dividends.index))
+
+        self.store.append(symbol, raw, dataset)
+        return raw
+
+    def read(self, symbol, start=None, end=None, dataset='1d_raw', adjust='all', columns=None):
+        """
+        读取 [start, end) 区间的数据，按需要的方式复权
+
+        参数:
+            symbol (str): 股票代码
+            start (str | datetime | None): 开始时间
+            end (str | datetime | None): 结束时间（不包含）
+            dataset (str): 未复权数据集的名称
+            adjust (str | None): 'all'（拆股和分红，与 yfinance auto_adjust=True 相同）、
+                                 'splits'（只按拆股，与 auto_adjust=False 相同，并附带 Adj Close 列）
+                                 或 None（未复权）
+            columns (list[str] | None): 需要的列，None 表示全部（另外附带 Dividends 和 Stock Splits 列）
+
+        返回:
+            pd.DataFrame: 历史数据
+        """
+        ts, arrays, manifest = self.store.read_arrays(symbol, start, end, dataset, columns)
+        return self._adjust(symbol, ts, arrays, manifest, adjust, with_actions=columns is None)
+
+    def iter_chunks(self, symbol, start=None, end=None, dataset='1d_raw', columns=None, adjust='all'):
+        """
+        按分区逐块读取并复权，供 out_of_core.analyze_store 等分块计算使用
+
+        调整系数只取决于K线时间和事件表，所以逐块复权的结果与一次性读取完全相同。
+
+        参数:
+            symbol (str): 股票代码
+            start (str | datetime | None): 开始时间
+            end (str | datetime | None): 结束时间（不包含）
+            dataset (str): 未复权数据集的名称
+            columns (list[str] | None): 需要的列，None 表示全部
+            adjust (str | None): 复权方式，见 read
+
+        返回:
+            generator: 按时间顺序逐个产生每个分区复权后的DataFrame
+        """
+        for chunk in self.store.iter_chunks(symbol, start, end, dataset, columns):
+            arrays = {column: chunk[column].to_numpy() for column in chunk.columns}
+            manifest = {'tz': str(chunk.index.tz), 'index_name': chunk.index.name}
+            yield self._adjust(symbol, _utc_ns(chunk.index), arrays, manifest, adjust, with_actions=False)
+
+    def write(self, symbol, data, dataset):
+        """直接写入（不复权的）数据集，例如 analyze_store 保存的派生列"""
+        self.store.write(symbol, data, dataset)
+
+    def append(self, symbol, data, dataset):
+        """直接追加（不复权的）数据集"""
+        self.store.append(symbol, data, dataset)
+
+    def adjustment_factors(self, symbol, index):
+        """
+        给定时间点的价格和成交量调整系数
+
+        参数:
+            symbol (str): 股票代码
+            index (pd.DatetimeIndex): K线时间
+
+        返回:
+            tuple: (全复权价格系数, 拆股价格系数, 成交量系数)，复权价格 = 未复权价格 × 价格系数
+        """
+        ts = _utc_ns(index)
+        _, split_after, dividend_after = self._factors(symbol)
+        splits = split_after(ts)
+        return dividend_after(ts) / splits, 1 / splits, splits
+
+    def _adjust(self, symbol, ts, arrays, manifest, adjust, with_actions):
+        if adjust not in ADJUST_MODES:
+            raise ValueError(f"未知的复权方式: {adjust}")
+        index = pd.DatetimeIndex(np.array(ts).view('datetime64[ns]'), name=manifest['index_name'])
+        index = index.tz_localize('UTC').tz_convert(manifest['tz'])
+        events, split_after, dividend_after = self._factors(symbol)
+        splits = split_after(ts)
+        dividends = dividend_after(ts)
+        price_factor = {'all': dividends / splits, 'splits': 1 / splits, None: None}[adjust]
+
+        data = {}
+        for column, values in arrays.items():
+            values = np.array(values)
+            if adjust is not None and column in PRICE_COLUMNS:
+                values = values * price_factor
+            elif adjust is not None and column == 'Volume':
+                values = np.round(values * splits).astype(np.int64)
+            data[column] = values
+            if adjust == 'splits' and column == 'Close':
+                # 与 yfinance auto_adjust=False 的列顺序一致，Adj Close 紧跟在 Close 后面
+                data['Adj Close'] = np.asarray(arrays['Close']) * dividends / splits
+        if with_actions:
+            # 与 yfinance 的返回格式一致：事件当天的分红（按当前拆股调整后）和拆股比例
+            rows = np.searchsorted(ts, events['ts'])
+            hit = (rows < len(ts)) & (ts[np.minimum(rows, len(ts) - 1)] == events['ts']) if len(ts) else rows < 0
+            dividend_column = np.zeros(len(ts))
+            split_column = np.zeros(len(ts))
+            dividend_scale = 1 / splits[rows[hit]] if adjust is not None else 1.0
+            dividend_column[rows[hit]] = events['dividend'][hit] * dividend_scale
+            split_column[rows[hit]] = events['split'][hit]
+            data['Dividends'] = dividend_column
+            data['Stock Splits'] = np.where(split_column == 1, 0, split_column)
+        return pd.DataFrame(data, index=index)
+
+    def _factors(self, symbol):
+        # 系数索引按事件表文件的修改时间缓存，其他进程更新了事件表也能察觉
+        path = self._actions_path(symbol)
+        version = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        key = symbol.upper()
+        cached = self._factor_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        actions = self.actions(symbol)
+        events = {
+            'ts': actions.index.asi8,
+            'split': actions['split'].fillna(1.0).to_numpy(),
+            'dividend': actions['dividend'].fillna(0.0).to_numpy(),
+        }
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dividend_factor = 1 - events['dividend'] / actions['prev_close'].to_numpy()
+        # 找不到除息日前收盘价的分红无法计算系数，按不调整处理
+        dividend_factor = np.where(np.isfinite(dividend_factor) & (dividend_factor > 0), dividend_factor, 1.0)
+
+        def split_after(ts):
+            return cumulative_factors(events['ts'], events['split'], ts)
+
+        def dividend_after(ts):
+            return cumulative_factors(events['ts'], dividend_factor, ts)
+
+        factors = (events, split_after, dividend_after)
+        self._factor_cache[key] = (version, factors)
+        return factors
+
+    def _close_before(self, symbol, date, dataset):
+        # 除息日前最后一根K线的未复权收盘价，只读取除息日前一个月的数据
+        if self.store.info(symbol, dataset) is None:
+            return np.nan
+        _, arrays, _ = self.store.read_arrays(symbol, date - pd.Timedelta(days=31), date, dataset, ['Close'])
+        return float(arrays['Close'][-1]) if len(arrays['Close']) else np.nan
+
+    def _actions_path(self, symbol):
+        return os.path.join(self.store.root, symbol.upper(), ACTIONS_FILE)
+
+
+def _empty_actions():
+    index = pd.DatetimeIndex([], tz='UTC', name='Date')
+    return pd.DataFrame({column: np.empty(0) for column in ACTION_COLUMNS}, index=index)
+
+
+def _utc_ns(index):
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').asi8
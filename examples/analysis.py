@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from array_utils import ffill
+from incremental_stats import RunningStats
+from indicators import SMA
+from instrumentation import count
+
+
+def pct_change(values):
+    """
+    与 pd.Series.pct_change() * 100 一致的百分比收益率（先向前填充缺失值），直接在NumPy数组上计算
+
+    参数:
+        values (np.ndarray): 价格
+
+    返回:
+        np.ndarray: 收益率（百分比），第一个值为NaN
+    """
+    filled = ffill(values)
+    result = np.full(len(values), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result[1:] = (filled[1:] / filled[:-1] - 1) * 100
+    return result
+
+
+class StockAnalysis:
+    """
+    单只股票的分析结果，不修改传入的DataFrame
+
+    原来 basic_data_analysis 和 time_series_analysis 会把 Daily_Return、MA50、MA200 写回调用者的
+    DataFrame，每加一列都可能让 pandas 复制整个数据块。这里收盘价直接引用 DataFrame 底层的
+    NumPy 数组（不复制），派生列在第一次访问时计算并缓存为独立的数组，通过 result['MA50']
+    取得与原始数据共享索引的 Series（不复制数组）。
+
+    参数:
+        data (pd.DataFrame): 股票历史数据
+        symbol (str | None): 股票代码，与 engine 一起使用时作为缓存的键
+        windows (tuple[int]): 移动平均的窗口长度
+        engine (IndicatorEngine | None): 指标引擎，提供时移动平均通过它计算和缓存
+    """
+
+    def __init__(self, data, symbol=None, windows=(50, 200), engine=None):
+        self.data = data
+        self.symbol = symbol
+        self.windows = tuple(windows)
+        self.engine = engine
+        self.index = data.index
+        self._columns = {}
+        self._close_stats = None
+        self._return_stats = None
+        count('rows_analyzed', len(data))
+
+    @property
+    def close(self):
+        # 单一数据类型的列取出的是底层数组的视图
+        return self.data['Close'].to_numpy(dtype=float, copy=False)
+
+    @property
+    def columns(self):
+        return ['Daily_Return'] + [f'MA{w}' for w in self.windows]
+
+    def __getitem__(self, name):
+        return pd.Series(self.values(name), index=self.index, name=name, copy=False)
+
+    def values(self, name):
+        """
+        派生列的NumPy数组
+
+        参数:
+            name (str): 'Daily_Return' 或 'MA{窗口}'
+
+        返回:
+            np.ndarray: 与原始数据等长的数组
+        """
+        if name not in self._columns:
+            if name == 'Daily_Return':
+                self._columns[name] = pct_change(self.close)
+            elif name in self.columns:
+                self._columns.update(self._moving_averages())
+            else:
+                raise KeyError(name)
+        return self._columns[name]
+
+    def frame(self):
+        """
+        所有派生列组成的DataFrame（不包含原始列，也不复制原始数据）
+
+        返回:
+            pd.DataFrame: 列为 Daily_Return 和 MA{窗口}
+        """
+        return pd.DataFrame({name: self.values(name) for name in self.columns}, index=self.index, copy=False)
+
+    @property
+    def close_stats(self):
+        if self._close_stats is None:
+            self._close_stats = RunningStats().update_many(self.close)
+        return self._close_stats
+
+    @property
+    def return_stats(self):
+        if self._return_stats is None:
+            self._return_stats = RunningStats().update_many(self.values('Daily_Return'))
+        return self._return_stats
+
+    def monthly_returns(self):
+        """
+        月度收益率（百分比），与 data['Close'].resample('M').last().pct_change() * 100 一致
+
+        返回:
+            pd.Series: 以月末日期为索引
+        """
+        monthly = pd.Series(self.close, index=self.index, copy=False).resample('M').last()
+        return pd.Series(pct_change(monthly.to_numpy()), index=monthly.index, name='Close')
+
+    def period_summary(self, start=None, end=None):
+        """
+        某个时间段的表现（analyze_specific_timeframe 打印的内容），只截取需要的行
+
+        参数:
+            start (str | datetime | None): 开始日期
+            end (str | datetime | None): 结束日期（包含，与 .loc 一致）
+
+        返回:
+            dict: 收盘价变化、收益率（百分比）、平均成交量、最高价、最低价
+        """
+        i, j = self.index.slice_locs(start, end)
+        close = self.close[i:j]
+        return {
+            'change': close[-1] - close[0],
+            'return': (close[-1] / close[0] - 1) * 100,
+            'mean_volume': self.data['Volume'].to_numpy()[i:j].mean(),
+            'high': self.data['High'].to_numpy()[i:j].max(),
+            'low': self.data['Low'].to_numpy()[i:j].min(),
+        }
+
+    def _moving_averages(self):
+        if self.engine is not None and self.symbol is not None:
+            averages = self.engine.compute(self.symbol, 'sma', self.data, windows=self.windows)
+        else:
+            averages = SMA(self.windows).run(self.close)
+        return {f'MA{w}': averages[f'sma_{w}'] for w in self.windows}
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def as_2d(values):
+    """
+    统一按 (时间, 股票) 的二维数组计算，一维输入视为一只股票
+
+    参数:
+        values (array-like): (时间,) 或 (时间, 股票) 数组
+
+    返回:
+        tuple: (二维 float 数组, 输入是否为一维)，第二项交给 restore 还原形状
+    """
+    values = np.asarray(values, dtype=float)
+    return (values[:, None], True) if values.ndim == 1 else (values, False)
+
+
+def restore(values, squeeze):
+    """
+    把按二维计算的结果还原为输入的形状
+
+    参数:
+        values (np.ndarray): (时间, 股票) 结果
+        squeeze (bool): as_2d 返回的输入是否为一维
+
+    返回:
+        np.ndarray: squeeze 为真时为一维数组
+    """
+    return values[:, 0] if squeeze else values
+
+
+def ffill(values, initial=np.nan):
+    """
+    沿时间轴（第0维）向量化地向前填充缺失值，与 pandas 的 ffill() 一致
+
+    参数:
+        values (np.ndarray): (时间,) 或 (时间, 股票) 数组
+        initial (float | np.ndarray): 第一个有效值之前的位置填充的值，例如分块计算时上一块最后一个有效值
+
+    返回:
+        np.ndarray: 填充后的新数组
+    """
+    values = np.asarray(values, dtype=float)
+    # 每个位置取之前最近一个有效值的行号，没有有效值时为 -1
+    rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    last_valid = np.where(~np.isnan(values), rows, -1)
+    if len(values):
+        last_valid = np.maximum.accumulate(last_valid, axis=0)
+    filled = np.take_along_axis(values, np.maximum(last_valid, 0), axis=0)
+    return np.where(last_valid >= 0, filled, initial)
@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+
+from array_utils import ffill
+from indicators import SMA
+
+TRADING_DAYS = 252
+
+
+def crossover_positions(fast_ma, slow_ma, allow_short=False):
+    """
+    由快慢两条均线生成目标仓位：快线在慢线之上时做多
+
+    参数:
+        fast_ma (array-like): 快线，例如 time_series_analysis 中的 MA50，形状为 (时间,) 或 (时间, 股票)
+        slow_ma (array-like): 慢线，例如 MA200
+        allow_short (bool): 快线在慢线之下时是否做空，否则空仓
+
+    返回:
+        np.ndarray: 目标仓位，1 为满仓做多，-1 为满仓做空，0 为空仓；均线尚未形成时为0
+    """
+    fast_ma = np.asarray(fast_ma, dtype=float)
+    slow_ma = np.asarray(slow_ma, dtype=float)
+    below = -1.0 if allow_short else 0.0
+    positions = np.where(fast_ma > slow_ma, 1.0, below)
+    return np.where(np.isnan(fast_ma) | np.isnan(slow_ma), 0.0, positions)
+
+
+def ma_crossover_positions(close, fast=50, slow=200, allow_short=False):
+    """
+    计算均线并生成交叉策略的目标仓位
+
+    参数:
+        close (array-like): 收盘价，形状为 (时间,) 或 (时间, 股票)
+        fast (int): 快线窗口
+        slow (int): 慢线窗口
+        allow_short (bool): 是否允许做空
+
+    返回:
+        np.ndarray: 目标仓位
+    """
+    ma = SMA((fast, slow)).run(close)
+    return crossover_positions(ma[f'sma_{fast}'], ma[f'sma_{slow}'], allow_short)
+
+
+class BacktestResult:
+    """
+    回测结果
+
+    属性:
+        index (pd.Index): 时间索引
+        symbols (list[str]): 股票代码
+        positions (np.ndarray): 每根K线实际持有的仓位（已按执行延迟错开）
+        gross_returns (np.ndarray): 每只股票未扣除成本的策略收益率
+        returns (np.ndarray): 每只股票扣除成本后的策略收益率
+        equity (np.ndarray): 每只股票的净值曲线
+        drawdown (np.ndarray): 每只股票的回撤（<= 0）
+        portfolio_returns (np.ndarray): 等权组合的收益率
+        portfolio_equity (np.ndarray): 等权组合的净值曲线
+        portfolio_drawdown (np.ndarray): 等权组合的回撤
+        costs (np.ndarray): 每根K线的交易成本（收益率单位）
+        cost_rate (float): 单边交易成本率（手续费加滑点）
+    """
+
+    def __init__(self, index, symbols, prices, positions, gross_returns, costs, cost_rate, initial_capital):
+        self.index = index
+        self.symbols = symbols
+        self.prices = prices
+        self.positions = positions
+        self.gross_returns = gross_returns
+        self.costs = costs
+        self.cost_rate = cost_rate
+        self.initial_capital = initial_capital
+        self.returns = gross_returns - costs
+        self.equity = initial_capital * np.cumprod(1 + self.returns, axis=0)
+        self.drawdown = self.equity / np.maximum.accumulate(self.equity, axis=0) - 1
+        self.portfolio_returns = self.returns.mean(axis=1)
+        self.portfolio_equity = initial_capital * np.cumprod(1 + self.portfolio_returns)
+        self.portfolio_drawdown = self.portfolio_equity / np.maximum.accumulate(self.portfolio_equity) - 1
+        self._trades = None
+
+    @property
+    def trades(self):
+        """
+        逐笔交易列表（开仓到平仓为一笔），首次访问时计算
+
+        返回:
+            pd.DataFrame: 列为 symbol/direction/entry_time/exit_time/entry_price/exit_price/bars/return/open
+        """
+        if self._trades is None:
+            self._trades = _extract_trades(self)
+        return self._trades
+
+    def summary(self, periods_per_year=TRADING_DAYS):
+        """
+        每只股票的绩效汇总
+
+        参数:
+            periods_per_year (int): 每年的K线数量，用于年化
+
+        返回:
+            pd.DataFrame: 行为股票代码，列为总收益、年化收益、年化波动、夏普比率、最大回撤、换手和交易次数
+        """
+        stats = _performance(self.returns, self.equity, self.drawdown, self.initial_capital, periods_per_year)
+        stats['turnover'] = np.abs(np.diff(self.positions, axis=0, prepend=0)).sum(axis=0)
+        stats['trades'] = np.bincount(self.trades['symbol_id'], minlength=len(self.symbols)) if len(self.trades) \
+            else np.zeros(len(self.symbols), dtype=int)
+        return pd.DataFrame(stats, index=pd.Index(self.symbols, name='Symbol'))
+
+    def portfolio_summary(self, periods_per_year=TRADING_DAYS):
+        """
+        等权组合的绩效汇总
+
+        参数:
+            periods_per_year (int): 每年的K线数量，用于年化
+
+        返回:
+            dict: 总收益、年化收益、年化波动、夏普比率、最大回撤、平均每只股票的换手和总交易次数
+        """
+        stats = _performance(self.portfolio_returns, self.portfolio_equity, self.portfolio_drawdown,
+                             self.initial_capital, periods_per_year)
+        stats = {key: float(value) for key, value in stats.items()}
+        stats['turnover'] = float(np.abs(np.diff(self.positions, axis=0, prepend=0)).sum(axis=0).mean())
+        stats['trades'] = len(self.trades)
+        return stats
+
+
+def run_backtest(prices, positions, cost_bps=5.0, slippage_bps=5.0, lag=1, initial_capital=1.0,
+                 index=None, symbols=None):
+    """
+    向量化回测：在时间轴和股票维度上一次计算全部收益、成本、净值和回撤
+
+    第 t 根K线收盘时得到的目标仓位以收盘价成交，从第 t+lag 根K线开始持有（lag=1 避免未来函数）。
+    每次调仓按仓位变化的绝对值收取手续费和滑点。
+
+    参数:
+        prices (array-like | pd.DataFrame | pd.Series): 收盘价，形状为 (时间,) 或 (时间, 股票)；NaN 视为停牌
+        positions (array-like): 与 prices 形状相同的目标仓位
+        cost_bps (float): 单边手续费（基点）
+        slippage_bps (float): 单边滑点（基点）
+        lag (int): 信号到持仓的延迟K线数
+        initial_capital (float): 初始资金
+        index (array-like): 时间索引，prices 为 pandas 对象时自动获取
+        symbols (list[str]): 股票代码，prices 为 DataFrame 时自动获取
+
+    返回:
+        BacktestResult: 回测结果
+    """
+    if isinstance(prices, pd.Series):
+        index = prices.index if index is None else index
+        symbols = [prices.name or 'asset'] if symbols is None else symbols
+    elif isinstance(prices, pd.DataFrame):
+        index = prices.index if index is None else index
+        symbols = list(prices.columns) if symbols is None else symbols
+    prices = np.asarray(prices, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    if prices.ndim == 1:
+        prices, positions = prices[:, None], positions.reshape(-1, 1)
+    if prices.shape != positions.shape:
+        raise ValueError(f"价格 {prices.shape} 与仓位 {positions.shape} 的形状不一致")
+    n_bars, n_symbols = prices.shape
+    index = pd.RangeIndex(n_bars) if index is None else pd.Index(index)
+    symbols = [f'asset_{i}' for i in range(n_symbols)] if symbols is None else list(symbols)
+
+    # 停牌期间价格不变，收益率为0
+    valid = ~np.isnan(prices)
+    filled = ffill(prices)
+    asset_returns = np.zeros(prices.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        asset_returns[1:] = filled[1:] / filled[:-1] - 1
+    asset_returns = np.where(np.isfinite(asset_returns) & valid, asset_returns, 0.0)
+
+    # 没有价格时无法调仓，沿用之前的目标仓位
+    targets = ffill(np.where(valid, np.nan_to_num(positions), np.nan))
+    targets = np.nan_to_num(targets)
+    held = np.zeros(prices.shape)
+    if lag < n_bars:
+        held[lag:] = targets[:n_bars - lag]
+
+    # 调仓发生在持仓变化的前一根K线收盘，成本计入新仓位的第一根K线
+    cost_rate = (cost_bps + slippage_bps) / 1e4
+    costs = np.abs(np.diff(held, axis=0, prepend=0)) * cost_rate
+    return BacktestResult(index, symbols, filled, held, held * asset_returns, costs, cost_rate, initial_capital)
+
+
+def _performance(returns, equity, drawdown, initial_capital, periods_per_year):
+    # returns 可以是 (时间,) 或 (时间, 股票)，统计量沿时间轴计算
+    n = len(returns)
+    total = equity[-1] / initial_capital - 1 if n else np.zeros(returns.shape[1:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual_return = (1 + total) ** (periods_per_year / max(n, 1)) - 1
+        std = returns.std(axis=0, ddof=1)
+        sharpe = returns.mean(axis=0) / std * np.sqrt(periods_per_year)
+    return {
+        'total_return': total,
+        'annual_return': annual_return,
+        'annual_volatility': std * np.sqrt(periods_per_year),
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=0) if n else np.zeros(returns.shape[1:]),
+    }
+
+
+def _extract_trades(result):
+    held = result.positions
+    n_bars, n_symbols = held.shape
+    # 按 (股票, 时间) 展开，找出所有仓位变化点，每段非零仓位就是一笔交易
+    by_symbol = held.T
+    change = np.ones(by_symbol.shape, dtype=bool)
+    change[:, 1:] = by_symbol[:, 1:] != by_symbol[:, :-1]
+    symbol_id, start = np.nonzero(change)
+    value = by_symbol[symbol_id, start]
+
+    # 每段在同一股票的下一个变化点结束，最后一段到序列末尾
+    next_start = np.append(start[1:], n_bars)
+    same_symbol = np.append(symbol_id[1:] == symbol_id[:-1], False)
+    end = np.where(same_symbol, next_start, n_bars)
+
+    keep = value != 0
+    symbol_id, start, end, value = symbol_id[keep], start[keep], end[keep], value[keep]
+    is_open = end == n_bars
+
+    # 持仓从 start 开始，说明在 start-1 收盘时开仓；在 end-1 收盘时平仓
+    prices = result.prices
+    entry_price = prices[np.maximum(start - 1, 0), symbol_id]
+    exit_price = prices[end - 1, symbol_id]
+    # 用对数收益的累加和一次得到每段的毛收益，再扣除开仓和平仓（未平仓则不扣）的成本
+    log_gross = np.log1p(result.gross_returns.T)
+    cumulative = np.concatenate([np.zeros((n_symbols, 1)), np.cumsum(log_gross, axis=1)], axis=1)
+    gross = np.expm1(cumulative[symbol_id, end] - cumulative[symbol_id, start])
+    cost = np.abs(value) * result.cost_rate
+    trade_return = (1 + gross) * (1 - cost) * np.where(is_open, 1.0, 1 - cost) - 1
+
+    index = result.index
+    return pd.DataFrame({
+        'symbol_id': symbol_id,
+        'symbol': np.asarray(result.symbols, dtype=object)[symbol_id],
+        'direction': np.where(value > 0, 'long', 'short'),
+        'size': np.abs(value),
+        'entry_time': index[np.maximum(start - 1, 0)],
+        'exit_time': index[end - 1],
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'bars': end - start,
+        'return': trade_return,
+        'open': is_open,
+    })
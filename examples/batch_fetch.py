@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from data_cache import period_to_start
+from data_providers import DataProvider, YFinanceProvider
+
+# 每个数据源共享一个限速器，多次批量调用之间也不会超过限速
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限速器
+
+    参数:
+        rate (float): 每秒允许的请求数
+        burst (int): 令牌桶容量，即允许的瞬时并发请求数
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        获取一个令牌，令牌不足时阻塞等待
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_rate_limiter(provider_name, rate, burst=1):
+    """
+    获取（或创建）某个数据源共享的限速器
+
+    参数:
+        provider_name (str): 数据源名称
+        rate (float): 每秒允许的请求数
+        burst (int): 令牌桶容量
+
+    返回:
+        RateLimiter: 限速器
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(provider_name)
+        if limiter is None or limiter.rate != rate or limiter.burst != burst:
+            limiter = RateLimiter(rate, burst)
+            _rate_limiters[provider_name] = limiter
+        return limiter
+
+
+class RateLimitedProvider(DataProvider):
+    """
+    为数据源增加限速的包装器
+
+    参数:
+        provider (DataProvider): 被包装的数据源
+        limiter (RateLimiter): 限速器
+    """
+
+    def __init__(self, provider, limiter):
+        self.provider = provider
+        self.limiter = limiter
+        self.name = provider.name
+
+    def fetch(self, symbol, start=None, end=None, interval='1d', auto_adjust=True):
+        self.limiter.acquire()
+        return self.provider.fetch(symbol, start=start, end=end, interval=interval,
+                                   auto_adjust=auto_adjust)
+
+
+def get_stock_data_many(symbols, period=None, start=None, end=None, provider=None, cache=None,
+                        max_workers=8, rate_limit=None, retries=3, backoff=0.5, layout='dict'):
+    """
+    并发获取多只股票的历史数据
+
+    参数:
+        symbols (list[str]): 股票代码列表
+        period (str | None): 时间跨度，例如 '3y'；提供 start 时忽略
+        start (str | datetime | None): 开始时间
+        end (str | datetime | None): 结束时间（不包含）
+        provider (DataProvider): 数据源，默认为 YFinanceProvider；提供 cache 时使用缓存的数据源
+        cache (OHLCVCache): 本地数据缓存，提供时只下载缓存中缺少的部分
+        max_workers (int): 最大并发线程数
+        rate_limit (float | None): 每秒最多向数据源发出的请求数，None 表示不限速
+        retries (int): 单只股票遇到网络、IO或限速错误后的最大重试次数，其他错误不重试
+        backoff (float): 第一次重试前的等待时间（秒），之后每次翻倍
+        layout (str): 返回格式，'dict' 为 {代码: DataFrame}，
+                      'long' 为 (Symbol, Date) 双层索引的长表，
+                      'panel' 为 (字段, 代码) 双层列的宽表
+
+    返回:
+        tuple: (数据, 失败信息)，失败信息为 {代码: 错误描述}，只包含最终失败的股票
+    """
+    if layout not in ('dict', 'long', 'panel'):
+        raise ValueError(f"未知的返回格式: {layout}")
+
+    base_provider = cache.provider if cache is not None else (provider or YFinanceProvider())
+    if rate_limit:
+        base_provider = RateLimitedProvider(base_provider, get_rate_limiter(base_provider.name, rate_limit))
+
+    if cache is not None:
+        source = cache.with_provider(base_provider)
+
+        def fetch(symbol):
+            return source.get(symbol, period=period, start=start, end=end)
+    else:
+        if start is None and period is not None:
+            start = period_to_start(period, end)
+
+        def fetch(symbol):
+            return base_provider.fetch(symbol, start=start, end=end)
+
+    frames, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fetch_with_retry, fetch, symbol, retries, backoff): symbol
+                   for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                data = future.result()
+            except Exception as exc:
+                errors[symbol] = f"{type(exc).__name__}: {exc}"
+                continue
+            if data.empty:
+                errors[symbol] = "没有获取到数据"
+            else:
+                frames[symbol] = data
+
+    # 按输入顺序返回，便于和股票列表对应
+    frames = {symbol: frames[symbol] for symbol in symbols if symbol in frames}
+    return combine_frames(frames, layout), errors
+
+
+def _fetch_with_retry(fetch, symbol, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            return fetch(symbol)
+        except Exception as exc:
+            if attempt == retries or not _is_transient(exc):
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def _is_transient(exc):
+    # 只有网络、IO和限速错误值得重试；代码不存在、参数错误等重试也不会成功，直接记为失败
+    if isinstance(exc, (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)):
+        return False
+    # requests / curl_cffi 的请求异常都是 OSError 的子类；yfinance 的限速错误不是，按类名识别
+    return isinstance(exc, OSError) or 'RateLimit' in type(exc).__name__
+
+
+def combine_frames(frames, layout='long'):
+    """
+    把多只股票的DataFrame合并为一个表
+
+    参数:
+        frames (dict[str, pd.DataFrame]): {代码: 历史数据}
+        layout (str): 'dict' 原样返回，'long' 为 (Symbol, Date) 双层索引的长表，
+                      'panel' 为 (字段, 代码) 双层列、按日期对齐的宽表
+
+    返回:
+        dict | pd.DataFrame: 合并后的数据
+    """
+    if layout == 'dict':
+        return frames
+    if not frames:
+        return pd.DataFrame()
+    if layout == 'long':
+        return pd.concat(frames, names=['Symbol'])
+    return pd.concat(frames, axis=1, names=['Symbol']).swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
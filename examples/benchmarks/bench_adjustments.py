@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+读取时复权的基准测试
+
+缓存多只股票的日K线后，模拟每只股票都出现一次新的分红，比较两种处理方式：
+- refetch: 原来缓存的是下载时已复权的价格，新分红让全部历史价格过时，只能重新下载并重写整个数据集
+- actions: 缓存未复权价格，只在事件表里记录这次分红（OHLCVCache.record_action）
+
+另外比较读取全部历史时，直接读取未复权数据与读取时按事件表复权的耗时，说明复权的额外开销。
+模拟数据源的 --latency 代表一次网络请求的延迟。
+
+用法:
+    python benchmarks/bench_adjustments.py --symbols 50 --years 20 --events 40 --latency 0.2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data_cache import OHLCVCache
+from data_providers import SyntheticProvider
+
+DATASET = '1d_raw'
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t0
+
+
+def run(n_symbols, years, n_events, latency):
+    symbols = [f'S{i:04d}' for i in range(n_symbols)]
+    start = pd.Timestamp.now().normalize() - pd.DateOffset(years=years)
+    provider = SyntheticProvider(latency=latency, base_date=start - pd.DateOffset(years=1))
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = OHLCVCache(root, provider=provider)
+        for symbol in symbols:
+            cache.get(symbol, start=start)
+
+        # 每只股票若干次历史分红和拆股，用于衡量读取时复权的开销
+        rng = np.random.default_rng(0)
+        for symbol in symbols:
+            index = cache.store.read(symbol, dataset=DATASET, columns=['Close']).index
+            rows = np.sort(rng.choice(np.arange(1, len(index)), n_events, replace=False))
+            events = pd.DataFrame({
+                'split': np.where(rng.random(n_events) < 0.1, 2.0, np.nan),
+                'dividend': rng.uniform(0.1, 1.0, n_events),
+                'prev_close': 100.0,
+            }, index=index[rows])
+            cache.adjusted.record_actions(symbol, events)
+
+        new_date = pd.Timestamp.now().normalize() - pd.DateOffset(days=30)
+
+        def refetch():
+            for symbol in symbols:
+                data = provider.fetch(symbol, start=start, auto_adjust=True)
+                cache.store.write(symbol, data, '1d_adj')
+
+        def record():
+            for symbol in symbols:
+                cache.record_action(symbol, new_date, dividend=0.5)
+
+        def read_raw():
+            for symbol in symbols:
+                cache.adjusted.read(symbol, dataset=DATASET, adjust=None)
+
+        def read_adjusted():
+            for symbol in symbols:
+                cache.adjusted.read(symbol, dataset=DATASET, adjust='all')
+
+        refetch_time = timed(refetch)
+        record_time = timed(record)
+        raw_time = timed(read_raw)
+        # 第一次读取会建立每只股票的系数索引，第二次直接复用
+        cold_time = timed(read_adjusted)
+        warm_time = timed(read_adjusted)
+
+    print(f"{n_symbols} 只股票 × {years} 年日K线，每只股票 {n_events} 个历史事件，请求延迟 {latency}s\n")
+    print(f"{'新分红的处理方式':<20} {'耗时(s)':>10}")
+    print(f"{'重新下载并重写':<20} {refetch_time:>10.3f}")
+    print(f"{'只记录事件':<20} {record_time:>10.3f}")
+    print(f"加速比: {refetch_time / record_time:.0f}x\n")
+    print(f"{'读取全部历史':<20} {'耗时(s)':>10}")
+    print(f"{'未复权':<20} {raw_time:>10.3f}")
+    print(f"{'复权（首次）':<20} {cold_time:>10.3f}")
+    print(f"{'复权（系数已缓存）':<20} {warm_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--events', type=int, default=40, help='每只股票的历史事件数')
+    parser.add_argument('--latency', type=float, default=0.2, help='模拟的单次请求延迟（秒）')
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.events, args.latency)
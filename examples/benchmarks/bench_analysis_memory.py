@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+分析API的内存分配基准测试
+
+对模拟的多只股票历史数据（默认1000只 × 20年日K线）逐只执行第二天脚本中的分析：
+日收益率、MA50/MA200、月度收益率和最近一年的统计，比较两种写法：
+- mutate: 原来的写法，把 Daily_Return、MA50、MA200 写回DataFrame，并在 .loc 切片上写入 Centered/Height
+- analysis: StockAnalysis，派生列保存为独立数组，原始DataFrame不变
+
+每种写法在独立的子进程中运行，用 tracemalloc 记录分析过程中的分配峰值和结束后仍然占用的内存
+（不包括生成数据本身），耗时在不开启 tracemalloc 的情况下单独测量。
+
+用法:
+    python benchmarks/bench_analysis_memory.py --symbols 1000 --years 20
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import StockAnalysis
+from backtest import TRADING_DAYS
+from indicators import SMA
+from panel import Panel
+
+
+def build_frames(n_symbols, years):
+    panel = Panel.synthetic(n_symbols, years * TRADING_DAYS)
+    return [panel.symbol_frame(symbol) for symbol in panel.symbols]
+
+
+def analyze_mutating(data, start):
+    data['Daily_Return'] = data['Close'].pct_change() * 100
+    averages = SMA((50, 200)).run(data['Close'].to_numpy())
+    data['MA50'] = averages['sma_50']
+    data['MA200'] = averages['sma_200']
+    monthly = data['Close'].resample('M').last().pct_change() * 100
+    period = data.loc[start:]
+    period['Centered'] = (period['Open'] + period['Close']) / 2
+    period['Height'] = abs(period['Close'] - period['Open'])
+    return monthly.mean(), (period['Close'].iloc[-1] / period['Close'].iloc[0] - 1) * 100
+
+
+def analyze_views(data, start):
+    analysis = StockAnalysis(data)
+    analysis.values('Daily_Return')
+    analysis.values('MA50')
+    monthly = analysis.monthly_returns()
+    return monthly.mean(), analysis.period_summary(start)['return']
+
+
+def _measure(args):
+    mode, n_symbols, years = args
+    warnings.simplefilter('ignore')
+    analyze = analyze_mutating if mode == 'mutate' else analyze_views
+
+    # 计时和内存分别测量，tracemalloc 会让分配密集的代码慢好几倍
+    frames = build_frames(n_symbols, years)
+    start = frames[0].index[-TRADING_DAYS]
+    t0 = time.perf_counter()
+    for data in frames:
+        analyze(data, start)
+    elapsed = time.perf_counter() - t0
+
+    # 与脚本中一样逐只分析，只保留汇总结果；派生列如果写进了DataFrame就会一直占用内存
+    frames = build_frames(n_symbols, years)
+    tracemalloc.start()
+    results = [analyze(data, start) for data in frames]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    frames_mb = sum(data.memory_usage().sum() for data in frames) / 2 ** 20
+    return elapsed, peak / 2 ** 20, current / 2 ** 20, frames_mb, len(results)
+
+
+def run(n_symbols, years):
+    print(f"{n_symbols} 只股票 × {years * TRADING_DAYS} 根日K线")
+    print(f"{'写法':>10} {'耗时(s)':>10} {'分配峰值(MB)':>14} {'结束时占用(MB)':>16} {'DataFrame总大小(MB)':>20}")
+    ctx = mp.get_context('spawn')
+    for mode in ('mutate', 'analysis'):
+        with ctx.Pool(1) as pool:
+            elapsed, peak, current, frames_mb, _ = pool.map(_measure, [(mode, n_symbols, years)])[0]
+        print(f"{mode:>10} {elapsed:>10.2f} {peak:>14.1f} {current:>16.1f} {frames_mb:>20.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=20)
+    args = parser.parse_args()
+    run(args.symbols, args.years)
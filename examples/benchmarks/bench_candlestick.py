@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+K线图渲染基准测试
+
+比较原来逐行 iterrows + 两次 plt.plot 的画法与 plot_candlestick（两个 LineCollection）
+在不同K线数量下的绘制耗时和图形对象数量。使用 Agg 后端，不弹出窗口。
+
+用法:
+    python benchmarks/bench_candlestick.py --bars 250 2500 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from candlestick import plot_candlestick
+from data_providers import make_synthetic_ohlcv
+
+
+def draw_with_loop(ax, data):
+    # 原 analyze_specific_timeframe 中的画法
+    for idx, row in data.iterrows():
+        color = 'green' if row['Close'] >= row['Open'] else 'red'
+        ax.plot([idx, idx], [row['Low'], row['High']], color=color)
+        ax.plot([idx, idx], [row['Open'], row['Close']], color=color, linewidth=4)
+
+
+def draw_with_collections(ax, data):
+    plot_candlestick(ax, data)
+
+
+def measure(draw, data):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    t0 = time.perf_counter()
+    draw(ax, data)
+    fig.canvas.draw()
+    elapsed = time.perf_counter() - t0
+    artists = len(ax.lines) + len(ax.collections)
+    plt.close(fig)
+    return elapsed, artists
+
+
+def run(bars_list, loop_limit):
+    print(f"{'K线数':>8} {'方法':>12} {'耗时(s)':>10} {'图形对象数':>10}")
+    for bars in bars_list:
+        # 使用小时K线，保证任意数量的K线都能生成
+        data = make_synthetic_ohlcv('BENCH', end=pd.Timestamp('2000-01-03') + pd.Timedelta(hours=bars), freq='h')
+        results = [('collection', draw_with_collections)]
+        if bars <= loop_limit:
+            results.insert(0, ('iterrows', draw_with_loop))
+        for name, draw in results:
+            elapsed, artists = measure(draw, data)
+            print(f"{len(data):>8} {name:>12} {elapsed:>10.3f} {artists:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bars', type=int, nargs='+', default=[250, 2500, 10000, 50000])
+    parser.add_argument('--loop-limit', type=int, default=10000,
+                        help='超过该K线数时跳过原来的逐行画法（太慢）')
+    args = parser.parse_args()
+    run(args.bars, args.loop_limit)
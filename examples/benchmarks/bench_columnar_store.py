@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+列式存储读取基准测试
+
+把多年的分钟K线写入 ColumnarStore，然后比较两种截取一个月数据的方式：
+- full: 先把全部历史加载为DataFrame，再用 .loc 截取（原来的做法）
+- mmap: 用 ColumnarStore.read 只映射相关分区并二分查找截取
+
+每种方式在独立的子进程中运行，分别记录耗时、tracemalloc 峰值和常驻内存（RSS）的增长。
+
+用法:
+    python benchmarks/bench_columnar_store.py --years 3
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from columnar_store import ColumnarStore
+from data_providers import make_synthetic_ohlcv
+
+SYMBOL = 'BENCH'
+DATASET = '1m_adj'
+
+
+def build_store(root, years, price_dtype):
+    store = ColumnarStore(root, partition='month', price_dtype=price_dtype)
+    start = pd.Timestamp('2015-01-01')
+    # 按年生成并追加，避免一次性生成全部数据占用过多内存
+    for year in range(years):
+        lo, hi = start + pd.DateOffset(years=year), start + pd.DateOffset(years=year + 1)
+        store.append(SYMBOL, make_synthetic_ohlcv(SYMBOL, lo, hi, freq='min', base_date=lo), DATASET)
+    return store
+
+
+def _rss_mb():
+    # Linux 上 ru_maxrss 的单位是KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_full(root, start, end):
+    # 读取全部分区再截取，相当于把完整的DataFrame放在内存里
+    store = ColumnarStore(root)
+    data = store.read(SYMBOL, dataset=DATASET)
+    return data.loc[start:end]
+
+
+def _load_slice(root, start, end):
+    store = ColumnarStore(root)
+    return store.read(SYMBOL, start, pd.Timestamp(end) + pd.Timedelta(days=1), dataset=DATASET)
+
+
+def _measure(args):
+    mode, root, start, end = args
+    load = _load_full if mode == 'full' else _load_slice
+    rss_before = _rss_mb()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    data = load(root, start, end)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, _rss_mb() - rss_before, len(data)
+
+
+def run(years, price_dtype):
+    with tempfile.TemporaryDirectory() as root:
+        print(f"正在生成 {years} 年的分钟K线...")
+        store = build_store(root, years, price_dtype)
+        rows = sum(p['rows'] for p in store.info(SYMBOL, DATASET)['partitions'].values())
+        print(f"共 {rows} 行，磁盘占用 {store.stats['bytes_written'] / 2 ** 20:.1f} MB")
+
+        start, end = '2016-03-01', '2016-03-31'
+        print(f"{'方式':>6} {'耗时(s)':>10} {'分配峰值(MB)':>14} {'RSS增长(MB)':>12} {'行数':>8}")
+        ctx = mp.get_context('spawn')
+        for mode in ('full', 'mmap'):
+            with ctx.Pool(1) as pool:
+                elapsed, peak, rss, n = pool.map(_measure, [(mode, root, start, end)])[0]
+            print(f"{mode:>6} {elapsed:>10.3f} {peak:>14.1f} {rss:>12.1f} {n:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--price-dtype', default='float64', choices=['float64', 'float32'])
+    args = parser.parse_args()
+    run(args.years, args.price_dtype)
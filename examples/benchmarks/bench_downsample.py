@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+长序列绘图的降采样基准测试
+
+比较原来 visualize_stock_data 的画法（折线画全部点、每根K线一根成交量柱子、sns.histplot(kde=True)
+对全部数据拟合密度）与现在的画法（折线和成交量降采样到像素宽度、分箱+FFT 密度估计）在不同
+数据长度下绘制并保存四宫格的耗时。使用 Agg 后端，不弹出窗口。
+
+用法:
+    python benchmarks/bench_downsample.py --bars 5040 100000 1000000 --full-limit 100000
+"""
+import argparse
+import importlib
+import io
+import os
+import sys
+import time
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import StockAnalysis
+from data_providers import make_synthetic_arrays
+
+day2 = importlib.import_module('2_day2_stock_data_processing')
+
+
+def make_frame(n_bars):
+    # 分钟级时间戳，长度不受交易日历限制
+    arrays = make_synthetic_arrays(n_bars, 1)
+    index = pd.date_range('2000-01-03', periods=n_bars, freq='min', tz='America/New_York')
+    return pd.DataFrame({field: values[:, 0] for field, values in arrays.items()}, index=index)
+
+
+def draw_full(data, symbol):
+    # 原 visualize_stock_data 的画法
+    daily_return = data['Close'].pct_change() * 100
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    axes[0, 0].plot(data.index, data['Close'], color='blue')
+    axes[0, 1].bar(data.index, data['Volume'], color='green', alpha=0.7)
+    sns.histplot(data['Close'], bins=30, kde=True, ax=axes[1, 0], color='purple')
+    sns.histplot(daily_return.dropna(), bins=50, kde=True, ax=axes[1, 1], color='red')
+    plt.tight_layout()
+    plt.show()
+
+
+def measure(draw, data):
+    t0 = time.perf_counter()
+    draw(data, 'SYN')
+    return time.perf_counter() - t0
+
+
+def run(bars_list, full_limit):
+    warnings.simplefilter('ignore')
+    # plt.show() 换成把当前图形渲染为PNG后关闭
+    plt.show = lambda: (plt.gcf().savefig(io.BytesIO(), format='png'), plt.close('all'))
+    lod = lambda data, symbol: day2.visualize_stock_data(data, symbol, StockAnalysis(data))
+
+    print(f"{'K线数':>10} {'原画法(s)':>10} {'降采样(s)':>10} {'加速比':>8}")
+    for n_bars in bars_list:
+        data = make_frame(n_bars)
+        lod_time = measure(lod, data)
+        if n_bars <= full_limit:
+            full_time = measure(draw_full, data)
+            print(f"{n_bars:>10} {full_time:>10.2f} {lod_time:>10.2f} {full_time / lod_time:>7.1f}x")
+        else:
+            print(f"{n_bars:>10} {'跳过':>10} {lod_time:>10.2f} {'':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bars', type=int, nargs='+', default=[5040, 100_000, 1_000_000])
+    parser.add_argument('--full-limit', type=int, default=100_000,
+                        help='超过这个长度时跳过原画法（每根K线一个柱子对象，太慢）')
+    args = parser.parse_args()
+    run(args.bars, args.full_limit)
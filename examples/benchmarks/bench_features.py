@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+特征矩阵构建的基准测试
+
+在模拟的多只股票日K线面板上测量 FeatureBuilder（默认特征集，float32 设计矩阵）：
+- 首次构建: 所有特征列都没有缓存
+- 缓存命中: 数据不变，新的构建器从缓存目录读取每一列
+- 追加一根K线: 与不用缓存完整重算比较，只计算新行，并检查两者结果一致
+- 时点检查: 用截取到某一行为止的数据重新计算该行，确认特征没有使用未来数据
+
+用法:
+    python benchmarks/bench_features.py --symbols 1000 --years 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from features import DEFAULT_FEATURES, FeatureBuilder, check_point_in_time, forward_returns
+from panel import Panel
+
+
+def truncate(panel, n_rows):
+    return Panel(panel.index[:n_rows], panel.symbols, {k: v[:n_rows] for k, v in panel.fields.items()})
+
+
+def timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t0, result
+
+
+def run(n_symbols, years):
+    panel = Panel.synthetic(n_symbols, 252 * years)
+    history = truncate(panel, len(panel.index) - 1)
+    cache_dir = tempfile.mkdtemp(prefix='features_')
+    try:
+        cold, _ = timed(lambda: FeatureBuilder(cache_dir=cache_dir).build(history))
+        cached_builder = FeatureBuilder(cache_dir=cache_dir)
+        cached, _ = timed(lambda: cached_builder.build(history))
+        assert cached_builder.stats['hits'] == len(DEFAULT_FEATURES)
+
+        extend_builder = FeatureBuilder(cache_dir=cache_dir)
+        extended, matrix = timed(lambda: extend_builder.build(panel))
+        assert extend_builder.stats['extends'] == len(DEFAULT_FEATURES)
+        full, reference = timed(lambda: FeatureBuilder().build(panel))
+        assert np.array_equal(np.isnan(matrix.values), np.isnan(reference.values))
+        assert np.allclose(matrix.values, reference.values, rtol=1e-5, atol=1e-6, equal_nan=True)
+    finally:
+        shutil.rmtree(cache_dir)
+
+    # 时点检查每一行都要重新构建，只在前 1000 个交易日上检查几行
+    sample = truncate(panel, min(len(panel.index), 1000))
+    rows = [len(sample.index) - 1 - k for k in (0, 21, 252) if k < len(sample.index)]
+    lookahead = check_point_in_time(DEFAULT_FEATURES, sample, rows)
+    leaked = [name for name, diff in lookahead.items() if diff > 1e-9]
+    long = matrix.to_long(forward_returns(panel, 5))
+
+    print(f"{n_symbols} 只股票 × {len(panel.index)} 个交易日，{len(matrix.names)} 个特征，"
+          f"设计矩阵 {matrix.values.nbytes / 1e6:.0f} MB（float32）\n")
+    print(f"{'方式':<24} {'耗时(s)':>10}")
+    print(f"{'首次构建':<24} {cold:>10.2f}")
+    print(f"{'缓存命中':<24} {cached:>10.2f}")
+    print(f"{'追加一根K线（增量）':<24} {extended:>10.2f}")
+    print(f"{'追加一根K线（完整重算）':<24} {full:>10.2f}")
+    print(f"\n时点检查: {'没有特征使用未来数据' if not leaked else '使用了未来数据: ' + ', '.join(leaked)}")
+    print(f"训练样本（5日远期收益率为标签，去掉NaN）: {len(long)} 行")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=20)
+    args = parser.parse_args()
+    run(args.symbols, args.years)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+分块（out-of-core）分析的内存基准测试
+
+把不同年数的分钟K线写入按月分区的 ColumnarStore，分别用两种方式计算日收益率、统计量、
+移动平均和月度收益率：
+- memory: 读取全部历史为DataFrame后计算（basic_data_analysis / time_series_analysis 的做法）
+- chunked: out_of_core.analyze_chunks 按分区逐块计算（ColumnarStore.iter_chunks）
+
+每种方式在独立的子进程中运行，记录耗时和 tracemalloc 分配峰值。全量加载的峰值随历史长度
+线性增长，分块计算的峰值基本不变。最后检查两种方式的结果一致。
+
+用法:
+    python benchmarks/bench_out_of_core.py --years 1 2 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from columnar_store import ColumnarStore
+from data_providers import make_synthetic_ohlcv
+from incremental_stats import RunningStats
+from indicators import SMA
+from out_of_core import analyze_chunks
+
+SYMBOL = 'BENCH'
+DATASET = '1m_adj'
+WINDOWS = (50, 200)
+
+
+def build_store(root, years):
+    store = ColumnarStore(root, partition='month')
+    start = pd.Timestamp('2015-01-01')
+    for year in range(years):
+        lo, hi = start + pd.DateOffset(years=year), start + pd.DateOffset(years=year + 1)
+        store.append(SYMBOL, make_synthetic_ohlcv(SYMBOL, lo, hi, freq='min', base_date=lo), DATASET)
+    return store
+
+
+def in_memory(root):
+    data = ColumnarStore(root).read(SYMBOL, dataset=DATASET)
+    close = data['Close']
+    daily_return = close.pct_change() * 100
+    averages = SMA(WINDOWS).run(close.to_numpy())
+    return {
+        'close': RunningStats().update_many(close).describe(),
+        'daily_return': RunningStats().update_many(daily_return).describe(),
+        'monthly_returns': close.resample('M').last().pct_change() * 100,
+        'last_ma': [averages[f'sma_{w}'][-1] for w in WINDOWS],
+    }
+
+
+def chunked(root):
+    last = {}
+
+    def keep_last(derived):
+        # 只保留最后一块的移动平均，用于和全量计算对比
+        last['ma'] = [derived[f'MA{w}'].iloc[-1] for w in WINDOWS]
+
+    chunks = ColumnarStore(root).iter_chunks(SYMBOL, dataset=DATASET, columns=['Close'])
+    result = analyze_chunks(chunks, WINDOWS, on_chunk=keep_last).summary()
+    result['last_ma'] = last['ma']
+    return result
+
+
+def _measure(args):
+    mode, root = args
+    warnings.simplefilter('ignore', FutureWarning)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = in_memory(root) if mode == 'memory' else chunked(root)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, result
+
+
+def _same(a, b):
+    stats_same = all(np.isclose(a[k][s], b[k][s], rtol=1e-9) for k in ('close', 'daily_return')
+                     for s in ('count', 'mean', 'std', 'min', 'max'))
+    return (stats_same and a['monthly_returns'].equals(b['monthly_returns'])
+            and np.allclose(a['last_ma'], b['last_ma'], rtol=1e-12))
+
+
+def run(years_list):
+    print(f"{'年数':>4} {'行数':>10} {'方式':>8} {'耗时(s)':>10} {'分配峰值(MB)':>14} {'结果一致':>8}")
+    ctx = mp.get_context('spawn')
+    for years in years_list:
+        with tempfile.TemporaryDirectory() as root:
+            store = build_store(root, years)
+            rows = sum(p['rows'] for p in store.info(SYMBOL, DATASET)['partitions'].values())
+            results = {}
+            for mode in ('memory', 'chunked'):
+                with ctx.Pool(1) as pool:
+                    results[mode] = pool.map(_measure, [(mode, root)])[0]
+            same = _same(results['memory'][2], results['chunked'][2])
+            for mode, (elapsed, peak, _) in results.items():
+                print(f"{years:>4} {rows:>10} {mode:>8} {elapsed:>10.2f} {peak:>14.1f} {str(same):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    run(args.years)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+参数扫描的并行加速基准测试
+
+在模拟面板数据上扫描均线交叉策略的参数网格（快线 × 慢线 × 交易成本），比较不同进程数下
+run_sweep 的耗时和加速比。价格放在共享内存中，子进程不复制数据。
+
+用法:
+    python benchmarks/bench_param_sweep.py --symbols 200 --years 10 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from backtest import TRADING_DAYS
+from panel import Panel
+from param_sweep import parameter_grid, run_sweep
+
+
+def run(n_symbols, years, workers_list, mp_context):
+    panel = Panel.synthetic(n_symbols, years * TRADING_DAYS)
+    grid = parameter_grid({
+        'fast': [5, 10, 20, 30, 50],
+        'slow': [100, 150, 200, 250],
+        'cost_bps': [0.0, 5.0, 10.0],
+    }, where=lambda p: p['fast'] < p['slow'])
+    print(f"{n_symbols} 只股票 × {years} 年，{len(grid)} 组参数，CPU核数 {os.cpu_count()}")
+    print(f"{'进程数':>6} {'耗时(s)':>10} {'参数组/秒':>10} {'加速比':>8}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in workers_list:
+            output = os.path.join(tmp, f'sweep_{workers}.jsonl')
+            t0 = time.perf_counter()
+            results, errors = run_sweep(panel, grid, output, max_workers=workers, mp_context=mp_context)
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            print(f"{workers:>6} {elapsed:>10.2f} {len(results) / elapsed:>10.2f} {baseline / elapsed:>8.2f}")
+            if errors:
+                print(f"失败: {errors}")
+
+    best = results.sort_values('sharpe', ascending=False).iloc[0]
+    print(f"\n夏普比率最高的参数: fast={best['fast']:g}, slow={best['slow']:g}, cost_bps={best['cost_bps']:g}, "
+          f"sharpe={best['sharpe']:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--mp-context', default=None, choices=['fork', 'spawn', 'forkserver'])
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.workers, args.mp_context)
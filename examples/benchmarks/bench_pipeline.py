@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+第二天脚本整条流程的基准测试套件
+
+用确定性的模拟数据源（SyntheticProvider，不需要网络）按 股票数 × 年数 × K线周期 生成数据，
+依次计时第二天脚本中的每个阶段：
+- get_stock_data（冷）: 缓存为空，从数据源获取并写入缓存
+- get_stock_data（热）: 再次获取，直接读取缓存
+- basic_data_analysis、visualize_stock_data、time_series_analysis、analyze_specific_timeframe
+  （图表使用 Agg 后端，plt.show() 换成渲染PNG后关闭图形，输出的文字被丢弃）
+
+每种规模在独立的子进程中运行。耗时在不开启 tracemalloc 的情况下测量；之后再对前 --memory-symbols
+只股票重跑每个阶段，用 tracemalloc 记录单只股票的内存分配峰值。绘图阶段只计时前 --plot-limit 只股票，
+再按比例外推到全部股票。
+
+结果追加到 JSON Lines 格式的历史文件（每次运行每种规模一行，包括 git 版本和软件版本），并与历史中
+同一规模的上一次结果比较，耗时或内存超过 --tolerance 的阶段标记为回退；--check 时有回退则以状态码1退出。
+
+用法:
+    python benchmarks/bench_pipeline.py --symbols 1 100 1000 --years 3 --interval 1d
+    python benchmarks/bench_pipeline.py --symbols 10 --years 1 --interval 5m --check
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_history.jsonl')
+
+# K线周期 -> 模拟数据源的频率
+FREQUENCIES = {'1d': 'B', '1h': 'h', '5m': '5min', '1m': 'min'}
+
+STAGES = ['get_stock_data（冷）', 'get_stock_data（热）', 'basic_data_analysis', 'visualize_stock_data',
+          'time_series_analysis', 'analyze_specific_timeframe']
+PLOT_STAGES = {'visualize_stock_data', 'time_series_analysis', 'analyze_specific_timeframe'}
+
+
+def _load_pipeline():
+    # 在子进程中导入：先切换到 Agg 后端，再导入会使用 pyplot 的第二天脚本
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.show = lambda: (plt.gcf().savefig(io.BytesIO(), format='png'), plt.close('all'))
+    return importlib.import_module('2_day2_stock_data_processing')
+
+
+def _stage_calls(day2, cache_dir, years, interval):
+    import pandas as pd
+    from data_cache import OHLCVCache
+    from data_providers import SyntheticProvider
+
+    period = f'{years}y'
+    # 价格路径从区间开始前不久开始生成，避免日内频率下生成大量用不到的数据
+    base_date = (pd.Timestamp.now() - pd.DateOffset(years=years, days=10)).strftime('%Y-%m-%d')
+    provider = SyntheticProvider(freq=FREQUENCIES[interval], base_date=base_date)
+    cache = OHLCVCache(cache_dir, provider=provider)
+    frames = {}
+
+    def fetch(symbol):
+        frames[symbol] = day2.get_stock_data(symbol, period, cache=cache, interval=interval)
+
+    def timeframe(symbol):
+        data = frames[symbol]
+        end = data.index[-1]
+        start = max(data.index[0], end - pd.Timedelta(days=365))
+        day2.analyze_specific_timeframe(data, symbol, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+
+    return frames, {
+        'get_stock_data（冷）': fetch,
+        'get_stock_data（热）': fetch,
+        'basic_data_analysis': lambda symbol: day2.basic_data_analysis(frames[symbol]),
+        'visualize_stock_data': lambda symbol: day2.visualize_stock_data(frames[symbol], symbol),
+        'time_series_analysis': lambda symbol: day2.time_series_analysis(frames[symbol], symbol),
+        'analyze_specific_timeframe': timeframe,
+    }
+
+
+def _measure(args):
+    n_symbols, years, interval, plot_limit, memory_symbols = args
+    warnings.simplefilter('ignore')
+    day2 = _load_pipeline()
+    symbols = [f'SYM{i:05d}' for i in range(n_symbols)]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as cache_dir, contextlib.redirect_stdout(io.StringIO()):
+        frames, calls = _stage_calls(day2, cache_dir, years, interval)
+        for stage in STAGES:
+            subset = symbols[:plot_limit] if stage in PLOT_STAGES else symbols
+            t0 = time.perf_counter()
+            for symbol in subset:
+                calls[stage](symbol)
+            elapsed = time.perf_counter() - t0
+            results[stage] = {'seconds': elapsed * n_symbols / len(subset), 'measured_symbols': len(subset)}
+        n_rows = len(frames[symbols[0]])
+
+    # 内存单独测量：tracemalloc 会让分配密集的代码慢好几倍；冷缓存阶段使用新的缓存目录
+    with tempfile.TemporaryDirectory() as cache_dir, contextlib.redirect_stdout(io.StringIO()):
+        _, calls = _stage_calls(day2, cache_dir, years, interval)
+        for stage in STAGES:
+            peak = 0
+            for symbol in symbols[:memory_symbols]:
+                tracemalloc.start()
+                calls[stage](symbol)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            results[stage]['peak_mb'] = peak / 2 ** 20
+    return n_rows, results
+
+
+def _environment():
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.node(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_history(path):
+    """
+    读取历史记录，跳过中断时写了一半的行
+
+    参数:
+        path (str): 历史文件路径（JSON Lines）
+
+    返回:
+        list[dict]: 按写入顺序排列的记录
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def compare(record, previous, tolerance):
+    """
+    与上一次同一规模的结果比较
+
+    参数:
+        record (dict): 本次结果
+        previous (dict | None): 上一次结果
+        tolerance (float): 允许的相对增长，例如 0.25 表示慢25%以内不算回退
+
+    返回:
+        list[str]: 回退的阶段和指标
+    """
+    if previous is None:
+        return []
+    regressions = []
+    for stage, result in record['stages'].items():
+        before = previous['stages'].get(stage)
+        if before is None:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if before[metric] > 0 and result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{stage} {metric}: {before[metric]:.3f} -> {result[metric]:.3f}")
+    return regressions
+
+
+def run(symbols_list, years, interval, plot_limit, memory_symbols, history, tolerance, check):
+    records = load_history(history)
+    environment = _environment()
+    ctx = mp.get_context('spawn')
+    all_regressions = []
+    for n_symbols in symbols_list:
+        with ctx.Pool(1) as pool:
+            n_rows, stages = pool.map(_measure, [(n_symbols, years, interval, plot_limit, memory_symbols)])[0]
+        config = {'symbols': n_symbols, 'years': years, 'interval': interval}
+        record = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'config': config, 'rows_per_symbol': n_rows,
+                  'environment': environment, 'stages': stages}
+        previous = next((r for r in reversed(records) if r.get('config') == config), None)
+        regressions = compare(record, previous, tolerance)
+        all_regressions += regressions
+
+        print(f"\n{n_symbols} 只股票 × {years} 年 {interval} K线（每只 {n_rows} 根）")
+        print(f"{'阶段':<28} {'耗时(s)':>10} {'每只(ms)':>10} {'内存峰值(MB)':>14} {'上次耗时(s)':>12}")
+        for stage, result in stages.items():
+            before = previous['stages'].get(stage, {}).get('seconds') if previous else None
+            before = '-' if before is None else f'{before:.2f}'
+            extrapolated = '*' if result['measured_symbols'] < n_symbols else ' '
+            print(f"{stage:<28} {result['seconds']:>9.2f}{extrapolated} {result['seconds'] / n_symbols * 1000:>10.1f} "
+                  f"{result['peak_mb']:>14.1f} {before:>12}")
+        for regression in regressions:
+            print(f"回退: {regression}")
+
+        records.append(record)
+        with open(history, 'a') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    if max(symbols_list) > plot_limit:
+        print(f"\n* 按 {plot_limit} 只股票外推")
+    print(f"结果已追加到 {history}")
+    if check and all_regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--interval', choices=list(FREQUENCIES), default='1d')
+    parser.add_argument('--plot-limit', type=int, default=10, help='绘图阶段只计时这么多只股票，再按比例外推')
+    parser.add_argument('--memory-symbols', type=int, default=1, help='测量内存峰值的股票数')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='历史结果文件（JSON Lines）')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='超过上次结果这个比例视为回退')
+    parser.add_argument('--check', action='store_true', help='有回退时以状态码1退出')
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.interval, args.plot_limit, args.memory_symbols, args.history,
+        args.tolerance, args.check)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+批量报告生成基准测试
+
+为多只模拟股票生成第一天/第二天脚本中的四组图表（收盘价走势、四宫格、移动平均线、K线图），比较：
+- pyplot: 直接调用 plot_stock_price、visualize_stock_data、time_series_analysis、
+  analyze_specific_timeframe，把 plt.show() 换成保存PNG并关闭图形，每只股票都重新创建图形
+- 模板: ReportRenderer 复用图表模板，股票之间只更新图形数据
+- 模板 + 多进程: generate_reports 在多个 Agg 子进程中并行生成
+
+用法:
+    python benchmarks/bench_reports.py --symbols 24 --years 3 --workers 1 4
+"""
+import argparse
+import contextlib
+import functools
+import importlib
+import io
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import StockAnalysis
+from data_providers import make_synthetic_ohlcv
+from reports import ReportRenderer, generate_reports
+
+day1 = importlib.import_module('1_day1_stock_data')
+day2 = importlib.import_module('2_day2_stock_data_processing')
+
+
+def generate_with_pyplot(symbols, load, output_dir):
+    saved = []
+
+    def save_and_close():
+        path = os.path.join(output_dir, f'{len(saved)}.png')
+        plt.savefig(path)
+        plt.close('all')
+        saved.append(path)
+
+    show = plt.show
+    plt.show = save_and_close
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for symbol in symbols:
+                data = load(symbol)
+                analysis = StockAnalysis(data, symbol)
+                day1.plot_stock_price(data)
+                day2.visualize_stock_data(data, symbol, analysis)
+                day2.time_series_analysis(data, symbol, analysis)
+                start = (data.index[-1] - day2.pd.Timedelta(days=365)).strftime('%Y-%m-%d')
+                day2.analyze_specific_timeframe(data, symbol, start, data.index[-1].strftime('%Y-%m-%d'))
+    finally:
+        plt.show = show
+    return saved
+
+
+def generate_with_templates(symbols, load, output_dir, formats):
+    renderer = ReportRenderer(formats=formats)
+    return [renderer.render(load(symbol), symbol, output_dir) for symbol in symbols]
+
+
+def run(n_symbols, years, workers_list):
+    warnings.simplefilter('ignore')
+    start = f'{2024 - years}-01-02'
+    load = functools.partial(make_synthetic_ohlcv, start=start, end='2024-01-01', base_date=start)
+    symbols = [f'SYM{i:04d}' for i in range(n_symbols)]
+    print(f"{n_symbols} 只股票 × {years} 年日K线，每只4张图，CPU核数 {os.cpu_count()}")
+    print(f"{'方式':>22} {'格式':>14} {'耗时(s)':>10} {'报告/分钟':>10}")
+
+    def report(name, formats, elapsed):
+        print(f"{name:>22} {formats:>14} {elapsed:>10.2f} {n_symbols / elapsed * 60:>10.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        generate_with_pyplot(symbols, load, tmp)
+        report('pyplot', 'png', time.perf_counter() - t0)
+
+        for formats in [('png',), ('png', 'svg', 'html')]:
+            t0 = time.perf_counter()
+            generate_with_templates(symbols, load, os.path.join(tmp, 'templates'), formats)
+            report('模板', '+'.join(formats), time.perf_counter() - t0)
+
+        for workers in workers_list:
+            t0 = time.perf_counter()
+            files, errors = generate_reports(symbols, load, os.path.join(tmp, f'workers_{workers}'),
+                                             formats=('png', 'html'), max_workers=workers)
+            assert not errors, errors
+            report(f'模板 + {workers}个进程', 'png+html', time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=24)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.workers)
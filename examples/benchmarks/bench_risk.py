@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+组合风险分析的基准测试
+
+在模拟的多只股票日收益率上测量 risk 模块各项计算的耗时：
+- 滚动协方差矩阵: 每天用 np.cov 重新计算窗口协方差，与 RollingCovariance 增量更新（每天一次秩2更新，
+  或每周一次批量更新）比较每个时间点的平均耗时，并检查结果一致
+- 组合波动率: 权重每天变化时，逐日计算 sqrt(w' Σ w) 与 portfolio_volatility 的批量矩阵乘法比较
+- 全部股票的滚动贝塔、滚动历史/正态 VaR 与 CVaR、回撤
+
+逐日重算的方法只计时 --sample 个时间点，再按比例外推到全部时间点。
+
+用法:
+    python benchmarks/bench_risk.py --symbols 2000 --years 5 --window 252
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data_providers import make_synthetic_arrays
+from risk import (RollingCovariance, drawdown, historical_var, parametric_var, portfolio_volatility,
+                  rolling_beta)
+
+
+def make_returns(n_symbols, n_rows):
+    close = make_synthetic_arrays(n_rows + 1, n_symbols)['Close']
+    return close[1:] / close[:-1] - 1
+
+
+def timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t0, result
+
+
+def run(n_symbols, years, window, sample):
+    returns = make_returns(n_symbols, 252 * years)
+    n_rows = len(returns)
+    days = range(window, window + sample)
+    n_windows = n_rows - window + 1
+
+    # 滚动协方差：每个时间点的平均耗时
+    recompute, reference = timed(lambda: [np.cov(returns[t - window + 1:t + 1].T) for t in days])
+    tracker = RollingCovariance(window)
+    tracker.update(returns[:window])
+
+    def daily():
+        for t in days:
+            tracker.update(returns[t])
+            cov = tracker.cov()
+        return cov
+
+    incremental, cov = timed(daily)
+    assert np.allclose(cov, reference[-1], rtol=1e-8, atol=1e-14)
+    weekly_tracker = RollingCovariance(window)
+    weekly_tracker.update(returns[:window])
+
+    def weekly():
+        for start in range(window, window + sample, 5):
+            weekly_tracker.update(returns[start:start + 5])
+            cov = weekly_tracker.cov()
+        return cov
+
+    batched, _ = timed(weekly)
+
+    # 权重每天变化的组合波动率
+    weights = np.random.default_rng(0).dirichlet(np.ones(n_symbols), n_rows)
+    naive_pvol, naive = timed(lambda: [np.sqrt(weights[t] @ np.cov(returns[t - window + 1:t + 1].T) @ weights[t])
+                                       for t in days])
+    batch_pvol, pvol = timed(lambda: portfolio_volatility(returns, weights, window))
+    assert np.allclose(pvol[window:window + sample], naive)
+
+    benchmark = returns.mean(axis=1)
+    beta_time, _ = timed(lambda: rolling_beta(returns, benchmark, window))
+    hvar_time, _ = timed(lambda: historical_var(returns, 0.05, window))
+    pvar_time, _ = timed(lambda: parametric_var(returns, 0.05, window))
+    dd_time, _ = timed(lambda: drawdown(returns))
+
+    print(f"{n_symbols} 只股票 × {n_rows} 个交易日，窗口 {window}，共 {n_windows} 个滚动窗口\n")
+    print(f"{'滚动协方差矩阵':<28} {'每个时间点(ms)':>14} {'全部窗口(s)':>12}")
+    for name, seconds in (('np.cov 逐日重算', recompute), ('增量更新（每天）', incremental),
+                          ('增量更新（每周一批）', batched)):
+        per_day = seconds / sample
+        print(f"{name:<28} {per_day * 1000:>14.1f} {per_day * n_windows:>12.1f}")
+
+    print(f"\n{'全部股票、全部时间点':<28} {'耗时(s)':>10}")
+    print(f"{'组合波动率（逐日 w Σ w）':<28} {naive_pvol / sample * n_windows:>10.2f}  （外推）")
+    print(f"{'组合波动率（批量）':<28} {batch_pvol:>10.2f}")
+    print(f"{'滚动贝塔':<28} {beta_time:>10.2f}")
+    print(f"{'滚动历史 VaR/CVaR':<28} {hvar_time:>10.2f}")
+    print(f"{'滚动正态 VaR/CVaR':<28} {pvar_time:>10.2f}")
+    print(f"{'回撤与最大回撤':<28} {dd_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--window', type=int, default=252)
+    parser.add_argument('--sample', type=int, default=20, help='逐日方法计时的时间点数')
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.window, args.sample)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+横截面筛选器的基准测试
+
+在模拟的多只股票日K线面板上，用几十条规则（均线突破、放量、新高新低、动量排名等）筛选最新一根K线，比较：
+- per-symbol pandas: 每只股票单独用 pandas 计算各条规则（按 --per-symbol-limit 只股票外推）
+- 逐条规则: Screener 每次只计算一条规则，不共用子表达式
+- 合并求值: 所有规则一次求值，相同的子表达式（例如 ma(close, 200)）只计算一次
+- 全部历史: 合并求值所有行（例如用于回测信号），而不只是最新一根K线
+
+并检查各种方式在最新一根K线上的结果一致。
+
+用法:
+    python benchmarks/bench_screener.py --symbols 5000 --years 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from panel import Panel
+from screener import Screener
+
+
+def make_rules():
+    rules = {}
+    for w in (20, 50, 100, 200):
+        rules[f'above_ma{w}'] = f'close > ma(close, {w})'
+        rules[f'cross_ma{w}'] = f'crossed_above(close, ma(close, {w}))'
+        rules[f'cross_ma{w}_volume'] = f'crossed_above(close, ma(close, {w})) and volume > ma(volume, 20)'
+        rules[f'high_{w}'] = f'close >= highest(close, {w})'
+        rules[f'low_{w}'] = f'close <= lowest(close, {w})'
+        rules[f'momentum_{w}'] = f'rank(ret(close, {w})) > 0.9'
+    rules.update({
+        'golden_cross': 'crossed_above(ma(close, 50), ma(close, 200))',
+        'death_cross': 'crossed_below(ma(close, 50), ma(close, 200))',
+        'volume_spike': 'volume > 2 * ma(volume, 20)',
+        'low_volatility': 'std(ret(close), 20) < 0.02',
+        'wide_range': '(high - low) / close > 0.05',
+        'uptrend': 'ret(ma(close, 50), 5) > 0 and close > ma(close, 200)',
+    })
+    return rules
+
+
+def pandas_rules(data):
+    # 单只股票的 pandas 写法，与 make_rules 中的规则一一对应
+    close, volume = data['Close'], data['Volume']
+    volume_up = volume > volume.rolling(20).mean()
+    out = {}
+    for w in (20, 50, 100, 200):
+        ma = close.rolling(w).mean()
+        cross = (close > ma) & (close.shift() <= ma.shift())
+        out[f'above_ma{w}'] = close > ma
+        out[f'cross_ma{w}'] = cross
+        out[f'cross_ma{w}_volume'] = cross & volume_up
+        out[f'high_{w}'] = close >= close.rolling(w).max()
+        out[f'low_{w}'] = close <= close.rolling(w).min()
+        out[f'momentum_{w}'] = close.pct_change(w, fill_method=None)
+    ma50, ma200 = close.rolling(50).mean(), close.rolling(200).mean()
+    out['golden_cross'] = (ma50 > ma200) & (ma50.shift() <= ma200.shift())
+    out['death_cross'] = (ma50 < ma200) & (ma50.shift() >= ma200.shift())
+    out['volume_spike'] = volume > 2 * volume.rolling(20).mean()
+    out['low_volatility'] = close.pct_change(fill_method=None).rolling(20).std() < 0.02
+    out['wide_range'] = (data['High'] - data['Low']) / close > 0.05
+    out['uptrend'] = (ma50.pct_change(5, fill_method=None) > 0) & (close > ma200)
+    return {name: series.iloc[-1] for name, series in out.items()}
+
+
+def run(n_symbols, years, per_symbol_limit):
+    panel = Panel.synthetic(n_symbols, 252 * years)
+    rules = make_rules()
+    screener = Screener(rules)
+
+    subset = panel.symbols[:per_symbol_limit]
+    t0 = time.perf_counter()
+    per_symbol = pd.DataFrame({symbol: pandas_rules(panel.symbol_frame(symbol)) for symbol in subset}).T
+    loop_time = (time.perf_counter() - t0) * n_symbols / len(subset)
+    # 动量排名需要全部股票，逐只计算时只能得到收益率，排名在最后补上
+    returns = {w: panel['Close'][-1] / panel['Close'][-1 - w] - 1 for w in (20, 50, 100, 200)}
+
+    t0 = time.perf_counter()
+    separate = {name: screener.evaluate(panel, names=[name])[name] for name in rules}
+    separate_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    latest = screener.evaluate(panel)
+    shared_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    history = screener.evaluate(panel, rows=None)
+    history_time = time.perf_counter() - t0
+
+    for name in rules:
+        assert np.array_equal(separate[name][-1], latest[name][-1])
+        assert np.array_equal(history[name][-1], latest[name][-1])
+        if name.startswith('momentum'):
+            expected = panel.rank(returns[int(name.split('_')[1])][None, :], pct=True)[0, :len(subset)] > 0.9
+        else:
+            expected = per_symbol[name].to_numpy(dtype=bool)
+        assert np.array_equal(latest[name][-1][:len(subset)], expected), name
+
+    print(f"{n_symbols} 只股票 × {len(panel.index)} 个交易日，{len(rules)} 条规则："
+          f"{screener.stats['references']} 个表达式节点，合并相同子表达式后 {screener.stats['nodes']} 个\n")
+    print(f"{'方式':<24} {'耗时(s)':>10}")
+    print(f"{'逐只 pandas':<24} {loop_time:>10.2f}"
+          + (f"  （按 {len(subset)} 只股票外推）" if len(subset) < n_symbols else ''))
+    print(f"{'逐条规则':<24} {separate_time:>10.2f}")
+    print(f"{'合并求值（最新K线）':<24} {shared_time:>10.2f}")
+    print(f"{'合并求值（全部历史）':<24} {history_time:>10.2f}")
+    counts = {name: int(np.sum(value[-1])) for name, value in latest.items()}
+    print("\n最新K线满足各条规则的股票数:")
+    print(pd.Series(counts).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--per-symbol-limit', type=int, default=200,
+                        help='逐只 pandas 的方式只计时这么多只股票，再按比例外推')
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.per_symbol_limit)
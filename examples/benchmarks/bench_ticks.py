@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+逐笔数据合成K线的基准测试
+
+分块生成模拟逐笔成交（默认1亿笔），用 BarResampler 合成1分钟K线，记录耗时、tracemalloc
+分配峰值和常驻内存（RSS）峰值；内存只取决于块大小，与总笔数无关。另外在第一块数据上
+与 pandas 的 resample().ohlc() 对比单块的速度，并检查结果一致。
+
+用法:
+    python benchmarks/bench_ticks.py --ticks 100000000 --chunksize 2000000 --freq 1min
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ticks import BarResampler, make_synthetic_ticks, resample_ticks
+
+
+def _rss_mb():
+    # Linux 上 ru_maxrss 的单位是KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def compare_with_pandas(chunk, freq):
+    index = pd.DatetimeIndex(chunk['timestamp'].view('datetime64[ns]')).tz_localize('UTC')
+    t0 = time.perf_counter()
+    price = pd.Series(chunk['price'], index=index)
+    expected = price.resample(freq).ohlc()
+    expected['volume'] = pd.Series(chunk['size'], index=index).resample(freq).sum()
+    expected = expected.dropna()
+    pandas_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bars = resample_ticks(chunk, freq=freq)
+    kernel_time = time.perf_counter() - t0
+    same = np.allclose(bars[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(), expected.to_numpy())
+    return pandas_time, kernel_time, same
+
+
+def run(n_ticks, chunksize, freq):
+    rss_before = _rss_mb()
+    tracemalloc.start()
+    resampler = BarResampler(freq=freq, tz='America/New_York')
+    generate_time = resample_time = 0.0
+    n_bars = 0
+    chunks = make_synthetic_ticks(n_ticks, chunksize=chunksize)
+    while True:
+        t0 = time.perf_counter()
+        chunk = next(chunks, None)
+        generate_time += time.perf_counter() - t0
+        if chunk is None:
+            break
+        t0 = time.perf_counter()
+        n_bars += len(resampler.update(chunk))
+        resample_time += time.perf_counter() - t0
+    n_bars += len(resampler.flush())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{'笔数':>12} {'K线数':>8} {'生成(s)':>8} {'合成(s)':>8} {'笔/秒(合成)':>14} "
+          f"{'分配峰值(MB)':>12} {'RSS增长(MB)':>12}")
+    print(f"{n_ticks:>12} {n_bars:>8} {generate_time:>8.1f} {resample_time:>8.1f} "
+          f"{n_ticks / resample_time:>14.0f} {peak / 2 ** 20:>12.1f} {_rss_mb() - rss_before:>12.1f}")
+
+    # 放在最后，避免 pandas 的内存峰值影响上面的 RSS 统计
+    first = next(make_synthetic_ticks(min(chunksize, n_ticks), chunksize=chunksize))
+    pandas_time, kernel_time, same = compare_with_pandas(first, freq)
+    print(f"\n单块 {len(first['price'])} 笔: pandas {pandas_time:.3f}s，分段归约 {kernel_time:.3f}s，结果一致: {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type=int, default=100_000_000)
+    parser.add_argument('--chunksize', type=int, default=2_000_000)
+    parser.add_argument('--freq', default='1min')
+    args = parser.parse_args()
+    run(args.ticks, args.chunksize, args.freq)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+交易日历的区间截取和对齐基准测试
+
+对多只股票（各自缺少随机的一些交易日）比较：
+- 区间截取: 逐只股票 data.loc['开始日期':'结束日期'] 与 TradingCalendar.slice_many（边界只换算一次，
+  每只股票在 int64 时间戳上做两次二分查找）
+- 对齐: Panel.from_frames（取所有股票时间索引的并集）与 TradingCalendar.align（拼接后一次二分查找，
+  按字段整体写入）
+
+截取的时间段按交易日历取最近 --sessions 个交易日，多次重复取平均。
+
+用法:
+    python benchmarks/bench_trading_calendar.py --symbols 500 --years 20 --sessions 252
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data_providers import make_synthetic_arrays
+from panel import Panel
+from trading_calendar import nyse_calendar
+
+
+def make_frames(calendar, n_symbols, years):
+    # 每只股票使用日历中的交易日，随机去掉约2%的日期（停牌或数据缺失）
+    sessions = calendar.sessions_between(calendar.offset(pd.Timestamp.now(), -252 * years), pd.Timestamp.now())
+    arrays = make_synthetic_arrays(len(sessions), n_symbols)
+    rng = np.random.default_rng(0)
+    frames = {}
+    for j in range(n_symbols):
+        keep = rng.random(len(sessions)) > 0.02
+        frames[f'S{j:04d}'] = pd.DataFrame({field: values[keep, j] for field, values in arrays.items()},
+                                           index=sessions[keep])
+    return frames
+
+
+def timed(func, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - t0) / repeat, result
+
+
+def run(n_symbols, years, n_sessions, repeat):
+    calendar = nyse_calendar()
+    frames = make_frames(calendar, n_symbols, years)
+    first, last = calendar.trailing(n_sessions)
+    start, end = first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')
+
+    loc_time, by_loc = timed(lambda: {s: data.loc[start:end] for s, data in frames.items()}, repeat)
+    cal_time, by_cal = timed(lambda: calendar.slice_many(frames, start, end), repeat)
+    assert all(by_loc[s].index.equals(by_cal[s].index) for s in frames)
+
+    union_time, union_panel = timed(lambda: Panel.from_frames(frames), 1)
+    align_time, aligned = timed(lambda: calendar.align(frames), 1)
+    np.testing.assert_array_equal(union_panel['Close'], aligned['Close'])
+
+    # 不带时区的日K线索引按交易所时区的日期处理，结果与带时区时相同
+    naive = {s: data.tz_localize(None) for s, data in frames.items()}
+    by_naive = calendar.slice_many(naive, start, end)
+    assert all(by_naive[s].index.equals(naive[s].loc[start:end].index) for s in frames)
+    assert all(calendar.slice(naive[s], start, end).index.equals(by_naive[s].index) for s in frames)
+    np.testing.assert_array_equal(calendar.align(naive)['Close'], aligned['Close'])
+
+    print(f"{n_symbols} 只股票 × {years} 年日K线，截取最近 {n_sessions} 个交易日（{start} 至 {end}）\n")
+    print(f"{'操作':<24} {'原方法(ms)':>12} {'交易日历(ms)':>12} {'加速比':>8}")
+    print(f"{'区间截取':<24} {loc_time * 1000:>12.1f} {cal_time * 1000:>12.1f} {loc_time / cal_time:>7.1f}x")
+    print(f"{'对齐为面板':<24} {union_time * 1000:>12.1f} {align_time * 1000:>12.1f} {union_time / align_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=252, help='截取最近多少个交易日')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.symbols, args.years, args.sessions, args.repeat)
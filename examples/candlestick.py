@@ -0,0 +1,79 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+
+from instrumentation import count, traced
+
+
+def date_to_num(index):
+    """
+    把 DatetimeIndex 向量化地转换为 matplotlib 的日期数值
+
+    带时区的索引按当地时间（而不是UTC）转换，这样日线K线正好落在当天的刻度上。
+
+    参数:
+        index (pd.DatetimeIndex): 日期索引
+
+    返回:
+        np.ndarray: matplotlib 日期数值
+    """
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return mdates.date2num(index.values)
+
+
+def candlestick_segments(data, up_color='green', down_color='red'):
+    """
+    计算K线图的影线、实体线段和颜色，供 plot_candlestick 和需要原地更新图形的模板使用
+
+    参数:
+        data (pd.DataFrame): 包含 Open/High/Low/Close 列、以日期为索引的数据
+        up_color (str): 上涨（收盘价 >= 开盘价）K线的颜色
+        down_color (str): 下跌K线的颜色
+
+    返回:
+        tuple: (影线线段, 实体线段, 颜色)，线段形状为 (K线数, 2个端点, 2个坐标)
+    """
+    x = date_to_num(data.index)
+    open_ = data['Open'].to_numpy(dtype=float)
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+    close = data['Close'].to_numpy(dtype=float)
+
+    colors = np.where(close >= open_, up_color, down_color)
+
+    wick_segments = np.stack([np.column_stack([x, low]), np.column_stack([x, high])], axis=1)
+    body_segments = np.stack([np.column_stack([x, open_]), np.column_stack([x, close])], axis=1)
+    return wick_segments, body_segments, colors
+
+
+@traced
+def plot_candlestick(ax, data, up_color='green', down_color='red', body_width=4, wick_width=1):
+    """
+    用两个 LineCollection 绘制K线图
+
+    所有影线放在一个集合里，所有实体放在另一个集合里，颜色由向量化的涨跌掩码决定，
+    因此无论多少根K线都只创建两个图形对象，适合绘制数万根K线。
+
+    参数:
+        ax (matplotlib.axes.Axes): 绘图的坐标轴
+        data (pd.DataFrame): 包含 Open/High/Low/Close 列、以日期为索引的数据
+        up_color (str): 上涨（收盘价 >= 开盘价）K线的颜色
+        down_color (str): 下跌K线的颜色
+        body_width (float): 实体线宽
+        wick_width (float): 影线线宽
+
+    返回:
+        tuple: (影线集合, 实体集合)
+    """
+    wick_segments, body_segments, colors = candlestick_segments(data, up_color, down_color)
+
+    wicks = LineCollection(wick_segments, colors=colors, linewidths=wick_width)
+    bodies = LineCollection(body_segments, colors=colors, linewidths=body_width)
+    ax.add_collection(wicks)
+    ax.add_collection(bodies)
+    count('candles_drawn', len(data))
+
+    ax.xaxis_date()
+    ax.autoscale_view()
+    return wicks, bodies
@@ -0,0 +1,317 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Adj Close')
+INT_COLUMNS = ('Volume',)
+
+PARTITIONS = ('year', 'month', 'day')
+
+
+class ColumnarStore:
+    """
+    按列存储的OHLCV数据仓库
+
+    目录结构为 root/股票代码/数据集/分区/列名.npy，数据集通常是K线周期和复权方式（例如 '1d_raw'），
+    分区按年（或月、日）划分。时间戳保存为 int64 的UTC纳秒，价格列为 float32 或 float64，
+    成交量为 int64。每个数据集有一个 manifest.json 记录各分区的行数和首尾时间戳。
+
+    读取时只打开与请求区间重叠的分区，并以内存映射（mmap）方式读取，通过对时间戳二分查找
+    定位区间，只有被切片的部分会被复制到内存，因此截取一小段数据不需要加载全部历史。
+
+    参数:
+        root (str): 仓库根目录
+        partition (str): 分区粒度，'year'、'month' 或 'day'
+        price_dtype (str): 价格列的数据类型，'float64' 或 'float32'
+    """
+
+    def __init__(self, root, partition='year', price_dtype='float64'):
+        if partition not in PARTITIONS:
+            raise ValueError(f"未知的分区粒度: {partition}")
+        self.root = root
+        self.partition = partition
+        self.price_dtype = np.dtype(price_dtype)
+        self.stats = {'partitions_read': 0, 'bytes_read': 0, 'bytes_written': 0}
+
+    def info(self, symbol, dataset='1d'):
+        """
+        读取数据集的清单
+
+        参数:
+            symbol (str): 股票代码
+            dataset (str): 数据集名称
+
+        返回:
+            dict | None: 清单，数据集不存在时返回 None
+        """
+        path = os.path.join(self._dataset_dir(symbol, dataset), 'manifest.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def bounds(self, symbol, dataset='1d'):
+        """
+        返回数据集第一根和最后一根K线的时间
+
+        参数:
+            symbol (str): 股票代码
+            dataset (str): 数据集名称
+
+        返回:
+            tuple: (第一根K线时间, 最后一根K线时间)，数据集为空或不存在时为 (None, None)
+        """
+        manifest = self.info(symbol, dataset)
+        if not manifest or not manifest['partitions']:
+            return None, None
+        parts = manifest['partitions'].values()
+        first = pd.Timestamp(min(p['first'] for p in parts), tz='UTC').tz_convert(manifest['tz'])
+        last = pd.Timestamp(max(p['last'] for p in parts), tz='UTC').tz_convert(manifest['tz'])
+        return first, last
+
+    def write(self, symbol, data, dataset='1d'):
+        """
+        用 data 覆盖整个数据集
+
+        参数:
+            symbol (str): 股票代码
+            data (pd.DataFrame): 以 DatetimeIndex 为索引的历史数据
+            dataset (str): 数据集名称
+        """
+        path = self._dataset_dir(symbol, dataset)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        self.append(symbol, data, dataset)
+
+    def append(self, symbol, data, dataset='1d'):
+        """
+        把新数据合并进数据集，只重写受影响的分区；时间戳重复时以新数据为准
+
+        参数:
+            symbol (str): 股票代码
+            data (pd.DataFrame): 以 DatetimeIndex 为索引的历史数据
+            dataset (str): 数据集名称
+        """
+        path = self._dataset_dir(symbol, dataset)
+        manifest = self.info(symbol, dataset) or {
+            'tz': str(data.index.tz or 'UTC'),
+            'index_name': data.index.name,
+            'partition': self.partition,
+            'columns': {},
+            'partitions': {},
+        }
+        if data.empty:
+            if not os.path.isdir(path):
+                self._write_manifest(path, manifest)
+            return
+
+        index = data.index if data.index.tz is not None else data.index.tz_localize(manifest['tz'])
+        for column in data.columns:
+            manifest['columns'].setdefault(column, self._dtype_for(column).str)
+
+        codes = _partition_codes(index.tz_convert(manifest['tz']), manifest['partition'])
+        timestamps = index.tz_convert('UTC').asi8
+        for code in pd.unique(codes):
+            mask = codes == code
+            key = _partition_key(code, manifest['partition'])
+            part = {column: data[column].to_numpy()[mask] for column in data.columns}
+            part_ts = timestamps[mask]
+            if key in manifest['partitions']:
+                part_ts, part = self._merge_partition(path, key, manifest, part_ts, part)
+            manifest['partitions'][key] = self._write_partition(path, key, manifest, part_ts, part)
+
+        self._write_manifest(path, manifest)
+
+    def read_arrays(self, symbol, start=None, end=None, dataset='1d', columns=None):
+        """
+        以数组形式读取 [start, end) 区间的数据
+
+        只有一个分区与区间重叠时，返回的是内存映射文件的切片，不复制数据。
+
+        参数:
+            symbol (str): 股票代码
+            start (str | datetime | None): 开始时间
+            end (str | datetime | None): 结束时间（不包含）
+            dataset (str): 数据集名称
+            columns (list[str] | None): 需要的列，None 表示全部
+
+        返回:
+            tuple: (int64 UTC纳秒时间戳数组, {列名: 数组}, 清单)
+        """
+        manifest = self.info(symbol, dataset)
+        if manifest is None:
+            raise KeyError(f"{symbol}/{dataset} 不存在")
+        columns = list(manifest['columns']) if columns is None else list(columns)
+        lo = None if start is None else _to_utc_ns(start, manifest['tz'])
+        hi = None if end is None else _to_utc_ns(end, manifest['tz'])
+
+        path = self._dataset_dir(symbol, dataset)
+        ts_parts, col_parts = [], {column: [] for column in columns}
+        for key in _overlapping_partitions(manifest, lo, hi):
+            ts, values = self._read_partition(path, key, manifest, lo, hi, columns)
+            ts_parts.append(ts)
+            for column in columns:
+                col_parts[column].append(values[column])
+
+        if len(ts_parts) == 1:
+            return ts_parts[0], {c: v[0] for c, v in col_parts.items()}, manifest
+        if not ts_parts:
+            return (np.empty(0, dtype=np.int64),
+                    {c: np.empty(0, dtype=manifest['columns'][c]) for c in columns}, manifest)
+        return np.concatenate(ts_parts), {c: np.concatenate(v) for c, v in col_parts.items()}, manifest
+
+    def read(self, symbol, start=None, end=None, dataset='1d', columns=None):
+        """
+        读取 [start, end) 区间的数据为DataFrame
+
+        参数:
+            symbol (str): 股票代码
+            start (str | datetime | None): 开始时间
+            end (str | datetime | None): 结束时间（不包含）
+            dataset (str): 数据集名称
+            columns (list[str] | None): 需要的列，None 表示全部
+
+        返回:
+            pd.DataFrame: 历史数据
+        """
+        ts, arrays, manifest = self.read_arrays(symbol, start, end, dataset, columns)
+        return _to_frame(ts, arrays, manifest)
+
+    def iter_chunks(self, symbol, start=None, end=None, dataset='1d', columns=None):
+        """
+        按分区逐块读取 [start, end) 区间的数据，每次只有一个分区在内存中
+
+        参数:
+            symbol (str): 股票代码
+            start (str | datetime | None): 开始时间
+            end (str | datetime | None): 结束时间（不包含）
+            dataset (str): 数据集名称
+            columns (list[str] | None): 需要的列，None 表示全部
+
+        返回:
+            generator: 按时间顺序逐个产生每个分区的DataFrame
+        """
+        manifest = self.info(symbol, dataset)
+        if manifest is None:
+            raise KeyError(f"{symbol}/{dataset} 不存在")
+        columns = list(manifest['columns']) if columns is None else list(columns)
+        lo = None if start is None else _to_utc_ns(start, manifest['tz'])
+        hi = None if end is None else _to_utc_ns(end, manifest['tz'])
+        path = self._dataset_dir(symbol, dataset)
+        for key in _overlapping_partitions(manifest, lo, hi):
+            ts, values = self._read_partition(path, key, manifest, lo, hi, columns)
+            if len(ts):
+                yield _to_frame(ts, values, manifest)
+
+    def _read_partition(self, path, key, manifest, lo, hi, columns):
+        # 以内存映射方式打开一个分区，二分查找截取 [lo, hi)
+        part_dir = os.path.join(path, key)
+        ts = np.load(os.path.join(part_dir, 'timestamp.npy'), mmap_mode='r')
+        i = 0 if lo is None else np.searchsorted(ts, lo, side='left')
+        j = len(ts) if hi is None else np.searchsorted(ts, hi, side='left')
+        values = {column: np.load(os.path.join(part_dir, _column_file(column)), mmap_mode='r')[i:j]
+                  for column in columns}
+        self.stats['partitions_read'] += 1
+        self.stats['bytes_read'] += (j - i) * (8 + sum(np.dtype(manifest['columns'][c]).itemsize
+                                                       for c in columns))
+        return ts[i:j], values
+
+    def _dtype_for(self, column):
+        if column in PRICE_COLUMNS:
+            return self.price_dtype
+        if column in INT_COLUMNS:
+            return np.dtype(np.int64)
+        return np.dtype(np.float64)
+
+    def _dataset_dir(self, symbol, dataset):
+        return os.path.join(self.root, symbol.upper(), dataset)
+
+    def _merge_partition(self, path, key, manifest, ts, part):
+        part_dir = os.path.join(path, key)
+        old_ts = np.load(os.path.join(part_dir, 'timestamp.npy'))
+        keep = ~np.isin(old_ts, ts)
+        merged_ts = np.concatenate([old_ts[keep], ts])
+        order = np.argsort(merged_ts, kind='stable')
+        merged = {}
+        for column in manifest['columns']:
+            file = os.path.join(part_dir, _column_file(column))
+            old = np.load(file)[keep] if os.path.exists(file) else np.full(keep.sum(), np.nan)
+            new = part.get(column, np.full(len(ts), np.nan))
+            merged[column] = np.concatenate([old, new])[order]
+        return merged_ts[order], merged
+
+    def _write_partition(self, path, key, manifest, ts, part):
+        part_dir = os.path.join(path, key)
+        os.makedirs(part_dir, exist_ok=True)
+        order = np.argsort(ts, kind='stable')
+        ts = np.ascontiguousarray(ts[order], dtype=np.int64)
+        _atomic_save(os.path.join(part_dir, 'timestamp.npy'), ts)
+        for column, dtype in manifest['columns'].items():
+            values = part.get(column, np.full(len(ts), np.nan))
+            values = np.ascontiguousarray(np.asarray(values)[order], dtype=dtype)
+            _atomic_save(os.path.join(part_dir, _column_file(column)), values)
+            self.stats['bytes_written'] += values.nbytes
+        self.stats['bytes_written'] += ts.nbytes
+        return {'rows': int(len(ts)), 'first': int(ts[0]), 'last': int(ts[-1])}
+
+    def _write_manifest(self, path, manifest):
+        os.makedirs(path, exist_ok=True)
+        tmp_path = os.path.join(path, 'manifest.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, os.path.join(path, 'manifest.json'))
+
+
+def _overlapping_partitions(manifest, lo, hi):
+    # 按时间顺序返回与 [lo, hi) 重叠的分区
+    for key in sorted(manifest['partitions']):
+        meta = manifest['partitions'][key]
+        if (lo is not None and meta['last'] < lo) or (hi is not None and meta['first'] >= hi):
+            continue
+        yield key
+
+
+def _to_frame(ts, arrays, manifest):
+    # 复制出内存映射的切片，返回的DataFrame不再依赖文件
+    index = pd.DatetimeIndex(np.array(ts).view('datetime64[ns]'), name=manifest['index_name'])
+    index = index.tz_localize('UTC').tz_convert(manifest['tz'])
+    return pd.DataFrame({c: np.array(v) for c, v in arrays.items()}, index=index)
+
+
+def _partition_codes(index, partition):
+    # 用整数编码分区（例如 202403），比逐行 strftime 快得多
+    if partition == 'year':
+        return index.year.to_numpy()
+    if partition == 'month':
+        return index.year.to_numpy() * 100 + index.month.to_numpy()
+    return index.year.to_numpy() * 10000 + index.month.to_numpy() * 100 + index.day.to_numpy()
+
+
+def _partition_key(code, partition):
+    code = int(code)
+    if partition == 'year':
+        return f'{code:04d}'
+    if partition == 'month':
+        return f'{code // 100:04d}-{code % 100:02d}'
+    return f'{code // 10000:04d}-{code // 100 % 100:02d}-{code % 100:02d}'
+
+
+def _to_utc_ns(value, tz):
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(tz)
+    return value.tz_convert('UTC').value
+
+
+def _column_file(column):
+    return column.replace(' ', '_') + '.npy'
+
+
+def _atomic_save(path, array):
+    # 先写临时文件再替换，避免中途中断留下不完整的文件
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
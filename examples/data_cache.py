@@ -0,0 +1,273 @@
+import copy
+import json
+import os
+import re
+import shutil
+import threading
+
+import pandas as pd
+
+from adjustments import AdjustedPriceStore
+from columnar_store import ColumnarStore
+from data_providers import YFinanceProvider
+from instrumentation import count, span, traced
+
+_PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+
+
+def period_to_start(period, end=None):
+    """
+    把 yfinance 风格的 period 转换为开始时间
+
+    参数:
+        period (str): 时间跨度，例如 '5d', '1mo', '3y', 'ytd', 'max'
+        end (pd.Timestamp | None): 结束时间，默认为当前时间
+
+    返回:
+        pd.Timestamp | None: 开始时间，'max' 返回 None
+    """
+    end = pd.Timestamp.now() if end is None else pd.Timestamp(end)
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=end.year, month=1, day=1, tz=end.tz)
+
+    match = _PERIOD_PATTERN.match(period)
+    if match is None:
+        raise ValueError(f"无法识别的 period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    offset = {
+        'd': pd.DateOffset(days=n),
+        'wk': pd.DateOffset(weeks=n),
+        'mo': pd.DateOffset(months=n),
+        'y': pd.DateOffset(years=n),
+    }[unit]
+    return (end - offset).normalize()
+
+
+def _to_utc(value, tz):
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(tz)
+    return value.tz_convert('UTC')
+
+
+class OHLCVCache:
+    """
+    本地磁盘上的OHLCV缓存
+
+    数据保存在 ColumnarStore 中：每个 (股票代码, K线周期) 是一个按时间分区、按列存储的数据集，
+    时间戳为 int64 的UTC纳秒。读取时优先使用本地数据，只向数据源请求缓存中缺少的部分
+    （更早的历史或最后一根K线之后的新数据），并且只读取请求区间所在的分区。
+
+    缓存中只保存未复权价格，拆股和分红记录在 AdjustedPriceStore 的事件表中，复权价格在读取时计算，
+    所以 auto_adjust=True 和 False 共用同一份数据，新的拆股或分红也不会让已缓存的历史失效。
+
+    参数:
+        cache_dir (str): 缓存根目录
+        provider (DataProvider): 数据源，默认为 YFinanceProvider
+        refresh_interval (float): 最新数据的有效期（秒），在有效期内不会再去请求新数据
+        price_dtype (str): 价格列的存储类型，'float64' 或 'float32'
+        offline (bool | None): 离线模式，只读取本地缓存，从不请求数据源；None 表示由环境变量
+                               OHLCV_CACHE_OFFLINE=1 决定（notebook 构建时用它避免访问网络）
+    """
+
+    def __init__(self, cache_dir='data_cache', provider=None, refresh_interval=3600, price_dtype='float64',
+                 offline=None):
+        self.cache_dir = cache_dir
+        self.offline = os.environ.get('OHLCV_CACHE_OFFLINE') == '1' if offline is None else offline
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.refresh_interval = pd.Timedelta(seconds=refresh_interval)
+        self.store = ColumnarStore(cache_dir, price_dtype=price_dtype)
+        # 日内数据按月分区，避免单个分区过大
+        self.intraday_store = ColumnarStore(cache_dir, partition='month', price_dtype=price_dtype)
+        self.adjusted = AdjustedPriceStore(self.store)
+        self.intraday_adjusted = AdjustedPriceStore(self.intraday_store)
+        self.stats = {'hits': 0, 'misses': 0, 'topups': 0, 'bytes_fetched': 0, 'bytes_read': 0}
+        self._stats_lock = threading.Lock()
+
+    def with_provider(self, provider):
+        """
+        返回使用另一个数据源的缓存视图，与原缓存共享目录和统计计数
+
+        参数:
+            provider (DataProvider): 新的数据源
+
+        返回:
+            OHLCVCache: 缓存视图
+        """
+        view = copy.copy(self)
+        view.provider = provider
+        return view
+
+    @traced
+    def get(self, symbol, period=None, start=None, end=None, interval='1d', auto_adjust=True):
+        """
+        获取历史数据，必要时增量补齐缓存
+
+        参数:
+            symbol (str): 股票代码
+            period (str | None): 时间跨度，与 yfinance 相同；提供 start 时忽略
+            start (str | datetime | None): 开始时间
+            end (str | datetime | None): 结束时间（不包含），None 表示到最新
+            interval (str): K线周期
+            auto_adjust (bool): 是否按拆股和分红复权；False 时与 yfinance 相同，只按拆股复权并附带 Adj Close
+
+        返回:
+            pd.DataFrame: [start, end) 区间内的历史数据
+        """
+        if start is None and period is not None:
+            start = period_to_start(period, end)
+
+        store = self.store_for(interval)
+        adjusted = self.adjusted_for(interval)
+        dataset = self.dataset_name(interval)
+        now = pd.Timestamp.now(tz='UTC')
+        coverage = self._load_coverage(symbol, dataset)
+        manifest = store.info(symbol, dataset)
+
+        if self.offline:
+            # 离线模式：缓存中已有的数据无论多旧都直接使用
+            if coverage is None or manifest is None:
+                raise LookupError(f"离线模式下缓存中没有 {symbol} 的 {dataset} 数据")
+            self._count('hits')
+        elif coverage is None or manifest is None:
+            self._count('misses')
+            data = self._fetch(symbol, start, end, interval)
+            adjusted.ingest(symbol, data, dataset)
+            tz = str(data.index.tz or 'UTC')
+            coverage = {
+                'coverage_start': None if start is None else _to_utc(start, tz).isoformat(),
+                'coverage_end': self._covered_end(end, tz, now).isoformat(),
+            }
+            self._save_coverage(symbol, dataset, coverage)
+        else:
+            tz = manifest['tz']
+            first, last = store.bounds(symbol, dataset)
+            coverage_start = coverage['coverage_start'] and pd.Timestamp(coverage['coverage_start'])
+            coverage_end = pd.Timestamp(coverage['coverage_end'])
+            topped_up = False
+
+            # 补齐更早的历史
+            if coverage_start is not None and (start is None or _to_utc(start, tz) < coverage_start):
+                head_end = first if first is not None else coverage_start
+                adjusted.ingest(symbol, self._fetch(symbol, start, head_end, interval), dataset)
+                coverage['coverage_start'] = None if start is None else _to_utc(start, tz).isoformat()
+                topped_up = True
+
+            # 补齐最后一根K线之后的数据；最后一根K线可能尚未收盘，所以从它开始重新获取
+            wanted_end = self._covered_end(end, tz, now)
+            if wanted_end > coverage_end + self.refresh_interval:
+                tail_start = last if last is not None else coverage_end
+                adjusted.ingest(symbol, self._fetch(symbol, tail_start, end, interval), dataset)
+                coverage['coverage_end'] = wanted_end.isoformat()
+                topped_up = True
+
+            if topped_up:
+                self._count('topups')
+                self._save_coverage(symbol, dataset, coverage)
+            else:
+                self._count('hits')
+
+        # 只读取请求区间所在的分区，读取时复权
+        data = adjusted.read(symbol, start, end, dataset, adjust='all' if auto_adjust else 'splits')
+        self._count('bytes_read', int(data.memory_usage(index=True).sum()))
+        return data
+
+    def store_for(self, interval):
+        """
+        返回保存指定K线周期数据的仓库
+
+        参数:
+            interval (str): K线周期
+
+        返回:
+            ColumnarStore: 数据仓库
+        """
+        return self.intraday_store if self._is_intraday(interval) else self.store
+
+    def adjusted_for(self, interval):
+        """
+        返回指定K线周期的复权视图
+
+        参数:
+            interval (str): K线周期
+
+        返回:
+            AdjustedPriceStore: 复权视图
+        """
+        return self.intraday_adjusted if self._is_intraday(interval) else self.adjusted
+
+    def record_action(self, symbol, date, split=None, dividend=None):
+        """
+        记录一次拆股或分红，之后读取的复权价格立即生效，不需要重新下载历史
+
+        参数:
+            symbol (str): 股票代码
+            date (str | datetime): 拆股日或除息日
+            split (float | None): 拆股比例，例如一拆四为 4
+            dividend (float | None): 未复权的每股分红
+        """
+        self.adjusted.add_action(symbol, date, split=split, dividend=dividend, dataset=self.dataset_name('1d'))
+
+    @staticmethod
+    def dataset_name(interval):
+        """
+        返回缓存中数据集的名称
+
+        参数:
+            interval (str): K线周期
+
+        返回:
+            str: 数据集名称，例如 '1d_raw'
+        """
+        return f"{interval}_raw"
+
+    def invalidate(self, symbol, interval='1d'):
+        """
+        删除指定股票的缓存（公司行动事件表保留，重新下载时会合并）
+
+        参数:
+            symbol (str): 股票代码
+            interval (str): K线周期
+        """
+        path = os.path.join(self.cache_dir, symbol.upper(), self.dataset_name(interval))
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+        count(f'cache.{key}', n)
+
+    @staticmethod
+    def _is_intraday(interval):
+        return interval.endswith(('m', 'h')) and not interval.endswith('mo')
+
+    def _covered_end(self, end, tz, now):
+        return now if end is None else min(_to_utc(end, tz), now)
+
+    def _fetch(self, symbol, start, end, interval):
+        # 总是获取只按拆股复权的数据，由 AdjustedPriceStore 还原为未复权价格
+        with span('provider.fetch', provider=self.provider.name, symbol=symbol, interval=interval):
+            data = self.provider.fetch(symbol, start=start, end=end, interval=interval, auto_adjust=False)
+        self._count('bytes_fetched', int(data.memory_usage(index=True).sum()))
+        count('rows_fetched', len(data))
+        return data
+
+    def _coverage_path(self, symbol, dataset):
+        return os.path.join(self.cache_dir, symbol.upper(), dataset, 'coverage.json')
+
+    def _load_coverage(self, symbol, dataset):
+        path = self._coverage_path(symbol, dataset)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_coverage(self, symbol, dataset, coverage):
+        path = self._coverage_path(symbol, dataset)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(coverage, f, indent=1)
+        os.replace(tmp_path, path)
@@ -0,0 +1,201 @@
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# yfinance 返回的标准列顺序
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+
+class DataProvider:
+    """
+    行情数据源接口
+
+    所有数据源都实现 fetch 方法，返回与 yfinance 的 history() 相同结构的DataFrame
+    （DatetimeIndex 索引，列为 OHLCV_COLUMNS），这样缓存、批量下载等上层逻辑
+    不依赖具体的数据来源，也可以用本地的假数据源离线测试。
+    """
+
+    name = 'base'
+
+    def fetch(self, symbol, start=None, end=None, interval='1d', auto_adjust=True):
+        """
+        获取指定股票在 [start, end) 区间内的历史数据
+
+        参数:
+            symbol (str): 股票代码
+            start (pd.Timestamp | None): 开始时间，None 表示尽可能早
+            end (pd.Timestamp | None): 结束时间（不包含），None 表示到最新
+            interval (str): K线周期，例如 '1d', '1h', '1m'
+            auto_adjust (bool): 是否返回复权后的价格
+
+        返回:
+            pd.DataFrame: 历史数据
+        """
+        raise NotImplementedError
+
+
+class YFinanceProvider(DataProvider):
+    """
+    基于 yfinance 的数据源
+    """
+
+    name = 'yfinance'
+
+    def fetch(self, symbol, start=None, end=None, interval='1d', auto_adjust=True):
+        import yfinance as yf
+
+        stock = yf.Ticker(symbol)
+        if start is not None:
+            return stock.history(start=start, end=end, interval=interval, auto_adjust=auto_adjust)
+        data = stock.history(period='max', interval=interval, auto_adjust=auto_adjust)
+        if end is None or data.empty:
+            return data
+        # period='max' 不接受结束时间，取回全部历史后再截掉 end 及之后的数据
+        tz = data.index.tz
+        end = pd.Timestamp(end) if tz is None else _as_tz(end, tz)
+        return data[data.index < end]
+
+
+def make_synthetic_ohlcv(symbol, start=None, end=None, freq='B', seed=0,
+                         base_date='2000-01-03', tz='America/New_York'):
+    """
+    生成确定性的模拟OHLCV数据（几何随机游走）
+
+    同一个 symbol 和 seed 在任意区间内生成的数据都来自同一条价格路径，
+    因此分段获取再拼接的结果与一次性获取完全一致，适合测试增量更新。
+
+    参数:
+        symbol (str): 股票代码，用于派生随机种子
+        start (str | pd.Timestamp | None): 开始时间，None 表示从 base_date 开始
+        end (str | pd.Timestamp | None): 结束时间（不包含），None 表示到今天
+        freq (str): K线频率，例如 'B'（工作日）、'min'
+        seed (int): 随机种子
+        base_date (str): 价格路径的起点；日内频率下应尽量靠近 start，避免生成过多数据
+        tz (str): 索引的时区
+
+    返回:
+        pd.DataFrame: 与 yfinance history() 结构相同的模拟数据
+    """
+    end = pd.Timestamp.now(tz=tz).normalize() + pd.Timedelta(days=1) if end is None else _as_tz(end, tz)
+    index = _make_index(_as_tz(base_date, tz), end, freq, tz)
+
+    # 每个字段使用独立的随机流，保证不同长度的区间共享同一段前缀
+    symbol_seed = zlib.crc32(symbol.encode())
+    streams = [np.random.default_rng([symbol_seed, seed, k]) for k in range(4)]
+    n = len(index)
+    # 日内K线按K线时长缩放漂移和波动率，保持与日线相近的年化水平
+    bar_days = 1.0 if freq == 'B' else pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).total_seconds() / 86400
+    returns = streams[0].normal(0.0003 * bar_days, 0.015 * np.sqrt(bar_days), n)
+    close = 20.0 * (1 + symbol_seed % 50) * np.exp(np.cumsum(returns))
+    prev_close = np.concatenate([close[:1], close[:-1]])
+    open_ = prev_close * np.exp(streams[1].normal(0, 0.003, n))
+    spread = np.abs(streams[2].normal(0, 0.008, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = streams[3].integers(1_000_000, 50_000_000, n)
+
+    data = pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'Dividends': np.zeros(n),
+        'Stock Splits': np.zeros(n),
+    }, index=index)
+
+    if start is not None:
+        data = data.loc[data.index >= _as_tz(start, tz)]
+    return data
+
+
+def make_synthetic_arrays(n_bars, n_symbols, seed=0, dtype=np.float64):
+    """
+    一次生成多只股票的模拟OHLCV数组（时间 × 股票），用于大规模基准测试
+
+    与 make_synthetic_ohlcv 不同，这里所有股票一起向量化生成，速度快但不保证分段一致性。
+
+    参数:
+        n_bars (int): K线数量
+        n_symbols (int): 股票数量
+        seed (int): 随机种子
+        dtype (np.dtype): 价格数组的数据类型
+
+    返回:
+        dict: {'Open'/'High'/'Low'/'Close'/'Volume': (n_bars, n_symbols) 数组}
+    """
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0003, 0.0002, n_symbols)
+    vol = rng.uniform(0.01, 0.03, n_symbols)
+    start_price = rng.uniform(10, 500, n_symbols)
+
+    returns = rng.standard_normal((n_bars, n_symbols), dtype=np.float32) * vol.astype(np.float32) + drift.astype(np.float32)
+    close = start_price * np.exp(np.cumsum(returns, axis=0, dtype=np.float64))
+    open_ = np.empty_like(close)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(rng.normal(0, 0.003, (n_bars - 1, n_symbols)))
+    spread = np.abs(rng.normal(0, 0.008, (n_bars, n_symbols))) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100_000, 50_000_000, (n_bars, n_symbols)).astype(np.float64)
+    return {
+        'Open': open_.astype(dtype, copy=False),
+        'High': high.astype(dtype, copy=False),
+        'Low': low.astype(dtype, copy=False),
+        'Close': close.astype(dtype, copy=False),
+        'Volume': volume,
+    }
+
+
+def _make_index(start, end, freq, tz):
+    # 按工作日生成日期时 pd.date_range 会逐个生成，数据量大时很慢，这里改用NumPy向量化
+    if freq == 'B':
+        days = np.arange(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), dtype='datetime64[D]')
+        days = days[np.is_busday(days)]
+        return pd.DatetimeIndex(days.astype('datetime64[ns]'), name='Date').tz_localize(tz)
+    index = pd.date_range(start.tz_convert('UTC'), end.tz_convert('UTC'), freq=freq, inclusive='left', name='Date')
+    return index.tz_convert(tz)
+
+
+def _as_tz(value, tz):
+    value = pd.Timestamp(value)
+    return value.tz_localize(tz) if value.tzinfo is None else value.tz_convert(tz)
+
+
+class SyntheticProvider(DataProvider):
+    """
+    本地模拟数据源，不需要网络
+
+    参数:
+        seed (int): 随机种子
+        latency (float): 每次请求注入的延迟（秒），用于模拟网络耗时
+        freq (str): K线频率
+        fail_rate (float): 每次请求随机失败的概率，用于测试重试逻辑
+        base_date (str): 价格路径的起点
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed=0, latency=0.0, freq='B', fail_rate=0.0, base_date='2000-01-03'):
+        self.seed = seed
+        self.base_date = base_date
+        self.latency = latency
+        self.freq = freq
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def fetch(self, symbol, start=None, end=None, interval='1d', auto_adjust=True):
+        with self._lock:
+            self.calls += 1
+            failed = self.fail_rate and self._rng.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise ConnectionError(f"模拟的网络错误: {symbol}")
+        return make_synthetic_ohlcv(symbol, start, end, freq=self.freq, seed=self.seed,
+                                    base_date=self.base_date)
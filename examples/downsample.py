@@ -0,0 +1,208 @@
+import numpy as np
+
+from instrumentation import count, traced
+
+
+def pixel_width(ax):
+    """
+    坐标轴在画布上的宽度（像素），作为降采样的目标点数
+
+    参数:
+        ax (matplotlib.axes.Axes): 坐标轴
+
+    返回:
+        int: 像素宽度，至少为1
+    """
+    return max(int(ax.bbox.width), 1)
+
+
+def minmax_indices(y, n_buckets):
+    """
+    保留极值的降采样：按位置把数据分成 n_buckets 段，每段保留最小值和最大值所在的点
+
+    一个像素宽度内的折线最终只画成一条竖线，它的上下端点就是这段数据的最小值和最大值，
+    所以每个像素保留两个点画出来的图形与画全部数据几乎一样，但绘制开销只取决于像素宽度。
+
+    参数:
+        y (np.ndarray): 数据
+        n_buckets (int): 分段数，通常为坐标轴的像素宽度
+
+    返回:
+        np.ndarray: 保留的点的位置（升序），包括第一个和最后一个点
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * n_buckets + 2:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    # 补齐成 (分段数, 每段长度) 的矩阵，补充的位置和缺失值不会被选为最小值或最大值
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    missing = np.isnan(blocks)
+    offsets = np.arange(n_buckets) * size
+    low = np.where(missing, np.inf, blocks).argmin(axis=1) + offsets
+    high = np.where(missing, -np.inf, blocks).argmax(axis=1) + offsets
+    # 整段都是缺失值时保留一个缺失值，让折线在这里断开
+    return np.unique(np.concatenate([[0, n - 1], np.minimum(low, n - 1), np.minimum(high, n - 1)]))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    除首尾两点外把数据分成 n_out-2 段，每段选出与上一个选中点、下一段平均点组成的三角形面积
+    最大的点，比 minmax_indices 的点更少，折线形状仍然接近原图，但不保证保留每段的极值。
+
+    参数:
+        x (np.ndarray): 横坐标（数值）
+        y (np.ndarray): 纵坐标
+        n_out (int): 保留的点数
+
+    返回:
+        np.ndarray: 保留的点的位置（升序）
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = np.nanmean(y[next_lo:next_hi]) if not np.isnan(y[next_lo:next_hi]).all() else y[a]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + (np.nanargmax(area) if not np.isnan(area).all() else 0)
+        selected[i + 1] = a
+    return selected
+
+
+@traced
+def downsample_line(x, y, n_pixels, method='minmax'):
+    """
+    把折线降采样到坐标轴的像素宽度
+
+    参数:
+        x (np.ndarray): 横坐标，例如 date_to_num 的结果
+        y (np.ndarray): 纵坐标
+        n_pixels (int): 像素宽度，见 pixel_width
+        method (str): 'minmax'（每个像素保留最小值和最大值）或 'lttb'（每个像素保留一个点）
+
+    返回:
+        tuple: (降采样后的横坐标, 纵坐标)
+    """
+    if method == 'minmax':
+        rows = minmax_indices(y, n_pixels)
+    elif method == 'lttb':
+        rows = lttb_indices(x, y, n_pixels)
+    else:
+        raise ValueError(f"不支持的降采样方法: {method}")
+    count('points_downsampled', len(y) - len(rows))
+    return np.asarray(x)[rows], np.asarray(y)[rows]
+
+
+def bucket_max(x, values, n_buckets):
+    """
+    把柱状图（例如成交量）合并到 n_buckets 根柱子，每根柱子的高度为这一段的最大值
+
+    柱子合并后画出来的轮廓与逐日画柱子的上边缘一致。数据不超过 n_buckets 时原样返回，
+    宽度为相邻两点的间隔。
+
+    参数:
+        x (np.ndarray): 每根柱子的横坐标（数值，升序）
+        values (np.ndarray): 柱子高度
+        n_buckets (int): 合并后的柱子数，通常为坐标轴的像素宽度
+
+    返回:
+        tuple: (左边界, 宽度, 高度)，用于 ax.bar(left, height, width, align='edge')
+    """
+    x = np.asarray(x, dtype=float)
+    values = np.asarray(values, dtype=float)
+    n = len(x)
+    if n == 0:
+        return x, x, values
+    step = np.median(np.diff(x)) if n > 1 else 1.0
+    if n <= n_buckets:
+        # 与 plt.bar 的默认宽度一样，柱子占间隔的80%，中心对齐到数据点
+        return x - 0.4 * step, np.full(n, 0.8 * step), values
+    starts = np.linspace(0, n, n_buckets + 1).astype(int)[:-1]
+    starts = np.unique(starts)
+    heights = np.fmax.reduceat(values, starts)
+    left = x[starts]
+    right = np.append(x[starts[1:]], x[-1] + step)
+    return left, right - left, heights
+
+
+def binned_kde(values, gridsize=512, cut=3, bandwidth=None):
+    """
+    分箱 + FFT 卷积的高斯核密度估计
+
+    先把样本线性分配到等距网格上（O(n)），再用FFT把网格计数与高斯核卷积（O(网格点数·log)），
+    所以耗时基本与样本数无关；直接对每个网格点累加所有样本的核函数则是 O(n·网格点数)。
+    默认的 Scott 带宽和网格范围（cut=3）与 sns.kdeplot 一致，两者的差异在网格间距的平方量级；
+    sns.histplot(kde=True) 的网格不超出样本范围，对应 cut=0。
+
+    参数:
+        values (np.ndarray): 样本，缺失值会被忽略
+        gridsize (int): 网格点数
+        cut (float): 网格向样本范围两端延伸多少个带宽
+        bandwidth (float | None): 核的标准差，None 表示 Scott 规则
+
+    返回:
+        tuple: (网格, 密度)
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    n = len(values)
+    if bandwidth is None:
+        bandwidth = values.std(ddof=1) * n ** (-1 / 5) if n > 1 else 0.0
+    if not bandwidth > 0:
+        # 样本不足或所有值相同时没有分布可言，只画一条竖线
+        center = values[0] if n else 0.0
+        return np.array([center, center]), np.array([0.0, 0.0])
+
+    low = values.min() - cut * bandwidth
+    high = values.max() + cut * bandwidth
+    grid = np.linspace(low, high, gridsize)
+    delta = grid[1] - grid[0]
+
+    # 线性分箱：每个样本按距离分给左右两个网格点
+    position = (values - low) / delta
+    left = np.floor(position).astype(np.int64)
+    weight = position - left
+    counts = np.bincount(left, 1 - weight, minlength=gridsize + 1)
+    counts += np.bincount(left + 1, weight, minlength=gridsize + 1)
+    counts = counts[:gridsize]
+
+    # 高斯核截断在整个网格宽度以内，补零后用FFT做线性（非循环）卷积
+    half = gridsize - 1
+    kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * delta / bandwidth) ** 2)
+    size = 1 << int(np.ceil(np.log2(gridsize + len(kernel) - 1)))
+    full = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = full[half:half + gridsize]
+    return grid, np.maximum(density, 0) / (n * bandwidth * np.sqrt(2 * np.pi))
+
+
+def kde_counts(values, bins, gridsize=200):
+    """
+    与直方图同一尺度的核密度曲线（sns.histplot(..., kde=True) 画的那条线），用 binned_kde 计算
+
+    参数:
+        values (np.ndarray): 样本，缺失值会被忽略
+        bins (int): 直方图的分箱数
+        gridsize (int): 曲线的点数
+
+    返回:
+        tuple: (网格, 以每个分箱的样本数为单位的密度)
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    grid, density = binned_kde(values, gridsize, cut=0)
+    bin_width = (values.max() - values.min()) / bins if len(values) else 0.0
+    return grid, density * len(values) * bin_width
@@ -0,0 +1,502 @@
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATORS, SMA, RollingStd
+from panel import Panel
+
+
+class Feature:
+    """
+    特征基类
+
+    每个特征对整个面板（所有股票）做一次向量化计算，得到 (时间, 股票) 的一列。第 t 行只能使用
+    第 t 行及之前的数据（在第 t 根K线收盘时已知），这样增量计算和缓存都只依赖数据的前缀。
+
+    子类实现 _values(panel, deps)：对给定的面板（可能是截取的一段）计算整列。
+    lookback 为计算最新一行所需的之前的行数，增量计算时只对最后 lookback + 新行数 行重新计算；
+    依赖全部历史的特征（例如指数平均）把状态保存下来逐行更新，见 IndicatorFeature。
+
+    属性:
+        inputs (tuple[str]): 使用的面板字段
+        depends (tuple[Feature]): 依赖的其他特征，计算时按顺序作为 deps 传入
+        lookback (int): 计算最新一行所需的历史行数
+    """
+
+    inputs = ('Close',)
+    depends = ()
+    lookback = 0
+
+    @property
+    def name(self):
+        raise NotImplementedError
+
+    @property
+    def key(self):
+        # 特征的定义（类名和参数），决定缓存键
+        params = ', '.join(f'{k}={v!r}' for k, v in sorted(vars(self).items()) if not k.startswith('_'))
+        return f'{type(self).__name__}({params})'
+
+    def run(self, panel, deps):
+        """
+        计算全部行
+
+        返回:
+            tuple: (列, 状态)，状态在增量计算时传回 extend
+        """
+        return self._values(panel, deps), None
+
+    def extend(self, panel, n_old, state, deps):
+        """
+        只计算第 n_old 行之后的新行
+
+        参数:
+            panel (Panel): 完整的面板
+            n_old (int): 已经计算过的行数
+            state: run 或上一次 extend 返回的状态
+            deps (list[np.ndarray]): 依赖特征的完整列
+
+        返回:
+            tuple: (新行, 状态)
+        """
+        start = max(0, n_old - self.lookback)
+        segment = _slice_panel(panel, start)
+        values = self._values(segment, [d[start:] for d in deps])
+        return values[n_old - start:], None
+
+    def _values(self, panel, deps):
+        raise NotImplementedError
+
+
+class LaggedReturn(Feature):
+    """
+    滞后收益率：lag 根K线之前、过去 horizon 根K线的收益率 close[t-lag] / close[t-lag-horizon] - 1
+
+    参数:
+        horizon (int): 收益率的周期
+        lag (int): 滞后的K线数
+    """
+
+    def __init__(self, horizon=1, lag=0):
+        self.horizon = horizon
+        self.lag = lag
+        self.lookback = horizon + lag
+
+    @property
+    def name(self):
+        return f'ret_{self.horizon}' + (f'_lag{self.lag}' if self.lag else '')
+
+    def _values(self, panel, deps):
+        close = panel['Close']
+        values = np.full(close.shape, np.nan)
+        shift = self.horizon + self.lag
+        if len(close) > shift:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values[shift:] = close[self.horizon:len(close) - self.lag] / close[:len(close) - shift] - 1
+        return values
+
+
+class RollingMoment(Feature):
+    """
+    日收益率的滚动均值或标准差（窗口内需全部有效）
+
+    参数:
+        window (int): 窗口长度
+        stat (str): 'mean' 或 'std'
+    """
+
+    def __init__(self, window=20, stat='std'):
+        if stat not in ('mean', 'std'):
+            raise ValueError(f"未知的统计量: {stat}")
+        self.window = window
+        self.stat = stat
+        self.lookback = window
+
+    @property
+    def name(self):
+        return f'{self.stat}_{self.window}'
+
+    def _values(self, panel, deps):
+        returns = LaggedReturn(1)._values(panel, deps)
+        if self.stat == 'mean':
+            return SMA(self.window).run(returns)[f'sma_{self.window}']
+        return RollingStd(self.window).run(returns)[f'std_{self.window}']
+
+
+class MovingAverageGap(Feature):
+    """
+    收盘价相对简单移动平均的偏离 close / MA(window) - 1
+
+    参数:
+        window (int): 均线周期
+    """
+
+    def __init__(self, window=50):
+        self.window = window
+        self.lookback = window - 1
+
+    @property
+    def name(self):
+        return f'ma_gap_{self.window}'
+
+    def _values(self, panel, deps):
+        close = panel['Close']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return close / SMA(self.window).run(close)[f'sma_{self.window}'] - 1
+
+
+class IndicatorFeature(Feature):
+    """
+    indicators 模块中的指标作为特征，指标状态随缓存保存，新K线到来时逐行 update
+
+    参数:
+        indicator (str): 指标名称，见 indicators.INDICATORS
+        output (str): 指标的输出名称，例如 'rsi'、'hist'、'atr'
+        normalize (bool): 是否除以收盘价（MACD、ATR 等以价格为单位的指标在不同股票间可比）
+        **params: 指标参数
+    """
+
+    def __init__(self, indicator, output, normalize=False, **params):
+        self.indicator = indicator
+        self.output = output
+        self.normalize = normalize
+        self.params = params
+        self.inputs = tuple(f.capitalize() for f in INDICATORS[indicator].inputs)
+
+    @property
+    def name(self):
+        parts = [self.indicator] if self.output == self.indicator else [self.indicator, self.output]
+        return '_'.join(parts + [str(v) for _, v in sorted(self.params.items())])
+
+    @property
+    def key(self):
+        return f'IndicatorFeature({self.indicator!r}, {self.output!r}, normalize={self.normalize}, ' \
+               f'{sorted(self.params.items())})'
+
+    def run(self, panel, deps):
+        indicator = INDICATORS[self.indicator](**self.params)
+        values = indicator.run(**self._fields(panel))[self.output]
+        return self._normalized(values, panel['Close']), indicator
+
+    def extend(self, panel, n_old, state, deps):
+        fields = self._fields(panel)
+        rows = [state.update(**{f: v[i] for f, v in fields.items()})[self.output]
+                for i in range(n_old, len(panel.index))]
+        values = np.array(rows).reshape(-1, len(panel.symbols))
+        return self._normalized(values, panel['Close'][n_old:]), state
+
+    def _fields(self, panel):
+        return {f.lower(): panel[f] for f in self.inputs}
+
+    def _normalized(self, values, close):
+        if not self.normalize:
+            return values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return values / close
+
+
+class CrossSectionalRank(Feature):
+    """
+    另一个特征在每个时间点的横截面百分比排名（0 到 1），只使用同一行的数据
+
+    参数:
+        base (Feature): 被排名的特征
+        ascending (bool): 是否升序（最小值排名最低）
+    """
+
+    inputs = ()
+
+    def __init__(self, base, ascending=True):
+        self.base = base
+        self.ascending = ascending
+        self.depends = (base,)
+
+    @property
+    def name(self):
+        return f'rank_{self.base.name}'
+
+    @property
+    def key(self):
+        return f'CrossSectionalRank({self.base.key}, ascending={self.ascending})'
+
+    def _values(self, panel, deps):
+        return panel.rank(deps[0], ascending=self.ascending, pct=True)
+
+
+DEFAULT_FEATURES = (
+    LaggedReturn(1),
+    LaggedReturn(5),
+    LaggedReturn(20),
+    LaggedReturn(1, lag=1),
+    RollingMoment(20, 'mean'),
+    RollingMoment(20, 'std'),
+    RollingMoment(60, 'std'),
+    MovingAverageGap(50),
+    MovingAverageGap(200),
+    IndicatorFeature('rsi', 'rsi', window=14),
+    IndicatorFeature('macd', 'hist', normalize=True),
+    IndicatorFeature('atr', 'atr', normalize=True, window=14),
+    CrossSectionalRank(LaggedReturn(20)),
+    CrossSectionalRank(RollingMoment(20, 'std')),
+)
+
+
+class FeatureMatrix:
+    """
+    (时间, 股票, 特征) 的 float32 设计矩阵
+
+    参数:
+        values (np.ndarray): (时间, 股票, 特征) 数组
+        index (pd.DatetimeIndex): 时间索引
+        symbols (list[str]): 股票代码
+        names (list[str]): 特征名称
+    """
+
+    def __init__(self, values, index, symbols, names):
+        self.values = values
+        self.index = index
+        self.symbols = list(symbols)
+        self.names = list(names)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def feature(self, name):
+        """
+        取出一个特征的 (时间, 股票) 数组（不复制）
+
+        参数:
+            name (str): 特征名称
+
+        返回:
+            np.ndarray: 特征值
+        """
+        return self.values[:, :, self.names.index(name)]
+
+    def to_long(self, target=None, dropna=True):
+        """
+        展开为 (Date, Symbol) 双层索引、每个特征一列的长表，可以直接用于训练
+
+        参数:
+            target (np.ndarray | None): (时间, 股票) 的标签，例如 forward_returns 的结果，作为 'target' 列
+            dropna (bool): 是否去掉含有NaN（包括标签）的行
+
+        返回:
+            pd.DataFrame: 长表
+        """
+        n_rows, n_symbols, n_features = self.values.shape
+        data = self.values.reshape(-1, n_features)
+        index = pd.MultiIndex.from_product([self.index, self.symbols], names=['Date', 'Symbol'])
+        frame = pd.DataFrame(data, index=index, columns=self.names, copy=False)
+        if target is not None:
+            frame['target'] = np.asarray(target, dtype=np.float32).reshape(-1)
+        return frame.dropna() if dropna else frame
+
+
+class FeatureBuilder:
+    """
+    特征矩阵构建器，每个特征列按内容寻址缓存
+
+    一列的缓存键由特征定义、股票列表和它用到的输入数据（时间索引和字段值，包括依赖特征的输入）
+    的哈希决定，数据和定义都没变时直接读取。缓存中还记录了每个特征最近一次计算的行数和输入前缀的
+    哈希：新数据只是在末尾追加了K线（前缀的哈希相同）时，只计算新的行再拼接到旧的列后面。
+
+    参数:
+        features (tuple[Feature]): 特征列表，默认为 DEFAULT_FEATURES
+        cache_dir (str | None): 缓存目录，None 表示只在内存中缓存
+        dtype (np.dtype): 设计矩阵的类型
+    """
+
+    def __init__(self, features=DEFAULT_FEATURES, cache_dir=None, dtype=np.float32):
+        self.features = tuple(features)
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self.stats = {'hits': 0, 'extends': 0, 'misses': 0}
+        self._memory = {}
+        self._heads = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            heads_path = os.path.join(cache_dir, 'heads.json')
+            if os.path.exists(heads_path):
+                with open(heads_path) as f:
+                    self._heads = json.load(f)
+
+    @property
+    def names(self):
+        return [feature.name for feature in self.features]
+
+    def build(self, panel):
+        """
+        构建设计矩阵
+
+        参数:
+            panel (Panel): 面板数据（时间 × 股票），至少包含特征用到的字段
+
+        返回:
+            FeatureMatrix: 设计矩阵
+        """
+        hashes = {}
+        columns = {}
+        values = np.empty(panel.shape + (len(self.features),), dtype=self.dtype)
+        for j, feature in enumerate(self.features):
+            values[:, :, j] = self._column(feature, panel, hashes, columns)
+        if self.cache_dir is not None:
+            self._save_heads()
+        return FeatureMatrix(values, panel.index, panel.symbols, self.names)
+
+    def _column(self, feature, panel, hashes, columns):
+        if feature.key in columns:
+            return columns[feature.key]
+        deps = [self._column(dep, panel, hashes, columns) for dep in feature.depends]
+        n_rows = len(panel.index)
+        head_id = _digest(feature.key, *panel.symbols)
+        content = _digest(head_id, self._input_hash(feature, panel, n_rows, hashes))
+
+        column = self._load(content)
+        if column is not None:
+            self.stats['hits'] += 1
+        else:
+            head = self._heads.get(head_id)
+            old = self._load(head['content'], with_state=True) if head and head['n_rows'] < n_rows else None
+            if old is not None and head['input_hash'] == self._input_hash(feature, panel, head['n_rows'], hashes):
+                # 只是追加了新K线：计算新行后拼接
+                self.stats['extends'] += 1
+                old_column, state = old
+                new_rows, state = feature.extend(panel, head['n_rows'], state, deps)
+                column = np.concatenate([old_column, new_rows.astype(self.dtype)])
+            else:
+                self.stats['misses'] += 1
+                column, state = feature.run(panel, deps)
+                column = column.astype(self.dtype)
+            self._save(content, column, state)
+            if head and head['content'] != content:
+                self._remove(head['content'])
+            self._heads[head_id] = {'content': content, 'n_rows': n_rows,
+                                    'input_hash': self._input_hash(feature, panel, n_rows, hashes)}
+        columns[feature.key] = column
+        return column
+
+    def _input_hash(self, feature, panel, n_rows, hashes):
+        # 特征用到的所有输入（包括依赖特征的输入）前 n_rows 行的哈希
+        parts = [self._field_hash(panel, field, n_rows, hashes) for field in feature.inputs]
+        parts += [self._input_hash(dep, panel, n_rows, hashes) for dep in feature.depends]
+        return _digest(*parts)
+
+    @staticmethod
+    def _field_hash(panel, field, n_rows, hashes):
+        key = (field, n_rows)
+        if key not in hashes:
+            h = hashlib.sha256()
+            h.update(panel.index.asi8[:n_rows].tobytes())
+            h.update(np.ascontiguousarray(panel[field][:n_rows]).tobytes())
+            hashes[key] = h.hexdigest()
+        return hashes[key]
+
+    def _load(self, content, with_state=False):
+        if self.cache_dir is None:
+            entry = self._memory.get(content)
+            if entry is None:
+                return None
+            return entry if with_state else entry[0]
+        path = os.path.join(self.cache_dir, content + '.npy')
+        if not os.path.exists(path):
+            return None
+        column = np.load(path)
+        if not with_state:
+            return column
+        state_path = os.path.join(self.cache_dir, content + '.pkl')
+        state = None
+        if os.path.exists(state_path):
+            with open(state_path, 'rb') as f:
+                state = pickle.load(f)
+        return column, state
+
+    def _save(self, content, column, state):
+        if self.cache_dir is None:
+            self._memory[content] = (column, state)
+            return
+        path = os.path.join(self.cache_dir, content)
+        # 先写临时文件再改名，中断时不会留下不完整的缓存
+        with open(path + '.npy.tmp', 'wb') as f:
+            np.save(f, column)
+        if state is not None:
+            with open(path + '.pkl.tmp', 'wb') as f:
+                pickle.dump(state, f)
+            os.replace(path + '.pkl.tmp', path + '.pkl')
+        os.replace(path + '.npy.tmp', path + '.npy')
+
+    def _remove(self, content):
+        # 被新版本取代的列（同一个特征、同一组股票的旧数据）
+        if self.cache_dir is None:
+            self._memory.pop(content, None)
+            return
+        for suffix in ('.npy', '.pkl'):
+            path = os.path.join(self.cache_dir, content + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _save_heads(self):
+        path = os.path.join(self.cache_dir, 'heads.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._heads, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+
+def forward_returns(panel, horizon=1):
+    """
+    训练标签：从第 t 根K线收盘到第 t + horizon 根K线收盘的收益率
+
+    第 t 行的标签在 t + horizon 时才知道；最后 horizon 行没有标签（NaN），不能用于训练。
+
+    参数:
+        panel (Panel): 面板数据
+        horizon (int): 持有的K线数
+
+    返回:
+        np.ndarray: (时间, 股票) 收益率
+    """
+    close = panel['Close']
+    target = np.full(close.shape, np.nan)
+    if len(close) > horizon:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            target[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return target
+
+
+def check_point_in_time(features, panel, rows):
+    """
+    检查特征是否使用了未来数据：用截取到第 r 行为止的面板计算的第 r 行，应当与用完整面板计算的相同
+
+    参数:
+        features (tuple[Feature]): 要检查的特征
+        panel (Panel): 面板数据
+        rows (list[int]): 检查的行号
+
+    返回:
+        dict: {特征名称: 最大绝对差}，不为0（或超出浮点误差）的特征使用了未来数据
+    """
+    full = FeatureBuilder(features, dtype=np.float64).build(panel).values
+    diffs = {feature.name: 0.0 for feature in features}
+    for r in rows:
+        truncated = Panel(panel.index[:r + 1], panel.symbols, {k: v[:r + 1] for k, v in panel.fields.items()})
+        row = FeatureBuilder(features, dtype=np.float64).build(truncated).values[r]
+        with np.errstate(invalid='ignore'):
+            diff = np.abs(row - full[r])
+        # 一边是NaN另一边不是，同样说明结果依赖了未来数据
+        diff = np.where(np.isnan(row) != np.isnan(full[r]), np.inf, np.nan_to_num(diff))
+        for j, feature in enumerate(features):
+            diffs[feature.name] = max(diffs[feature.name], float(diff[:, j].max()))
+    return diffs
+
+
+def _slice_panel(panel, start):
+    return Panel(panel.index[start:], panel.symbols, {k: v[start:] for k, v in panel.fields.items()})
+
+
+def _digest(*parts):
+    return hashlib.sha256('\x1f'.join(str(p) for p in parts).encode()).hexdigest()[:32]
@@ -0,0 +1,245 @@
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    可合并的流式分位数估计（简化的 t-digest）
+
+    样本数不超过 exact_limit 时保存全部原始值，分位数是精确的（与 pandas 的线性插值一致）；
+    超过后把数据压缩为按分位数划分的质心，两端的质心更细，中位数的秩误差大约在 1/compression 以内。
+
+    参数:
+        compression (int): 压缩后保留的质心数量级，越大越精确
+        exact_limit (int): 保存原始值的最大样本数
+    """
+
+    def __init__(self, compression=200, exact_limit=10000):
+        self.compression = compression
+        self.exact_limit = exact_limit
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+        self._exact = True
+
+    @property
+    def count(self):
+        return float(self._weights.sum()) + self._buffered
+
+    def update(self, values):
+        """
+        加入一批样本（已去掉NaN）
+
+        参数:
+            values (np.ndarray): 样本
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            self._buffer.append(values)
+            self._buffered += len(values)
+            self._maybe_compress()
+        return self
+
+    def merge(self, other):
+        """
+        合并另一个分位数估计
+
+        参数:
+            other (QuantileSketch): 另一个分区的估计
+        """
+        self._buffer.extend(other._buffer)
+        self._buffered += other._buffered
+        if len(other._weights):
+            # 两组质心拼接后需要重新排序压缩
+            self._means = np.concatenate([self._means, other._means])
+            self._weights = np.concatenate([self._weights, other._weights])
+            self._compress()
+        else:
+            self._maybe_compress()
+        return self
+
+    def _maybe_compress(self):
+        # 精确模式下超过样本上限时压缩；近似模式下缓冲区攒够一批再压缩，摊薄逐个更新的开销
+        if self._exact:
+            if self._buffered > self.exact_limit:
+                self._compress()
+        elif self._buffered > 5 * self.compression:
+            self._compress()
+
+    def quantile(self, q):
+        """
+        估计分位数
+
+        参数:
+            q (float): 0 到 1 之间的分位点
+
+        返回:
+            float: 分位数，没有样本时为NaN
+        """
+        if self.count == 0:
+            return float('nan')
+        if self._exact:
+            return float(np.quantile(np.concatenate(self._buffer), q))
+
+        if self._buffer:
+            self._compress()
+        cumulative = np.cumsum(self._weights)
+        centers = cumulative - self._weights / 2
+        return float(np.interp(q * cumulative[-1], centers, self._means))
+
+    def _compress(self):
+        means = np.concatenate([self._means] + self._buffer)
+        weights = np.concatenate([self._weights] + [np.ones(len(b)) for b in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+        self._exact = False
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+
+        # t-digest 的 k1 刻度函数：q 接近 0 或 1 时每个质心覆盖的样本更少
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        bucket = np.floor(k - k.min()).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+
+        merged_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / merged_weights
+        self._weights = merged_weights
+
+
+class RunningStats:
+    """
+    可增量更新、可合并的描述性统计
+
+    均值和方差使用 Welford 算法（分块更新和分区合并使用 Chan 等人的合并公式），
+    同时维护最小值、最大值和 QuantileSketch。可以逐根K线更新，也可以按块更新，
+    不需要在新数据到来时重新扫描全部历史。NaN 会被跳过，与 pandas 的默认行为一致。
+
+    与 pandas 的结果对比：均值、标准差、最小值、最大值只有浮点舍入误差（相对误差约 1e-12）；
+    样本数不超过 exact_limit 时中位数完全一致，超过后为近似值。
+
+    参数:
+        ddof (int): 计算标准差时的自由度修正，默认为1（与 pandas 一致）
+        compression (int): 分位数估计的压缩参数
+        exact_limit (int): 分位数保持精确的最大样本数
+    """
+
+    def __init__(self, ddof=1, compression=200, exact_limit=10000):
+        self.ddof = ddof
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = float('nan')
+        self.max = float('nan')
+        self.sketch = QuantileSketch(compression, exact_limit)
+
+    def update(self, value):
+        """
+        加入一个新样本
+
+        参数:
+            value (float): 新样本，NaN 会被忽略
+        """
+        value = float(value)
+        if math.isnan(value):
+            return self
+        self.n += 1
+        delta = value - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (value - self._mean)
+        self.min = value if not self.min <= value else self.min
+        self.max = value if not self.max >= value else self.max
+        self.sketch.update([value])
+        return self
+
+    def update_many(self, values):
+        """
+        加入一批新样本
+
+        参数:
+            values (array-like): 新样本，NaN 会被忽略
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        chunk = RunningStats(self.ddof)
+        chunk.n = len(values)
+        chunk._mean = float(values.mean())
+        chunk._m2 = float(((values - chunk._mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self._merge_moments(chunk)
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        """
+        合并另一个分区的统计结果
+
+        参数:
+            other (RunningStats): 另一个分区的统计
+        """
+        self._merge_moments(other)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def _merge_moments(self, other):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other._mean - self._mean
+        self._mean += delta * other.n / n
+        self._m2 += other._m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = other.min if not self.min <= other.min else self.min
+        self.max = other.max if not self.max >= other.max else self.max
+
+    @property
+    def mean(self):
+        return self._mean if self.n else float('nan')
+
+    @property
+    def var(self):
+        return self._m2 / (self.n - self.ddof) if self.n > self.ddof else float('nan')
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    @property
+    def median(self):
+        return self.sketch.quantile(0.5)
+
+    def quantile(self, q):
+        """
+        估计分位数
+
+        参数:
+            q (float): 0 到 1 之间的分位点
+
+        返回:
+            float: 分位数
+        """
+        return self.sketch.quantile(q)
+
+    def describe(self):
+        """
+        返回统计结果
+
+        返回:
+            dict: 包含 count/mean/std/min/max/median 的字典
+        """
+        return {
+            'count': self.n,
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+            'median': self.median,
+        }
@@ -0,0 +1,524 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from array_utils import as_2d, ffill, restore
+from instrumentation import count, traced
+
+
+def _as_row(value):
+    # 单根K线的输入：标量视为一只股票，一维数组为多只股票
+    value = np.asarray(value, dtype=float)
+    return (value.reshape(1), True) if value.ndim == 0 else (value, False)
+
+
+def _scalar(value, squeeze):
+    return float(value[0]) if squeeze else value
+
+
+class _EWM:
+    """
+    指数加权平均（adjust=False 的递推形式），缺失值处沿用上一次的结果
+    """
+
+    def __init__(self, alpha, min_periods=1):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = None
+
+    def run(self, x):
+        out = np.empty_like(x)
+        self.value = np.full(x.shape[1], np.nan)
+        self.count = np.zeros(x.shape[1], dtype=np.int64)
+        for t in range(len(x)):
+            out[t] = self.update(x[t])
+        return out
+
+    def update(self, x):
+        if self.value is None:
+            self.value = np.full(x.shape, np.nan)
+            self.count = np.zeros(x.shape, dtype=np.int64)
+        valid = ~np.isnan(x)
+        self.value = np.where(np.isnan(self.value), x,
+                              np.where(valid, self.value + self.alpha * (x - self.value), self.value))
+        self.count += valid
+        return np.where(self.count >= self.min_periods, self.value, np.nan)
+
+
+class _RollingSums:
+    """
+    多个窗口共享的环形缓冲区，维护每个窗口内的和、平方和与有效样本数
+
+    每根新K线的更新是 O(窗口数)，与窗口长度无关；每隔 max(windows) 根K线
+    从缓冲区重新求和一次，避免浮点误差累积。
+    """
+
+    def __init__(self, windows, shift):
+        self.windows = windows
+        self.size = max(windows)
+        self.shift = shift
+        self.buffer = None
+        self.pos = 0
+
+    def seed(self, x):
+        # 用历史数据的最后 size 行初始化缓冲区
+        n = x.shape[1]
+        self.buffer = np.full((self.size, n), np.nan)
+        tail = x[-self.size:]
+        self.buffer[self.size - len(tail):] = tail - self.shift
+        self.pos = 0
+        self._resum()
+
+    def _window(self, w):
+        idx = (self.pos - w + np.arange(w)) % self.size
+        return self.buffer[idx]
+
+    def _resum(self):
+        self.sums, self.sumsq, self.counts = {}, {}, {}
+        for w in self.windows:
+            block = self._window(w)
+            valid = ~np.isnan(block)
+            filled = np.where(valid, block, 0.0)
+            self.sums[w] = filled.sum(axis=0)
+            self.sumsq[w] = (filled * filled).sum(axis=0)
+            self.counts[w] = valid.sum(axis=0)
+
+    def update(self, x):
+        x = x - self.shift
+        valid = ~np.isnan(x)
+        filled = np.where(valid, x, 0.0)
+        for w in self.windows:
+            old = self.buffer[(self.pos - w) % self.size]
+            old_valid = ~np.isnan(old)
+            old_filled = np.where(old_valid, old, 0.0)
+            self.sums[w] = self.sums[w] + filled - old_filled
+            self.sumsq[w] = self.sumsq[w] + filled * filled - old_filled * old_filled
+            self.counts[w] = self.counts[w] + valid - old_valid
+        self.buffer[self.pos % self.size] = x
+        self.pos = (self.pos + 1) % self.size
+        if self.pos == 0:
+            self._resum()
+
+
+def _rolling_sums(x, shift, windows):
+    # 一次累加，得到所有窗口的滚动和、平方和与有效样本数
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x - shift, 0.0)
+    zeros = np.zeros((1, x.shape[1]))
+    cs = np.vstack([zeros, np.cumsum(filled, axis=0)])
+    cs2 = np.vstack([zeros, np.cumsum(filled * filled, axis=0)])
+    cnt = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    result = {}
+    for w in windows:
+        sums = np.full(x.shape, np.nan)
+        sumsq = np.full(x.shape, np.nan)
+        counts = np.zeros(x.shape)
+        if w <= len(x):
+            sums[w - 1:] = cs[w:] - cs[:-w]
+            sumsq[w - 1:] = cs2[w:] - cs2[:-w]
+            counts[w - 1:] = cnt[w:] - cnt[:-w]
+        result[w] = (sums, sumsq, counts)
+    return result
+
+
+def _mean_from_sums(sums, counts, w, shift):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts == w, sums / w + shift, np.nan)
+
+
+def _std_from_sums(sums, sumsq, counts, w, ddof):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (sumsq - sums * sums / w) / (w - ddof)
+    return np.where(counts == w, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+
+def _previous_valid(x):
+    # 每一行之前最近的有效值，以及最后一个有效值（与 update 逐行跳过缺失值的结果一致）；
+    # 没有历史数据时（例如实时数据流从空状态开始）上一根K线视为缺失
+    filled = ffill(x)
+    previous = np.vstack([np.full((1, x.shape[1]), np.nan), filled[:-1]])
+    last = filled[-1].copy() if len(x) else np.full(x.shape[1], np.nan)
+    return previous, last
+
+
+def _column_shift(x):
+    # 以每列第一个有效值作为平移量，减小平方和相减时的精度损失
+    if len(x) == 0:
+        return np.zeros(x.shape[1])
+    first = np.argmax(~np.isnan(x), axis=0)
+    shift = x[first, np.arange(x.shape[1])]
+    return np.where(np.isnan(shift), 0.0, shift)
+
+
+def _windows(windows):
+    return tuple(sorted(set(windows))) if np.iterable(windows) else (int(windows),)
+
+
+class Indicator:
+    """
+    指标基类
+
+    run 对全部历史做一次向量化计算（支持 (时间, 股票) 的二维输入，一次处理多只股票），
+    并保存计算结束时的状态；之后每来一根新K线调用 update，以 O(1) 的代价得到新值。
+    两个方法都返回 {输出名称: 数组} 的字典。
+    """
+
+    inputs = ('close',)
+
+    def run(self, **arrays):
+        raise NotImplementedError
+
+    def update(self, **values):
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    """
+    简单移动平均，一次累加同时计算多个窗口（与 pandas 的 rolling(window).mean() 一致）
+
+    参数:
+        windows (int | tuple[int]): 窗口长度
+    """
+
+    def __init__(self, windows=(20,)):
+        self.windows = _windows(windows)
+
+    def run(self, close):
+        x, squeeze = as_2d(close)
+        shift = _column_shift(x)
+        sums = _rolling_sums(x, shift, self.windows)
+        self._state = _RollingSums(self.windows, shift)
+        self._state.seed(x)
+        return {f'sma_{w}': restore(_mean_from_sums(s, c, w, shift), squeeze)
+                for w, (s, _, c) in sums.items()}
+
+    def update(self, close):
+        x, squeeze = _as_row(close)
+        state = self._state
+        state.update(x)
+        return {f'sma_{w}': _scalar(_mean_from_sums(state.sums[w], state.counts[w], w, state.shift), squeeze)
+                for w in self.windows}
+
+
+class RollingStd(Indicator):
+    """
+    滚动标准差，一次累加同时计算多个窗口（与 pandas 的 rolling(window).std() 一致）
+
+    参数:
+        windows (int | tuple[int]): 窗口长度
+        ddof (int): 自由度修正
+    """
+
+    def __init__(self, windows=(20,), ddof=1):
+        self.windows = _windows(windows)
+        self.ddof = ddof
+
+    def run(self, close):
+        x, squeeze = as_2d(close)
+        shift = _column_shift(x)
+        sums = _rolling_sums(x, shift, self.windows)
+        self._state = _RollingSums(self.windows, shift)
+        self._state.seed(x)
+        return {f'std_{w}': restore(_std_from_sums(s, s2, c, w, self.ddof), squeeze)
+                for w, (s, s2, c) in sums.items()}
+
+    def update(self, close):
+        x, squeeze = _as_row(close)
+        state = self._state
+        state.update(x)
+        return {f'std_{w}': _scalar(_std_from_sums(state.sums[w], state.sumsq[w], state.counts[w],
+                                                   w, self.ddof), squeeze)
+                for w in self.windows}
+
+
+class Bollinger(Indicator):
+    """
+    布林带：中轨为移动平均，上下轨为中轨加减 k 倍滚动标准差
+
+    参数:
+        window (int): 窗口长度
+        k (float): 标准差倍数
+    """
+
+    def __init__(self, window=20, k=2.0):
+        self.window = window
+        self.k = k
+        self._sma = SMA(window)
+        self._std = RollingStd(window)
+
+    def run(self, close):
+        return self._combine(self._sma.run(close), self._std.run(close))
+
+    def update(self, close):
+        return self._combine(self._sma.update(close), self._std.update(close))
+
+    def _combine(self, mean, std):
+        mid = mean[f'sma_{self.window}']
+        width = self.k * std[f'std_{self.window}']
+        return {'mid': mid, 'upper': mid + width, 'lower': mid - width}
+
+
+class EMA(Indicator):
+    """
+    指数移动平均（与 pandas 的 ewm(span=span, adjust=False).mean() 一致）
+
+    参数:
+        spans (int | tuple[int]): 周期
+    """
+
+    def __init__(self, spans=(12,)):
+        self.spans = _windows(spans)
+        self._ewms = {span: _EWM(2.0 / (span + 1)) for span in self.spans}
+
+    def run(self, close):
+        x, squeeze = as_2d(close)
+        return {f'ema_{span}': restore(ewm.run(x), squeeze) for span, ewm in self._ewms.items()}
+
+    def update(self, close):
+        x, squeeze = _as_row(close)
+        return {f'ema_{span}': _scalar(ewm.update(x), squeeze) for span, ewm in self._ewms.items()}
+
+
+class RSI(Indicator):
+    """
+    相对强弱指标，涨跌幅用 Wilder 平滑（alpha=1/window 的指数平均），前 window 根K线为NaN
+
+    参数:
+        window (int): 周期
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self._gain = _EWM(1.0 / window, window)
+        self._loss = _EWM(1.0 / window, window)
+        self._prev = None
+
+    def run(self, close):
+        x, squeeze = as_2d(close)
+        previous, self._prev = _previous_valid(x)
+        delta = x - previous
+        gain = self._gain.run(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)))
+        loss = self._loss.run(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0)))
+        return {'rsi': restore(self._rsi(gain, loss), squeeze)}
+
+    def update(self, close):
+        x, squeeze = _as_row(close)
+        delta = x - self._prev
+        self._prev = np.where(np.isnan(x), self._prev, x)
+        gain = self._gain.update(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)))
+        loss = self._loss.update(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0)))
+        return {'rsi': _scalar(self._rsi(gain, loss), squeeze)}
+
+    @staticmethod
+    def _rsi(gain, loss):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(loss == 0, np.where(np.isnan(gain), np.nan, 100.0), 100.0 - 100.0 / (1.0 + gain / loss))
+
+
+class MACD(Indicator):
+    """
+    MACD：快慢两条EMA之差，及其信号线和柱状图
+
+    参数:
+        fast (int): 快线周期
+        slow (int): 慢线周期
+        signal (int): 信号线周期
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = _EWM(2.0 / (fast + 1))
+        self.slow = _EWM(2.0 / (slow + 1))
+        self.signal = _EWM(2.0 / (signal + 1))
+
+    def run(self, close):
+        x, squeeze = as_2d(close)
+        line = self.fast.run(x) - self.slow.run(x)
+        signal = self.signal.run(line)
+        return {k: restore(v, squeeze) for k, v in
+                {'macd': line, 'signal': signal, 'hist': line - signal}.items()}
+
+    def update(self, close):
+        x, squeeze = _as_row(close)
+        line = self.fast.update(x) - self.slow.update(x)
+        signal = self.signal.update(line)
+        return {k: _scalar(v, squeeze) for k, v in
+                {'macd': line, 'signal': signal, 'hist': line - signal}.items()}
+
+
+class ATR(Indicator):
+    """
+    平均真实波幅，真实波幅用 Wilder 平滑，前 window-1 根K线为NaN
+
+    参数:
+        window (int): 周期
+    """
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, window=14):
+        self.window = window
+        self._ewm = _EWM(1.0 / window, window)
+        self._prev_close = None
+
+    def run(self, high, low, close):
+        high, squeeze = as_2d(high)
+        low, _ = as_2d(low)
+        close, _ = as_2d(close)
+        prev_close, self._prev_close = _previous_valid(close)
+        atr = self._ewm.run(self._true_range(high, low, prev_close))
+        return {'atr': restore(atr, squeeze)}
+
+    def update(self, high, low, close):
+        high, squeeze = _as_row(high)
+        low, _ = _as_row(low)
+        close, _ = _as_row(close)
+        atr = self._ewm.update(self._true_range(high, low, self._prev_close))
+        self._prev_close = np.where(np.isnan(close), self._prev_close, close)
+        return {'atr': _scalar(atr, squeeze)}
+
+    @staticmethod
+    def _true_range(high, low, prev_close):
+        # 第一根K线没有前收盘价，真实波幅取最高价减最低价
+        return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'std': RollingStd,
+    'bollinger': Bollinger,
+    'rsi': RSI,
+    'macd': MACD,
+    'atr': ATR,
+}
+
+
+def _freeze(value):
+    return tuple(value) if np.iterable(value) and not isinstance(value, str) else value
+
+
+class IndicatorEngine:
+    """
+    带缓存的指标计算引擎
+
+    计算结果按 (股票, 指标, 参数) 缓存，并记录对应的数据版本（行数和全部输入的哈希）：
+    - 数据版本相同：直接返回缓存结果；
+    - 数据只是在末尾追加了新K线（前面的行与缓存时的哈希一致）：用保存的指标状态逐根 update，每根K线 O(1)；
+    - 其他情况（历史被修改）：重新完整计算。
+
+    股票参数可以是任意可哈希的键；传入 (时间, 股票) 的二维数组时，用股票代码元组作为键，
+    一次向量化计算全部股票。
+
+    参数:
+        max_entries (int): 最多缓存的结果数量，超过后淘汰最早的结果
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = {}
+        self.stats = {'hits': 0, 'misses': 0, 'updates': 0}
+
+    @traced
+    def compute(self, symbol, name, data, index=None, **params):
+        """
+        计算（或从缓存获取）指标
+
+        参数:
+            symbol (hashable): 股票代码，多只股票一起计算时为代码元组
+            name (str): 指标名称，见 INDICATORS
+            data (pd.DataFrame | dict): 单只股票的历史数据，或 {字段: 数组} 字典
+                                        （字段为 'close'/'high'/'low'，数组可以是 (时间, 股票) 的二维数组）
+            index (array-like): data 为字典时对应的时间索引
+            **params: 指标参数，例如 windows=(50, 200)
+
+        返回:
+            dict: {输出名称: np.ndarray}，数组为只读（与缓存共用内存），需要修改时先复制
+        """
+        indicator_cls = INDICATORS[name]
+        index, fields = _extract_fields(data, index, indicator_cls.inputs)
+        key = (symbol, name, tuple(sorted((k, _freeze(v)) for k, v in params.items())))
+        version = _data_version(index, fields)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry['version'] == version:
+            self.stats['hits'] += 1
+            count('indicators.hits')
+            return entry['columns'].view()
+
+        if entry is not None and _extends(entry['version'], index, fields):
+            self.stats['updates'] += 1
+            count('indicators.updates')
+            indicator, columns = entry['indicator'], entry['columns']
+            for i in range(entry['version'][0], len(index)):
+                columns.append(indicator.update(**{f: values[i] for f, values in fields.items()}))
+        else:
+            self.stats['misses'] += 1
+            count('indicators.misses')
+            indicator = indicator_cls(**params)
+            columns = _GrowableColumns(indicator.run(**fields))
+
+        self._entries.pop(key, None)
+        self._entries[key] = {'version': version, 'indicator': indicator, 'columns': columns}
+        if len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        return columns.view()
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        self._entries.clear()
+
+
+def _extract_fields(data, index, inputs):
+    if isinstance(data, pd.DataFrame):
+        return data.index, {f: data[f.capitalize()].to_numpy(dtype=float) for f in inputs}
+    if index is None:
+        raise ValueError("data 为字典时需要提供 index")
+    return index, {f: np.asarray(data[f], dtype=float) for f in inputs}
+
+
+def _data_version(index, fields, n=None):
+    # 数据版本：行数和前 n 行全部输入（时间索引和各字段）的哈希
+    n = len(index) if n is None else n
+    h = hashlib.sha256()
+    h.update(pd.util.hash_array(np.asarray(index[:n])).tobytes())
+    for values in fields.values():
+        h.update(np.ascontiguousarray(values[:n]).tobytes())
+    return (n, h.hexdigest())
+
+
+def _extends(version, index, fields):
+    # 新数据是否只是在旧数据末尾追加了K线（旧数据的每一行都没有被修改）
+    n = version[0]
+    return 0 < n < len(index) and _data_version(index, fields, n) == version
+
+
+class _GrowableColumns:
+    """
+    按容量倍增的结果数组，追加一行的摊还代价为 O(1)
+    """
+
+    def __init__(self, columns):
+        self.n = len(next(iter(columns.values())))
+        self.data = dict(columns)
+
+    def append(self, row):
+        for name, value in row.items():
+            column = self.data[name]
+            if self.n == len(column):
+                grown = np.empty((max(2 * len(column), 1),) + column.shape[1:])
+                grown[:self.n] = column
+                self.data[name] = column = grown
+            column[self.n] = value
+        self.n += 1
+
+    def view(self):
+        # 只读视图：缓存的结果会在之后的命中中再次返回，调用方不能原地修改
+        views = {}
+        for name, column in self.data.items():
+            views[name] = column[:self.n]
+            views[name].setflags(write=False)
+        return views
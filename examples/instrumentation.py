@@ -0,0 +1,317 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# 默认关闭：关闭时 traced 包装的函数只多一次全局变量判断，count 直接返回
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_origin_ns = 0
+_spans = []
+_counters = {}
+_counter_events = []
+_output = None
+
+
+def enable(output=None):
+    """
+    开始记录（清空之前的记录）
+
+    参数:
+        output (str | None): finish 时写出 Chrome trace 的路径，None 表示不写文件
+    """
+    global _enabled, _origin_ns, _output
+    reset()
+    _origin_ns = time.perf_counter_ns()
+    _output = output
+    _enabled = True
+
+
+def enable_from_env(variable='STOCK_TRACE'):
+    """
+    设置了环境变量时开始记录，变量的值为 Chrome trace 的输出路径（为 '1' 时只输出汇总表）
+
+    参数:
+        variable (str): 环境变量名
+
+    返回:
+        bool: 是否开启
+    """
+    value = os.environ.get(variable)
+    if value:
+        enable(None if value == '1' else value)
+    return _enabled
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _counter_events.clear()
+
+
+class span:
+    """
+    计时区间，作为上下文管理器使用；嵌套的区间组成调用栈，汇总时分别统计总耗时和自身耗时
+
+        with span('load', symbol='AAPL'):
+            ...
+
+    参数:
+        name (str): 区间名称
+        **args: 附加信息，写入 Chrome trace 的 args
+    """
+
+    __slots__ = ('name', 'args', '_frame')
+
+    def __init__(self, name, **args):
+        self.name = name
+        self.args = args
+        self._frame = None
+
+    def __enter__(self):
+        if _enabled:
+            stack = _stack()
+            # [名称, 开始时间, 子区间耗时之和, 不计入耗时的时间]
+            self._frame = [self.name, time.perf_counter_ns(), 0, 0]
+            stack.append(self._frame)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        frame = self._frame
+        if frame is None:
+            return False
+        end = time.perf_counter_ns()
+        stack = _stack()
+        path = tuple(f[0] for f in stack)
+        stack.pop()
+        duration = end - frame[1] - frame[3]
+        if stack:
+            stack[-1][2] += duration
+        record = (self.name, frame[1] - _origin_ns, duration, duration - frame[2], path,
+                  threading.get_ident(), self.args)
+        with _lock:
+            _spans.append(record)
+        self._frame = None
+        return False
+
+
+class untimed:
+    """
+    不计入耗时的代码段，例如等待用户关闭图形窗口的 plt.show()：经过的时间从所有外层区间中扣除
+
+        with untimed():
+            plt.show()
+    """
+
+    __slots__ = ('_start',)
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns() if _enabled else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._start is not None:
+            elapsed = time.perf_counter_ns() - self._start
+            for frame in _stack():
+                frame[3] += elapsed
+        return False
+
+
+def traced(func=None, *, name=None):
+    """
+    装饰器：每次调用记录一个区间，名称默认为函数的限定名
+
+        @traced
+        def get_stock_data(...): ...
+
+        draw = traced(fig.canvas.draw, name='pyplot.draw')
+
+    参数:
+        func (callable): 被装饰的函数
+        name (str | None): 区间名称
+
+    返回:
+        callable: 包装后的函数
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+    label = name or getattr(func, '__qualname__', repr(func))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with span(label):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def count(name, n=1):
+    """
+    计数器累加，例如处理的行数、获取的字节数、缓存命中次数、绘制的图形元素数
+
+    参数:
+        name (str): 计数器名称
+        n (int | float): 增加的数量
+    """
+    if not _enabled:
+        return
+    ts = time.perf_counter_ns() - _origin_ns
+    with _lock:
+        total = _counters.get(name, 0) + n
+        _counters[name] = total
+        _counter_events.append((name, ts, total))
+
+
+def count_artists(fig, name='artists'):
+    """
+    统计图形中已经添加的图形元素（线、集合、图片、补丁、文字）数量并计数
+
+    参数:
+        fig (matplotlib.figure.Figure): 图形
+        name (str): 计数器名称
+    """
+    if not _enabled:
+        return
+    count(name, sum(len(ax.lines) + len(ax.collections) + len(ax.images) + len(ax.patches) + len(ax.texts)
+                    for ax in fig.axes))
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def summary():
+    """
+    按区间名称汇总
+
+    返回:
+        pd.DataFrame: 每个区间名称一行：调用次数、总耗时、自身耗时（不含子区间）、平均和最大耗时，
+                      以及总耗时占所有顶层区间耗时的比例，按总耗时降序排列
+    """
+    import pandas as pd
+
+    with _lock:
+        spans = list(_spans)
+    columns = ['calls', 'total_s', 'self_s', 'mean_ms', 'max_ms', 'share']
+    if not spans:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame([(s[0], s[2], s[3], len(s[4]) == 1) for s in spans],
+                         columns=['name', 'duration', 'self', 'root'])
+    wall = frame.loc[frame['root'], 'duration'].sum()
+    grouped = frame.groupby('name')
+    table = pd.DataFrame({
+        'calls': grouped.size(),
+        'total_s': grouped['duration'].sum() / 1e9,
+        'self_s': grouped['self'].sum() / 1e9,
+        'mean_ms': grouped['duration'].mean() / 1e6,
+        'max_ms': grouped['duration'].max() / 1e6,
+    })
+    table['share'] = table['total_s'] * 1e9 / wall if wall else float('nan')
+    return table.sort_values('total_s', ascending=False)[columns]
+
+
+def report():
+    """
+    返回:
+        str: 区间汇总表和计数器，用于在运行结束时打印
+    """
+    table = summary()
+    lines = ['=== 各阶段耗时 ===']
+    if table.empty:
+        lines.append('（没有记录）')
+    else:
+        lines.append(f"{'区间':<40} {'次数':>6} {'总耗时(s)':>10} {'自身(s)':>9} {'平均(ms)':>10} {'最大(ms)':>10} {'占比':>7}")
+        for name, row in table.iterrows():
+            lines.append(f"{name:<40} {int(row['calls']):>6} {row['total_s']:>10.3f} {row['self_s']:>9.3f} "
+                         f"{row['mean_ms']:>10.1f} {row['max_ms']:>10.1f} {row['share']:>7.1%}")
+    values = counters()
+    if values:
+        lines.append('\n=== 计数器 ===')
+        for name in sorted(values):
+            lines.append(f"{name:<40} {values[name]:>16,}")
+    return '\n'.join(lines)
+
+
+def write_chrome_trace(path):
+    """
+    写出 Chrome trace 格式的文件，可以在 chrome://tracing 或 https://ui.perfetto.dev 中打开：
+    每个区间是一个完整事件（ph='X'），计数器是随时间变化的计数事件（ph='C'）
+
+    参数:
+        path (str): 输出路径（.json）
+    """
+    pid = os.getpid()
+    with _lock:
+        spans = list(_spans)
+        counter_events = list(_counter_events)
+    events = [{'name': name, 'cat': 'span', 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3,
+               'pid': pid, 'tid': tid, 'args': {k: _jsonable(v) for k, v in args.items()}}
+              for name, start, duration, _, _, tid, args in spans]
+    events += [{'name': name, 'ph': 'C', 'ts': ts / 1e3, 'pid': pid, 'args': {name: total}}
+               for name, ts, total in counter_events]
+    events.sort(key=lambda event: event['ts'])
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    os.replace(path + '.tmp', path)
+
+
+def write_folded(path):
+    """
+    写出折叠调用栈格式（每行 "a;b;c 自身耗时微秒"），可以直接交给 flamegraph.pl 或 speedscope 生成火焰图
+
+    参数:
+        path (str): 输出路径
+    """
+    totals = {}
+    with _lock:
+        for _, _, _, self_ns, stack, _, _ in _spans:
+            totals[stack] = totals.get(stack, 0) + self_ns
+    with open(path, 'w') as f:
+        for stack, self_ns in sorted(totals.items()):
+            f.write(f"{';'.join(stack)} {max(1, self_ns // 1000)}\n")
+
+
+def finish():
+    """
+    运行结束时调用：打印汇总表，enable 时指定了输出路径则写出 Chrome trace 和同名的 .folded 文件，
+    然后停止记录
+
+    返回:
+        str | None: Chrome trace 的路径
+    """
+    if not _enabled:
+        return None
+    print(report())
+    output = _output
+    if output:
+        write_chrome_trace(output)
+        write_folded(os.path.splitext(output)[0] + '.folded')
+        print(f"\nChrome trace 已写入 {output}")
+    disable()
+    return output
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _jsonable(value):
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
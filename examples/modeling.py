@@ -0,0 +1,395 @@
+import copy
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from param_sweep import _share_fields
+
+# 子进程中挂载的共享特征矩阵和标签，由 _init_worker 设置
+_worker_arrays = {}
+_worker_segments = []
+
+
+class Model:
+    """
+    模型接口：fit(X, y) 训练并返回自身，predict(X) 返回预测值
+
+    X 为 (样本, 特征) 的 float32 数组，y 为 (样本,) 数组，都不含NaN。walk_forward 在每个折上
+    复制一份未训练的模型再训练，模型需要能被 pickle（在子进程中训练）。任何实现了这两个方法的
+    对象都可以使用，例如 LightGBM、scikit-learn 的回归器。
+    """
+
+    def fit(self, X, y):
+        raise NotImplementedError
+
+    def predict(self, X):
+        raise NotImplementedError
+
+
+class RidgeModel(Model):
+    """
+    岭回归（alpha=0 时为普通最小二乘），特征先按训练集标准化，用正规方程求解
+
+    参数:
+        alpha (float): L2 正则化系数（按样本数缩放，与特征个数无关）
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.coef = None
+        self.intercept = 0.0
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+        gram = Z.T @ Z + self.alpha * len(Z) * np.eye(Z.shape[1])
+        coef = np.linalg.lstsq(gram, Z.T @ (y - y.mean()), rcond=None)[0]
+        # 换算回原始特征的系数，预测时不需要再标准化
+        self.coef = coef / scale
+        self.intercept = y.mean() - mean @ self.coef
+        return self
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef + self.intercept
+
+
+class GradientBoostingModel(Model):
+    """
+    基于直方图的梯度提升回归树（平方损失），只依赖 numpy
+
+    每个特征先按训练集的分位数分成 n_bins 个箱，每层用一次 bincount 统计所有节点、所有特征、
+    所有箱的梯度和，再取增益最大的分割点，树按层生长到 depth 层。
+
+    参数:
+        n_trees (int): 树的数量
+        depth (int): 树的深度
+        learning_rate (float): 学习率
+        n_bins (int): 每个特征的分箱数（不超过256）
+        min_leaf (int): 叶子节点的最少样本数
+        subsample (float): 每棵树随机使用的样本比例
+        seed (int): 随机数种子
+    """
+
+    def __init__(self, n_trees=50, depth=3, learning_rate=0.1, n_bins=32, min_leaf=200, subsample=0.5, seed=0):
+        self.n_trees = n_trees
+        self.depth = depth
+        self.learning_rate = learning_rate
+        self.n_bins = n_bins
+        self.min_leaf = min_leaf
+        self.subsample = subsample
+        self.seed = seed
+        self.edges = None
+        self.trees = []
+        self.base = 0.0
+
+    def fit(self, X, y):
+        rng = np.random.default_rng(self.seed)
+        y = np.asarray(y, dtype=float)
+        sample = X[rng.choice(len(X), min(len(X), 100_000), replace=False)]
+        quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+        self.edges = [np.unique(np.quantile(sample[:, f], quantiles)) for f in range(X.shape[1])]
+        bins = self._bin(X)
+        self.base = y.mean()
+        pred = np.full(len(y), self.base)
+        self.trees = []
+        for _ in range(self.n_trees):
+            rows = np.flatnonzero(rng.random(len(y)) < self.subsample) if self.subsample < 1 else np.arange(len(y))
+            tree = self._grow(bins[rows], y[rows] - pred[rows])
+            self.trees.append(tree)
+            pred += tree[2][self._apply(tree, bins)]
+        return self
+
+    def predict(self, X):
+        bins = self._bin(X)
+        pred = np.full(len(bins), self.base)
+        for tree in self.trees:
+            pred += tree[2][self._apply(tree, bins)]
+        return pred
+
+    def _bin(self, X):
+        bins = np.empty(X.shape, dtype=np.uint8)
+        for f, edges in enumerate(self.edges):
+            bins[:, f] = np.searchsorted(edges, X[:, f], side='right')
+        return bins
+
+    def _grow(self, bins, residual):
+        n, n_features = bins.shape
+        n_bins = self.n_bins
+        features = np.zeros((self.depth, 2 ** (self.depth - 1)), dtype=np.int64)
+        thresholds = np.full((self.depth, 2 ** (self.depth - 1)), n_bins, dtype=np.int64)
+        offsets = np.arange(n_features) * n_bins
+        node = np.zeros(n, dtype=np.int64)
+        weights = np.repeat(residual, n_features)
+        for level in range(self.depth):
+            n_nodes = 2 ** level
+            # 一次 bincount 得到 (节点, 特征, 箱) 的梯度和与样本数
+            idx = ((node * (n_features * n_bins))[:, None] + offsets + bins).ravel()
+            size = n_nodes * n_features * n_bins
+            grad = np.bincount(idx, weights=weights, minlength=size).reshape(n_nodes, n_features, n_bins)
+            count = np.bincount(idx, minlength=size).reshape(n_nodes, n_features, n_bins)
+            grad_left, count_left = grad.cumsum(axis=2), count.cumsum(axis=2)
+            grad_total, count_total = grad_left[:, :, -1:], count_left[:, :, -1:]
+            grad_right, count_right = grad_total - grad_left, count_total - count_left
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gain = (grad_left ** 2 / count_left + grad_right ** 2 / count_right
+                        - grad_total ** 2 / count_total)
+            gain[(count_left < self.min_leaf) | (count_right < self.min_leaf)] = -np.inf
+            best = gain.reshape(n_nodes, -1).argmax(axis=1)
+            ok = gain.reshape(n_nodes, -1)[np.arange(n_nodes), best] > 0
+            # 没有可用分割的节点把所有样本都分到左边
+            features[level, :n_nodes] = np.where(ok, best // n_bins, 0)
+            thresholds[level, :n_nodes] = np.where(ok, best % n_bins, n_bins)
+            node = 2 * node + (bins[np.arange(n), features[level, node]] > thresholds[level, node])
+        n_leaves = 2 ** self.depth
+        sums = np.bincount(node, weights=residual, minlength=n_leaves)
+        counts = np.bincount(node, minlength=n_leaves)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(counts > 0, sums / counts, 0.0) * self.learning_rate
+        return features, thresholds, values
+
+    def _apply(self, tree, bins):
+        features, thresholds, _ = tree
+        node = np.zeros(len(bins), dtype=np.int64)
+        rows = np.arange(len(bins))
+        for level in range(self.depth):
+            node = 2 * node + (bins[rows, features[level, node]] > thresholds[level, node])
+        return node
+
+
+MODELS = {
+    'ridge': RidgeModel,
+    'gbm': GradientBoostingModel,
+}
+
+
+def walk_forward_splits(n_rows, train_window, test_window, horizon=1, step=None, expanding=False):
+    """
+    滚动的训练/测试窗口（行号区间，左闭右开）
+
+    测试窗口从 train_window + horizon - 1 开始依次向后移动 step 行。第 t 行的标签（未来 horizon
+    根K线的收益率）要到 t + horizon 才知道，所以在测试窗口第一行做预测时，训练集只能用到
+    test_start - horizon 行为止的标签。
+
+    参数:
+        n_rows (int): 总行数
+        train_window (int): 训练窗口行数（expanding=True 时为最少行数）
+        test_window (int): 测试窗口行数
+        horizon (int): 标签的周期
+        step (int | None): 每次移动的行数，None 表示等于 test_window（测试窗口不重叠）
+        expanding (bool): 训练窗口是否从第0行开始不断扩大
+
+    返回:
+        list[tuple]: [(train_start, train_end, test_start, test_end), ...]
+    """
+    step = step or test_window
+    splits = []
+    test_start = train_window + horizon - 1
+    while test_start < n_rows:
+        train_end = test_start - horizon + 1
+        train_start = 0 if expanding else train_end - train_window
+        splits.append((train_start, train_end, test_start, min(test_start + test_window, n_rows)))
+        test_start += step
+    return splits
+
+
+def predict_cross_section(model, values, rows=None):
+    """
+    批量预测：对给定时间点的所有股票一次调用 predict，含NaN特征的股票预测为NaN
+
+    参数:
+        model (Model): 训练好的模型
+        values (np.ndarray): (时间, 股票, 特征) 设计矩阵，见 FeatureMatrix.values
+        rows (slice | None): 时间行的范围，None 表示全部
+
+    返回:
+        np.ndarray: (时间, 股票) float32 预测值
+    """
+    block = values if rows is None else values[rows]
+    X = block.reshape(-1, block.shape[-1])
+    valid = np.isfinite(X).all(axis=1)
+    pred = np.full(len(X), np.nan, dtype=np.float32)
+    if valid.any():
+        pred[valid] = model.predict(X[valid])
+    return pred.reshape(block.shape[:2])
+
+
+class WalkForwardResult:
+    """
+    滚动训练的结果
+
+    参数:
+        predictions (np.ndarray): (时间, 股票) 样本外预测，不在任何测试窗口内的行为NaN
+        folds (pd.DataFrame): 每个折一行：时间范围、样本数、训练/预测耗时、内存、信息系数
+        models (list[Model]): 每个折训练好的模型
+        target (np.ndarray): (时间, 股票) 标签
+        index (pd.DatetimeIndex): 时间索引
+    """
+
+    def __init__(self, predictions, folds, models, target, index):
+        self.predictions = predictions
+        self.folds = folds
+        self.models = models
+        self.target = target
+        self.index = index
+
+    def ic(self):
+        """
+        每个测试日的信息系数：预测值与实际收益率在股票之间的相关系数
+
+        返回:
+            pd.Series: 日期 -> 信息系数
+        """
+        covered = ~np.isnan(self.predictions).all(axis=1)
+        ic = _row_corr(self.predictions[covered], self.target[covered])
+        return pd.Series(ic, index=self.index[covered], name='ic')
+
+    def summary(self):
+        """
+        返回:
+            dict: 折数、平均信息系数、信息系数的 t 值、总训练/预测耗时
+        """
+        ic = self.ic().dropna()
+        return {
+            'folds': len(self.folds),
+            'mean_ic': ic.mean(),
+            'ic_t': ic.mean() / ic.std() * np.sqrt(len(ic)) if len(ic) > 1 else np.nan,
+            'fit_seconds': self.folds['fit_s'].sum(),
+            'predict_seconds': self.folds['predict_s'].sum(),
+        }
+
+
+def walk_forward(matrix, target, model, train_window=756, test_window=63, horizon=1, step=None,
+                 expanding=False, max_workers=None, mp_context=None):
+    """
+    滚动训练与样本外预测：每个折用训练窗口内的 (时间, 股票) 样本训练一个模型，再对测试窗口内
+    每个时间点的全部股票批量预测
+
+    特征矩阵只构建一次（见 features.FeatureBuilder），多个折并行时放在共享内存中，子进程按名字挂载，
+    各个折只是切取其中不同的行，不会重新计算或复制整个矩阵。
+
+    参数:
+        matrix (FeatureMatrix): 设计矩阵
+        target (np.ndarray): (时间, 股票) 标签，例如 features.forward_returns(panel, horizon)
+        model (Model | str): 模型，或 MODELS 中的名称；每个折训练它的一个副本
+        train_window (int): 训练窗口行数
+        test_window (int): 测试窗口行数
+        horizon (int): 标签的周期，决定训练集和测试集之间的间隔
+        step (int | None): 测试窗口每次移动的行数
+        expanding (bool): 是否使用扩大的训练窗口
+        max_workers (int | None): 进程数，None 表示CPU核数；为1时在当前进程中顺序运行
+        mp_context (str | None): 进程启动方式，例如 'spawn'、'fork'
+
+    返回:
+        WalkForwardResult: 结果
+    """
+    model = MODELS[model]() if isinstance(model, str) else model
+    values = np.ascontiguousarray(matrix.values)
+    target = np.asarray(target, dtype=np.float32)
+    splits = walk_forward_splits(len(matrix.index), train_window, test_window, horizon, step, expanding)
+    if not splits:
+        raise ValueError(f"数据只有 {len(matrix.index)} 行，不够一个训练窗口加测试窗口")
+    tasks = [(i, split, model) for i, split in enumerate(splits)]
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1 or len(tasks) == 1:
+        outcomes = [_run_fold(task, values, target) for task in tasks]
+    else:
+        segments, specs = _share_fields({'X': values, 'y': target}, ('X', 'y'))
+        try:
+            ctx = mp.get_context(mp_context)
+            with ctx.Pool(min(max_workers, len(tasks)), initializer=_init_worker, initargs=(specs,)) as pool:
+                outcomes = list(pool.imap_unordered(_run_fold_in_worker, tasks))
+        finally:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+
+    outcomes.sort(key=lambda outcome: outcome['fold'])
+    predictions = np.full(target.shape, np.nan, dtype=np.float32)
+    rows = []
+    for outcome in outcomes:
+        train_start, train_end, test_start, test_end = outcome['split']
+        predictions[test_start:test_end] = outcome['predictions']
+        rows.append({
+            'fold': outcome['fold'],
+            'train_start': matrix.index[train_start],
+            'train_end': matrix.index[train_end - 1],
+            'test_start': matrix.index[test_start],
+            'test_end': matrix.index[test_end - 1],
+            'train_samples': outcome['train_samples'],
+            'fit_s': outcome['fit_s'],
+            'predict_s': outcome['predict_s'],
+            'train_mb': outcome['train_mb'],
+            'peak_rss_mb': outcome['peak_rss_mb'],
+            'ic': np.nanmean(_row_corr(outcome['predictions'], target[test_start:test_end])),
+        })
+    folds = pd.DataFrame(rows).set_index('fold')
+    return WalkForwardResult(predictions, folds, [outcome['model'] for outcome in outcomes], target, matrix.index)
+
+
+def _run_fold(task, values, target):
+    fold, split, model = task
+    train_start, train_end, test_start, test_end = split
+    n_features = values.shape[-1]
+    X = values[train_start:train_end].reshape(-1, n_features)
+    y = target[train_start:train_end].reshape(-1)
+    valid = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    X, y = X[valid], y[valid]
+
+    model = copy.deepcopy(model)
+    t0 = time.perf_counter()
+    model.fit(X, y)
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    predictions = predict_cross_section(model, values, slice(test_start, test_end))
+    predict_s = time.perf_counter() - t0
+    return {'fold': fold, 'split': split, 'model': model, 'predictions': predictions,
+            'train_samples': len(y), 'fit_s': fit_s, 'predict_s': predict_s,
+            'train_mb': (X.nbytes + y.nbytes) / 2 ** 20, 'peak_rss_mb': _peak_rss_mb()}
+
+
+def _run_fold_in_worker(task):
+    return _run_fold(task, _worker_arrays['X'], _worker_arrays['y'])
+
+
+def _init_worker(specs):
+    for field, (name, shape, dtype) in specs.items():
+        segment = shared_memory.SharedMemory(name=name)
+        # 保留引用，否则共享内存段会被关闭，数组随之失效
+        _worker_segments.append(segment)
+        values = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        values.flags.writeable = False
+        _worker_arrays[field] = values
+
+
+def _peak_rss_mb():
+    # 当前进程的常驻内存峰值；resource 模块只在类 Unix 系统上可用
+    try:
+        import resource
+    except ImportError:
+        return np.nan
+    # Linux 上 ru_maxrss 的单位是KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _row_corr(a, b):
+    # 每一行（一个时间点）在两个数组都有效的股票上的相关系数
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    valid = ~(np.isnan(a) | np.isnan(b))
+    n = valid.sum(axis=1)
+    a = np.where(valid, a, 0.0)
+    b = np.where(valid, b, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = np.where(valid, a - a.sum(axis=1, keepdims=True) / n[:, None], 0.0)
+        b = np.where(valid, b - b.sum(axis=1, keepdims=True) / n[:, None], 0.0)
+        corr = (a * b).sum(axis=1) / np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+    return np.where(n > 2, corr, np.nan)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+从 examples 下的 .py 课程脚本生成 Jupyter notebook
+
+课程脚本用单元格标记划分 notebook 的单元格（与 jupytext 的 percent 格式相同）：
+- "# %%" 开始一个代码单元格
+- "# %% [markdown]" 开始一个 Markdown 单元格，后面每行去掉开头的 "# " 作为内容
+- 第一个标记之前的内容不会进入 notebook
+- if __name__ == "__main__": 这一行不会进入 notebook，它下面缩进的代码去掉一层缩进，
+  这样同一个文件既能作为脚本运行，也能生成逐步执行的 notebook
+
+每个单元格按内容计算哈希（作为单元格 id），notebook 元数据中记录两个哈希：
+- source_hash: 全部单元格的哈希，不变时不重写文件
+- code_hash: 代码单元格和脚本导入的本地模块的哈希，不变时保留已有的执行结果，不重新执行
+只改了 Markdown 时会重写文件，但直接沿用之前的输出。
+
+需要执行的 notebook 在多个进程中并行执行（需要安装 nbclient 和 ipykernel），执行时设置
+OHLCV_CACHE_OFFLINE=1，OHLCVCache 只读本地缓存，不访问网络。
+
+用法:
+    python notebook_scripts/build_notebooks.py                  # 生成所有有单元格标记的课程
+    python notebook_scripts/build_notebooks.py --execute -j 4   # 生成并执行
+    python notebook_scripts/build_notebooks.py 2_day2_stock_data_processing.py --force
+"""
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import re
+
+EXAMPLES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+_MARKER = re.compile(r'^# %%(?:\s*\[(\w+)\])?\s*$')
+_MAIN_GUARD = re.compile(r'''^if __name__ == ['"]__main__['"]:\s*$''')
+
+NOTEBOOK_METADATA = {
+    "kernelspec": {
+        "display_name": "Python 3",
+        "language": "python",
+        "name": "python3"
+    },
+    "language_info": {
+        "codemirror_mode": {
+            "name": "ipython",
+            "version": 3
+        },
+        "file_extension": ".py",
+        "mimetype": "text/x-python",
+        "name": "python",
+        "nbconvert_exporter": "python",
+        "pygments_lexer": "ipython3"
+    }
+}
+
+
+def parse_cells(text):
+    """
+    按单元格标记把脚本拆分为单元格
+
+    参数:
+        text (str): 脚本内容
+
+    返回:
+        list[tuple]: [(单元格类型 'code' 或 'markdown', 内容)]
+    """
+    cells = []
+    cell_type, lines = None, []
+    in_main = False
+
+    def flush():
+        source = '\n'.join(lines).strip('\n')
+        if cell_type is not None and source.strip():
+            cells.append((cell_type, source))
+
+    for line in text.splitlines():
+        if _MAIN_GUARD.match(line):
+            in_main = True
+            continue
+        if in_main:
+            if line.startswith('    '):
+                line = line[4:]
+            elif line.strip():
+                in_main = False
+        match = _MARKER.match(line.strip()) if line.strip().startswith('# %%') else None
+        if match:
+            flush()
+            cell_type = 'markdown' if match.group(1) == 'markdown' else 'code'
+            lines = []
+        elif cell_type == 'markdown':
+            stripped = line.strip()
+            lines.append(stripped[2:] if stripped.startswith('# ') else stripped.lstrip('#'))
+        elif cell_type == 'code':
+            lines.append(line)
+    flush()
+    return cells
+
+
+def local_dependencies(path, seen=None):
+    """
+    脚本（递归）导入的同目录模块，它们的修改会影响执行结果
+
+    参数:
+        path (str): 脚本路径
+        seen (set | None): 已经找到的模块路径
+
+    返回:
+        set[str]: 模块文件路径
+    """
+    seen = set() if seen is None else seen
+    directory = os.path.dirname(path)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            module = os.path.join(directory, name.split('.')[0] + '.py')
+            if os.path.exists(module) and module not in seen:
+                seen.add(module)
+                local_dependencies(module, seen)
+    return seen
+
+
+def build_notebook(path):
+    """
+    根据脚本生成 notebook（不执行）
+
+    参数:
+        path (str): 课程脚本路径
+
+    返回:
+        dict: notebook 内容，metadata['build'] 中记录 source_hash 和 code_hash
+    """
+    with open(path, encoding='utf-8') as f:
+        cells = parse_cells(f.read())
+
+    notebook_cells, ids = [], set()
+    for cell_type, source in cells:
+        cell_id = _digest(cell_type, source)[:12]
+        while cell_id in ids:
+            # 内容完全相同的单元格，id 需要保持唯一
+            cell_id = _digest(cell_id)[:12]
+        ids.add(cell_id)
+        cell = {'cell_type': cell_type, 'id': cell_id, 'metadata': {}, 'source': _split_lines(source)}
+        if cell_type == 'code':
+            cell.update(execution_count=None, outputs=[])
+        notebook_cells.append(cell)
+
+    code = [source for cell_type, source in cells if cell_type == 'code']
+    dependencies = sorted(local_dependencies(path) - {os.path.abspath(path)})
+    dependency_hashes = [_file_digest(module) for module in dependencies]
+    metadata = json.loads(json.dumps(NOTEBOOK_METADATA))
+    metadata['build'] = {
+        'source': os.path.basename(path),
+        'source_hash': _digest(*(c['id'] for c in notebook_cells)),
+        'code_hash': _digest(*code, *dependency_hashes),
+        'executed': False,
+    }
+    return {'cells': notebook_cells, 'metadata': metadata, 'nbformat': 4, 'nbformat_minor': 5}
+
+
+def plan(path, output, execute=False, force=False):
+    """
+    决定一个 notebook 需要做什么
+
+    参数:
+        path (str): 课程脚本路径
+        output (str): notebook 路径
+        execute (bool): 是否需要执行结果
+        force (bool): 忽略哈希，重新生成（和执行）
+
+    返回:
+        tuple: (动作, 新的 notebook)，动作为 'unchanged'、'write' 或 'execute'；
+               'write' 时如果代码没变，新 notebook 已经带上了之前的输出
+    """
+    notebook = build_notebook(path)
+    build = notebook['metadata']['build']
+    existing = _load(output)
+    old = existing.get('metadata', {}).get('build', {}) if existing else {}
+
+    reuse_outputs = not force and old.get('executed') and old.get('code_hash') == build['code_hash']
+    if reuse_outputs:
+        _copy_outputs(existing, notebook)
+    if execute and not reuse_outputs:
+        return 'execute', notebook
+    # 导入的本地模块变化时单元格内容不变，但记录的 code_hash 过期，未执行的 notebook 也要重写
+    if not force and old.get('source_hash') == build['source_hash'] and old.get('code_hash') == build['code_hash']:
+        return 'unchanged', notebook
+    return 'write', notebook
+
+
+def build_all(sources, execute=False, force=False, max_workers=None, mp_context=None, timeout=600):
+    """
+    生成（并执行）一组 notebook，只处理输入有变化的部分
+
+    参数:
+        sources (list[str]): 课程脚本路径，notebook 写在同一目录、同名的 .ipynb
+        execute (bool): 是否执行 notebook
+        force (bool): 忽略哈希，全部重新生成
+        max_workers (int | None): 执行 notebook 的进程数，None 表示CPU核数
+        mp_context (str | None): 进程启动方式
+        timeout (int): 每个单元格的执行超时（秒）
+
+    返回:
+        tuple: ({notebook 路径: 动作}, {notebook 路径: 错误描述})
+    """
+    actions, errors, pending = {}, {}, []
+    for path in sources:
+        output = os.path.splitext(path)[0] + '.ipynb'
+        action, notebook = plan(path, output, execute, force)
+        actions[output] = action
+        if action == 'write':
+            _save(output, notebook)
+        elif action == 'execute':
+            pending.append((output, notebook, timeout))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(pending) <= 1:
+        outcomes = map(_execute_task, pending)
+        _finish(outcomes, errors)
+    else:
+        ctx = mp.get_context(mp_context)
+        with ctx.Pool(min(max_workers, len(pending))) as pool:
+            _finish(pool.imap_unordered(_execute_task, pending), errors)
+    return actions, errors
+
+
+def execute_notebook(notebook, cwd, timeout=600):
+    """
+    执行 notebook 并返回带输出的内容
+
+    参数:
+        notebook (dict): notebook 内容
+        cwd (str): 执行时的工作目录（课程脚本所在目录，保证能导入同目录的模块和读取 data_cache）
+        timeout (int): 每个单元格的执行超时（秒）
+
+    返回:
+        dict: 执行后的 notebook
+    """
+    import nbformat
+    from nbclient import NotebookClient
+
+    nb = nbformat.from_dict(notebook)
+    client = NotebookClient(nb, timeout=timeout, kernel_name='python3', resources={'metadata': {'path': cwd}})
+    # 内核只读本地缓存，不访问网络
+    client.execute(env=dict(os.environ, OHLCV_CACHE_OFFLINE='1'))
+    result = json.loads(json.dumps(nb))
+    result['metadata']['build']['executed'] = True
+    return result
+
+
+def _execute_task(task):
+    output, notebook, timeout = task
+    try:
+        executed = execute_notebook(notebook, os.path.dirname(output), timeout)
+    except Exception as exc:
+        return output, f"{type(exc).__name__}: {exc}"
+    _save(output, executed)
+    return output, None
+
+
+def _finish(outcomes, errors):
+    for output, error in outcomes:
+        if error is not None:
+            errors[output] = error
+
+
+def _copy_outputs(existing, notebook):
+    # 代码单元格的 id 由内容决定，代码没变时按 id 搬运输出
+    previous = {cell.get('id'): cell for cell in existing.get('cells', []) if cell['cell_type'] == 'code'}
+    for cell in notebook['cells']:
+        if cell['cell_type'] == 'code' and cell['id'] in previous:
+            cell['outputs'] = previous[cell['id']].get('outputs', [])
+            cell['execution_count'] = previous[cell['id']].get('execution_count')
+    notebook['metadata']['build']['executed'] = True
+
+
+def _split_lines(source):
+    lines = source.split('\n')
+    return [line + '\n' for line in lines[:-1]] + [lines[-1]]
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load(output):
+    if not os.path.exists(output):
+        return None
+    try:
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return None
+
+
+def _save(output, notebook):
+    # 与 nbformat 写出的格式一致，便于在 git 中比较
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(notebook, f, indent=1, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+
+
+def find_sources(directory=EXAMPLES_DIR):
+    """
+    目录下所有带单元格标记的课程脚本
+
+    参数:
+        directory (str): 课程目录
+
+    返回:
+        list[str]: 脚本路径
+    """
+    sources = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        with open(path, encoding='utf-8') as f:
+            if any(_MARKER.match(line.strip()) for line in f):
+                sources.append(path)
+    return sources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='*', help='课程脚本，默认为 examples 下所有带单元格标记的 .py 文件')
+    parser.add_argument('--execute', action='store_true', help='执行 notebook（只执行代码有变化的）')
+    parser.add_argument('--force', action='store_true', help='忽略哈希，全部重新生成')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='执行 notebook 的进程数')
+    parser.add_argument('--timeout', type=int, default=600, help='每个单元格的执行超时（秒）')
+    args = parser.parse_args()
+
+    sources = [os.path.abspath(os.path.join(EXAMPLES_DIR, s) if not os.path.exists(s) else s)
+               for s in args.sources] or find_sources()
+    actions, errors = build_all(sources, args.execute, args.force, args.workers, timeout=args.timeout)
+    labels = {'unchanged': '未变化', 'write': '已生成', 'execute': '已执行'}
+    for output, action in actions.items():
+        status = f"失败: {errors[output]}" if output in errors else labels[action]
+        print(f"{os.path.relpath(output, EXAMPLES_DIR)}: {status}")
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+from array_utils import ffill
+from incremental_stats import RunningStats
+from indicators import SMA
+
+
+class ChunkedAnalysis:
+    """
+    分块执行 basic_data_analysis 和 time_series_analysis 中的计算（日收益率、统计量、移动平均、月度收益率）
+
+    数据按时间顺序一块一块地传入 update，块与块之间只保留必要的状态：上一个有效收盘价（收益率）、
+    最后 max(windows)-1 个收盘价（移动平均）、统计量的累加值和每个月最后一个收盘价，
+    所以内存占用只取决于块的大小，与历史长短无关。
+
+    与一次性加载全部数据的结果对比：日收益率与 pct_change() * 100 完全一致，移动平均与
+    IndicatorEngine 的 SMA 在浮点舍入以内一致，月度收益率与 resample('M').last().pct_change() * 100
+    完全一致，统计量的一致性见 RunningStats。
+
+    参数:
+        windows (tuple[int]): 移动平均的窗口长度
+        field (str): 价格字段
+    """
+
+    def __init__(self, windows=(50, 200), field='Close'):
+        self.windows = tuple(windows)
+        self.field = field
+        self.close_stats = RunningStats()
+        self.return_stats = RunningStats()
+        self.rows = 0
+        self.start = None
+        self.end = None
+        self._last_valid = np.nan
+        self._tail = np.empty(0)
+        self._month_last = []
+
+    def update(self, chunk):
+        """
+        处理下一块数据
+
+        参数:
+            chunk (pd.DataFrame): 按时间排序的历史数据，必须紧接在上一块之后
+
+        返回:
+            pd.DataFrame: 这一块的派生列 Daily_Return 和 MA{窗口}，不修改传入的数据
+        """
+        close = chunk[self.field].to_numpy(dtype=float)
+        if len(close) == 0:
+            return pd.DataFrame(index=chunk.index)
+        self.rows += len(close)
+        self.start = chunk.index[0] if self.start is None else self.start
+        self.end = chunk.index[-1]
+
+        self.close_stats.update_many(close)
+        daily_return = self._returns(close)
+        self.return_stats.update_many(daily_return)
+        derived = {'Daily_Return': daily_return}
+        derived.update(self._moving_averages(close))
+
+        # 每个月最后一个有效收盘价，跨块的月份在 monthly_returns 中合并
+        valid = pd.Series(close, index=chunk.index).dropna()
+        self._month_last.append(valid.iloc[_last_of_each_month(valid.index)])
+        return pd.DataFrame(derived, index=chunk.index)
+
+    def monthly_returns(self):
+        """
+        月度收益率（百分比），与对完整数据计算 resample('M').last().pct_change() * 100 一致
+
+        返回:
+            pd.Series: 以月末日期为索引
+        """
+        if not self._month_last:
+            return pd.Series(dtype=float)
+        month_last = pd.concat(self._month_last)
+        monthly = month_last.resample('M').last()
+        return monthly.pct_change() * 100
+
+    def summary(self):
+        """
+        汇总结果
+
+        返回:
+            dict: 行数、起止时间、收盘价和日收益率的统计量（RunningStats.describe）以及月度收益率
+        """
+        return {
+            'rows': self.rows,
+            'start': self.start,
+            'end': self.end,
+            'close': self.close_stats.describe(),
+            'daily_return': self.return_stats.describe(),
+            'monthly_returns': self.monthly_returns(),
+        }
+
+    def _returns(self, close):
+        # 与 pct_change() 的默认行为一致：先向前填充缺失值，再与前一行比较；块开头的缺失值用上一块最后一个有效值填充
+        filled = ffill(close, self._last_valid)
+        previous = np.concatenate([[self._last_valid], filled[:-1]])
+        self._last_valid = filled[-1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (filled / previous - 1) * 100
+
+    def _moving_averages(self, close):
+        # 在上一块末尾的 max(windows)-1 个价格之后接上这一块，计算完再去掉这部分
+        extended = np.concatenate([self._tail, close])
+        averages = SMA(self.windows).run(extended)
+        keep = max(self.windows) - 1
+        self._tail = extended[-keep:] if keep else np.empty(0)
+        start = len(extended) - len(close)
+        return {f'MA{w}': averages[f'sma_{w}'][start:] for w in self.windows}
+
+
+def analyze_chunks(chunks, windows=(50, 200), field='Close', on_chunk=None):
+    """
+    对逐块的历史数据执行分块分析
+
+    参数:
+        chunks (iterable[pd.DataFrame]): 按时间顺序的数据块，例如 ColumnarStore.iter_chunks 或
+                                         pd.read_csv(..., chunksize=...) 的结果
+        windows (tuple[int]): 移动平均的窗口长度
+        field (str): 价格字段
+        on_chunk (callable | None): 每块的派生列计算完后调用 on_chunk(派生列DataFrame)，例如写回磁盘
+
+    返回:
+        ChunkedAnalysis: 分析状态，调用 summary() 获取结果
+    """
+    analysis = ChunkedAnalysis(windows, field)
+    for chunk in chunks:
+        derived = analysis.update(chunk)
+        if on_chunk is not None and len(derived):
+            on_chunk(derived)
+    return analysis
+
+
+def analyze_store(store, symbol, dataset='1d_raw', start=None, end=None, windows=(50, 200),
+                  output_dataset=None):
+    """
+    按分区对 ColumnarStore 中的数据执行分块分析，可选把派生列写回仓库
+
+    参数:
+        store (ColumnarStore | AdjustedPriceStore): 数据仓库；OHLCVCache 中保存的是未复权价格，
+                                                   传入 OHLCVCache.adjusted 可以按复权价格分析
+        symbol (str): 股票代码
+        dataset (str): 数据集名称
+        start (str | datetime | None): 开始时间
+        end (str | datetime | None): 结束时间（不包含）
+        windows (tuple[int]): 移动平均的窗口长度
+        output_dataset (str | None): 派生列（Daily_Return、MA{窗口}）写入的数据集，None 表示不保存
+
+    返回:
+        ChunkedAnalysis: 分析状态，调用 summary() 获取结果
+    """
+    on_chunk = None
+    if output_dataset is not None:
+        written = []
+
+        def on_chunk(derived):
+            # 第一块覆盖旧的派生数据集，之后逐块追加
+            if written:
+                store.append(symbol, derived, output_dataset)
+            else:
+                store.write(symbol, derived, output_dataset)
+                written.append(True)
+
+    chunks = store.iter_chunks(symbol, start, end, dataset, columns=['Close'])
+    return analyze_chunks(chunks, windows, 'Close', on_chunk)
+
+
+def _last_of_each_month(index):
+    # 每个 (年, 月) 最后一行的位置
+    if len(index) == 0:
+        return np.empty(0, dtype=np.int64)
+    codes = index.year.to_numpy() * 12 + index.month.to_numpy()
+    return np.flatnonzero(np.append(codes[1:] != codes[:-1], True))
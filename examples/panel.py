@@ -0,0 +1,271 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from array_utils import ffill
+from data_providers import make_synthetic_arrays
+from indicators import SMA
+
+DEFAULT_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class Panel:
+    """
+    多只股票的面板数据（时间 × 股票 × 字段）
+
+    每个字段是一个 (时间, 股票) 的二维 float64 数组，所有字段共享同一个交易日历索引，
+    某只股票在某天没有数据时为NaN。收益率、统计量、移动平均和横截面排名都直接在
+    二维数组上向量化计算，不需要对每只股票循环。
+
+    参数:
+        index (pd.DatetimeIndex): 共享的时间索引
+        symbols (list[str]): 股票代码
+        fields (dict[str, np.ndarray]): {字段名: (时间, 股票) 二维数组}
+    """
+
+    def __init__(self, index, symbols, fields):
+        self.index = pd.DatetimeIndex(index)
+        self.symbols = list(symbols)
+        self.fields = dict(fields)
+        shape = (len(self.index), len(self.symbols))
+        for name, values in self.fields.items():
+            if values.shape != shape:
+                raise ValueError(f"字段 {name} 的形状 {values.shape} 与面板 {shape} 不一致")
+        self._symbol_pos = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frames(cls, frames, fields=DEFAULT_FIELDS):
+        """
+        由多只股票的DataFrame构建面板，时间索引取所有股票的并集
+
+        参数:
+            frames (dict[str, pd.DataFrame]): {代码: 历史数据}
+            fields (tuple[str]): 需要的字段
+
+        返回:
+            Panel: 面板数据
+        """
+        symbols = list(frames)
+        # 在 int64 时间戳上求并集和定位，比逐个 DatetimeIndex.union 快得多
+        stamps = [frames[symbol].index.asi8 for symbol in symbols]
+        calendar = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype=np.int64)
+        tz = frames[symbols[0]].index.tz if symbols else None
+        index = pd.DatetimeIndex(calendar.view('datetime64[ns]'), name='Date')
+        index = index.tz_localize('UTC').tz_convert(tz) if tz is not None else index
+
+        arrays = {field: np.full((len(index), len(symbols)), np.nan) for field in fields}
+        for j, symbol in enumerate(symbols):
+            data = frames[symbol]
+            rows = np.searchsorted(calendar, stamps[j])
+            for field in fields:
+                if field in data:
+                    arrays[field][rows, j] = data[field].to_numpy(dtype=float)
+        return cls(index, symbols, arrays)
+
+    @classmethod
+    def from_long(cls, data, fields=DEFAULT_FIELDS):
+        """
+        由 (Symbol, Date) 双层索引的长表构建面板，例如 get_stock_data_many(layout='long') 的结果
+
+        参数:
+            data (pd.DataFrame): 长表
+            fields (tuple[str]): 需要的字段
+
+        返回:
+            Panel: 面板数据
+        """
+        symbol_codes, symbols = pd.factorize(data.index.get_level_values(0))
+        time_codes, index = pd.factorize(data.index.get_level_values(1), sort=True)
+        arrays = {}
+        for field in fields:
+            values = np.full((len(index), len(symbols)), np.nan)
+            values[time_codes, symbol_codes] = data[field].to_numpy(dtype=float)
+            arrays[field] = values
+        return cls(index, list(symbols), arrays)
+
+    @classmethod
+    def synthetic(cls, n_symbols, n_bars, start='2000-01-03', freq='B', seed=0):
+        """
+        生成模拟的面板数据，用于基准测试
+
+        参数:
+            n_symbols (int): 股票数量
+            n_bars (int): K线数量
+            start (str): 第一根K线的日期
+            freq (str): K线频率
+            seed (int): 随机种子
+
+        返回:
+            Panel: 面板数据
+        """
+        index = pd.date_range(start, periods=n_bars, freq=freq, name='Date')
+        symbols = [f'SYM{i:05d}' for i in range(n_symbols)]
+        return cls(index, symbols, make_synthetic_arrays(n_bars, n_symbols, seed))
+
+    @property
+    def shape(self):
+        return len(self.index), len(self.symbols)
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def frame(self, field):
+        """
+        返回某个字段的宽表（不复制数据）
+
+        参数:
+            field (str): 字段名
+
+        返回:
+            pd.DataFrame: 行为日期、列为股票代码的宽表
+        """
+        return pd.DataFrame(self.fields[field], index=self.index, columns=self.symbols, copy=False)
+
+    def symbol_frame(self, symbol):
+        """
+        取出一只股票的数据，结构与 get_stock_data 的返回值相同
+
+        参数:
+            symbol (str): 股票代码
+
+        返回:
+            pd.DataFrame: 该股票的历史数据（去掉没有收盘价的日期）
+        """
+        j = self._symbol_pos[symbol]
+        data = pd.DataFrame({field: values[:, j] for field, values in self.fields.items()}, index=self.index)
+        return data[~np.isnan(data['Close'])] if 'Close' in data else data
+
+    def slice_time(self, start=None, end=None):
+        """
+        截取 [start, end] 的时间段，返回共享底层数组的新面板
+
+        参数:
+            start (str | datetime | None): 开始日期
+            end (str | datetime | None): 结束日期（包含，与 .loc 一致）
+
+        返回:
+            Panel: 截取后的面板
+        """
+        i, j = self.index.slice_locs(start, end)
+        return Panel(self.index[i:j], self.symbols, {k: v[i:j] for k, v in self.fields.items()})
+
+    def with_field(self, name, values):
+        """
+        返回增加了一个字段的新面板，原面板不变，已有字段不复制
+
+        参数:
+            name (str): 字段名
+            values (np.ndarray): (时间, 股票) 二维数组
+
+        返回:
+            Panel: 新面板
+        """
+        return Panel(self.index, self.symbols, dict(self.fields, **{name: values}))
+
+    def returns(self, field='Close'):
+        """
+        计算日收益率（百分比），与对单只股票计算 data['Close'].pct_change() * 100 一致
+
+        某只股票停牌（当天为NaN）时，复牌当天的收益率相对停牌前最后一个价格计算。
+
+        参数:
+            field (str): 价格字段
+
+        返回:
+            np.ndarray: (时间, 股票) 收益率数组，没有价格的位置为NaN
+        """
+        prices = self.fields[field]
+        previous = np.full(prices.shape, np.nan)
+        previous[1:] = ffill(prices)[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (prices / previous - 1) * 100
+
+    def describe(self, field='Close', values=None):
+        """
+        一次计算所有股票的描述性统计，与 pandas 的 mean/std/min/max/median 一致（跳过NaN）
+
+        参数:
+            field (str): 字段名
+            values (np.ndarray | None): 直接提供 (时间, 股票) 数组（例如 returns() 的结果）时忽略 field
+
+        返回:
+            pd.DataFrame: 行为股票代码，列为 count/mean/std/min/max/median
+        """
+        values = self.fields[field] if values is None else values
+        count = np.sum(~np.isnan(values), axis=0)
+        # 某只股票整列为NaN时 nanmean 等会发出警告，结果本身（NaN）是正确的
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            stats = {
+                'count': count,
+                'mean': np.nanmean(values, axis=0),
+                'std': np.nanstd(values, axis=0, ddof=1),
+                'min': np.nanmin(values, axis=0),
+                'max': np.nanmax(values, axis=0),
+                'median': np.nanmedian(values, axis=0),
+            }
+        stats['std'] = np.where(count > 1, stats['std'], np.nan)
+        return pd.DataFrame(stats, index=pd.Index(self.symbols, name='Symbol'))
+
+    def moving_average(self, windows=(50, 200), field='Close'):
+        """
+        一次计算所有股票、所有窗口的简单移动平均
+
+        参数:
+            windows (tuple[int]): 窗口长度
+            field (str): 价格字段
+
+        返回:
+            dict: {窗口长度: (时间, 股票) 数组}
+        """
+        sma = SMA(windows)
+        result = sma.run(self.fields[field])
+        return {w: result[f'sma_{w}'] for w in sma.windows}
+
+    def monthly_returns(self, field='Close'):
+        """
+        计算每只股票的月度收益率（百分比），与 resample('M').last().pct_change() * 100 一致
+
+        参数:
+            field (str): 价格字段
+
+        返回:
+            pd.DataFrame: 行为月末日期、列为股票代码
+        """
+        monthly = self.frame(field).resample('M').last()
+        return monthly.pct_change(fill_method=None) * 100
+
+    def rank(self, values, ascending=True, pct=False):
+        """
+        横截面排名：每个日期对所有股票排序，NaN 不参与排名
+
+        相同的值按股票顺序排名（与 pandas 的 method='first' 一致）。
+
+        参数:
+            values (np.ndarray): (时间, 股票) 数组
+            ascending (bool): 是否升序，升序时最小值排名为1
+            pct (bool): 是否返回百分比排名（排名 / 当天有效股票数）
+
+        返回:
+            np.ndarray: (时间, 股票) 排名数组
+        """
+        return _cross_sectional_rank(values, ascending, pct)
+
+
+def _cross_sectional_rank(values, ascending=True, pct=False):
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    keys = values if ascending else -values
+    # NaN 统一放到最后，排名后再置回NaN
+    keys = np.where(valid, keys, np.inf)
+    order = np.argsort(keys, axis=1, kind='stable')
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[1] + 1, dtype=float)[None, :], axis=1)
+    ranks[~valid] = np.nan
+    if pct:
+        ranks /= valid.sum(axis=1, keepdims=True)
+    return ranks
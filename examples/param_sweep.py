@@ -0,0 +1,220 @@
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import ma_crossover_positions, run_backtest
+from panel import Panel
+
+# 子进程中挂载的共享面板，由 _init_worker 设置
+_worker_panel = None
+_worker_segments = []
+
+
+def parameter_grid(axes, where=None):
+    """
+    展开参数网格（各参数取值的笛卡尔积）
+
+    参数:
+        axes (dict[str, list]): {参数名: 候选取值}，例如 {'fast': [20, 50], 'slow': [100, 200]}
+        where (callable | None): 过滤条件，接收一组参数（dict），返回 False 的组合会被丢弃，
+                                 例如 lambda p: p['fast'] < p['slow']
+
+    返回:
+        list[dict]: 参数组合列表
+    """
+    names = list(axes)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+    return [params for params in grid if where is None or where(params)]
+
+
+def ma_crossover_metrics(panel, fast=50, slow=200, cost_bps=5.0, slippage_bps=5.0, symbol=None):
+    """
+    默认的评估函数：在面板上回测均线交叉策略并返回绩效指标
+
+    参数:
+        panel (Panel): 面板数据（子进程中是挂载共享内存的面板）
+        fast (int): 快线窗口
+        slow (int): 慢线窗口
+        cost_bps (float): 单边手续费（基点）
+        slippage_bps (float): 单边滑点（基点）
+        symbol (str | None): 只回测这只股票；None 表示回测全部股票的等权组合
+
+    返回:
+        dict: 绩效指标
+    """
+    close = panel['Close']
+    if symbol is not None:
+        close = close[:, panel.symbols.index(symbol)]
+    positions = ma_crossover_positions(close, fast, slow)
+    result = run_backtest(close, positions, cost_bps, slippage_bps, index=panel.index)
+    return result.portfolio_summary()
+
+
+def run_sweep(panel, grid, output, evaluate=ma_crossover_metrics, max_workers=None, fields=('Close',),
+              resume=True, mp_context=None):
+    """
+    用进程池并行评估参数网格，结果逐条写入 JSON Lines 文件
+
+    面板的价格数组放在共享内存中，子进程按名字挂载，不会各自复制一份数据。每完成一组参数
+    就向 output 追加一行并立即刷新，因此中断后已完成的结果不会丢失；resume=True 时再次运行
+    会跳过 output 中已经成功的参数组合，只计算剩下的部分。
+
+    参数:
+        panel (Panel): 面板数据
+        grid (list[dict]): 参数组合列表，见 parameter_grid
+        output (str): 结果文件路径（JSON Lines）
+        evaluate (callable): 评估函数 evaluate(panel, **params) -> dict，必须是模块级函数以便子进程导入
+        max_workers (int | None): 进程数，None 表示CPU核数；为1时在当前进程中顺序运行
+        fields (tuple[str]): 需要放入共享内存的字段
+        resume (bool): 是否跳过 output 中已完成的参数组合；为 False 时覆盖 output
+        mp_context (str | None): 进程启动方式，例如 'spawn'、'fork'，None 表示系统默认
+
+    返回:
+        tuple: (结果, 失败信息)，结果是每组参数一行的DataFrame（包括之前已完成的），
+               失败信息为 {参数JSON: 错误描述}
+    """
+    done = _load_results(output) if resume else {}
+    pending = [params for params in grid if _params_key(params) not in done]
+    max_workers = max_workers or os.cpu_count() or 1
+
+    errors = {}
+    mode = 'a' if resume else 'w'
+    if resume and _ends_with_partial_line(output):
+        # 上次中断时写了一半的行需要先换行，否则新结果会接在它后面
+        with open(output, 'a') as f:
+            f.write('\n')
+    with open(output, mode) as f:
+        if max_workers == 1 or len(pending) <= 1:
+            outcomes = (_evaluate(evaluate, panel, params) for params in pending)
+            _write_outcomes(f, outcomes, done, errors)
+        else:
+            segments, specs = _share_fields(panel, fields)
+            try:
+                ctx = mp.get_context(mp_context)
+                init_args = (specs, panel.index, panel.symbols)
+                with ctx.Pool(min(max_workers, len(pending)), initializer=_init_worker, initargs=init_args) as pool:
+                    tasks = ((evaluate, params) for params in pending)
+                    outcomes = pool.imap_unordered(_evaluate_in_worker, tasks)
+                    _write_outcomes(f, outcomes, done, errors)
+            finally:
+                for segment in segments:
+                    segment.close()
+                    segment.unlink()
+
+    # 按网格顺序返回
+    rows = [done[key] for key in map(_params_key, grid) if key in done]
+    return _results_frame(rows), errors
+
+
+def load_sweep(output):
+    """
+    读取结果文件
+
+    参数:
+        output (str): run_sweep 写出的结果文件
+
+    返回:
+        pd.DataFrame: 每组参数一行，列为参数和指标
+    """
+    return _results_frame(list(_load_results(output).values()))
+
+
+def _evaluate(evaluate, panel, params):
+    t0 = time.perf_counter()
+    try:
+        metrics = evaluate(panel, **params)
+    except Exception as exc:
+        return {'params': params, 'error': f"{type(exc).__name__}: {exc}"}
+    return {'params': params, 'metrics': metrics, 'elapsed': time.perf_counter() - t0}
+
+
+def _evaluate_in_worker(task):
+    evaluate, params = task
+    return _evaluate(evaluate, _worker_panel, params)
+
+
+def _write_outcomes(f, outcomes, done, errors):
+    for outcome in outcomes:
+        record = _jsonable(outcome)
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        key = _params_key(record['params'])
+        if 'error' in record:
+            errors[key] = record['error']
+        else:
+            done[key] = record
+
+
+def _share_fields(panel, fields):
+    # 把每个字段复制一次到共享内存，返回 (共享内存段, 子进程挂载所需的描述)
+    segments, specs = [], {}
+    for field in fields:
+        values = np.ascontiguousarray(panel[field])
+        segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[...] = values
+        segments.append(segment)
+        specs[field] = (segment.name, values.shape, values.dtype.str)
+    return segments, specs
+
+
+def _init_worker(specs, index, symbols):
+    global _worker_panel
+    fields = {}
+    for field, (name, shape, dtype) in specs.items():
+        segment = shared_memory.SharedMemory(name=name)
+        # 保留引用，否则共享内存段会被关闭，数组随之失效
+        _worker_segments.append(segment)
+        values = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        values.flags.writeable = False
+        fields[field] = values
+    _worker_panel = Panel(index, symbols, fields)
+
+
+def _load_results(output):
+    # 只保留成功的结果；中断时可能留下写了一半的最后一行，直接跳过
+    done = {}
+    if not os.path.exists(output):
+        return done
+    with open(output) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'metrics' in record:
+                done[_params_key(record['params'])] = record
+    return done
+
+
+def _ends_with_partial_line(output):
+    if not os.path.exists(output) or os.path.getsize(output) == 0:
+        return False
+    with open(output, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
+
+
+def _params_key(params):
+    return json.dumps(_jsonable(params), sort_keys=True, ensure_ascii=False)
+
+
+def _jsonable(value):
+    # numpy 标量转为 Python 内置类型，便于写入JSON和比较参数
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _results_frame(records):
+    rows = [dict(record['params'], **record['metrics'], elapsed=record['elapsed']) for record in records]
+    return pd.DataFrame(rows)
@@ -0,0 +1,440 @@
+import base64
+import html
+import io
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from analysis import StockAnalysis
+from candlestick import candlestick_segments, date_to_num
+from downsample import bucket_max, downsample_line, kde_counts, pixel_width
+
+FORMATS = ('png', 'svg', 'html')
+
+# 子进程中复用的报告渲染器，由 _set_renderer 创建
+_worker_renderer = None
+_worker_load = None
+
+
+class ChartTemplate:
+    """
+    可复用的图表模板
+
+    图形、坐标轴和所有图形对象只在构造时创建一次，update 只替换数据、标题和坐标范围，
+    不重新创建 Figure，因此批量生成多只股票的图表时省去了大部分构建开销。图形直接使用
+    matplotlib.figure.Figure，不经过 pyplot，不会弹出窗口，也不受 plt.show() 阻塞。
+
+    参数:
+        figsize (tuple): 图形尺寸（英寸）
+        dpi (int): 保存PNG时的分辨率
+    """
+
+    name = 'chart'
+
+    def __init__(self, figsize=(10, 6), dpi=100):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self._laid_out = False
+
+    def update(self, data, symbol, analysis):
+        """
+        用一只股票的数据更新图形
+
+        参数:
+            data (pd.DataFrame): 股票历史数据
+            symbol (str): 股票代码
+            analysis (StockAnalysis): 分析结果，派生列从这里读取
+        """
+        raise NotImplementedError
+
+    def render(self, fmt='png'):
+        """
+        把当前图形渲染为字节
+
+        参数:
+            fmt (str): 'png' 或 'svg'
+
+        返回:
+            bytes: 图片内容
+        """
+        if not self._laid_out:
+            # 布局只在第一只股票时计算一次，之后复用同样的边距
+            self.figure.tight_layout()
+            self._laid_out = True
+        buffer = io.BytesIO()
+        self.figure.savefig(buffer, format=fmt)
+        return buffer.getvalue()
+
+
+class PriceChart(ChartTemplate):
+    """收盘价走势图（对应 plot_stock_price）"""
+
+    name = 'price'
+
+    def __init__(self, figsize=(10, 6), dpi=100):
+        super().__init__(figsize, dpi)
+        self.ax = self.figure.subplots()
+        self.line, = self.ax.plot([], [], label='收盘价')
+        self.ax.set_xlabel('日期')
+        self.ax.set_ylabel('价格')
+        self.ax.legend()
+        self.ax.grid(True)
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', rotation=45)
+
+    def update(self, data, symbol, analysis):
+        x = date_to_num(data.index)
+        self.line.set_data(*downsample_line(x, analysis.close, pixel_width(self.ax)))
+        self.ax.set_title(f'{symbol} 收盘价走势图')
+        _set_limits(self.ax, x, analysis.close)
+
+
+class OverviewChart(ChartTemplate):
+    """收盘价、成交量、收盘价分布和日收益率分布的四宫格（对应 visualize_stock_data）"""
+
+    name = 'overview'
+
+    def __init__(self, figsize=(14, 10), dpi=100, bins=(30, 50)):
+        super().__init__(figsize, dpi)
+        self.bins = bins
+        self.axes = self.figure.subplots(2, 2)
+        price_ax, volume_ax, close_ax, return_ax = self.axes.ravel()
+
+        self.price_line, = price_ax.plot([], [], color='blue')
+        price_ax.set_ylabel('价格')
+        self.volume_bars = _add_bars(volume_ax, color='green', alpha=0.7)
+        volume_ax.set_ylabel('成交量')
+        for ax in (price_ax, volume_ax):
+            ax.xaxis_date()
+            ax.tick_params(axis='x', rotation=45)
+
+        self.close_hist = _add_bars(close_ax, color='purple', alpha=0.5, edgecolor='white')
+        self.close_kde, = close_ax.plot([], [], color='purple')
+        close_ax.set_xlabel('价格')
+        self.return_hist = _add_bars(return_ax, color='red', alpha=0.5, edgecolor='white')
+        self.return_kde, = return_ax.plot([], [], color='red')
+        return_ax.set_xlabel('日收益率 (%)')
+        for ax in self.axes.ravel():
+            ax.grid(True)
+
+    def update(self, data, symbol, analysis):
+        price_ax, volume_ax, close_ax, return_ax = self.axes.ravel()
+        x = date_to_num(data.index)
+        close = analysis.close
+        volume = data['Volume'].to_numpy(dtype=float)
+
+        # 折线和柱子都降采样到坐标轴的像素宽度，数据再长绘制开销也不变
+        self.price_line.set_data(*downsample_line(x, close, pixel_width(price_ax)))
+        price_ax.set_title(f'{symbol} 收盘价走势')
+        _set_limits(price_ax, x, close)
+
+        self.volume_bars.set_verts(_bar_verts(*bucket_max(x, volume, pixel_width(volume_ax))))
+        volume_ax.set_title(f'{symbol} 成交量走势')
+        _set_limits(volume_ax, x, volume, include_zero=True)
+
+        daily_return = analysis.values('Daily_Return')
+        self._histogram(close_ax, self.close_hist, self.close_kde, close, self.bins[0])
+        close_ax.set_title(f'{symbol} 收盘价分布')
+        self._histogram(return_ax, self.return_hist, self.return_kde, daily_return, self.bins[1])
+        return_ax.set_title(f'{symbol} 日收益率分布')
+
+    @staticmethod
+    def _histogram(ax, bars, kde_line, values, bins):
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            bars.set_verts([])
+            kde_line.set_data([], [])
+            return
+        counts, edges = np.histogram(values, bins=bins)
+        bars.set_verts(_bar_verts(edges[:-1], np.diff(edges), counts))
+        grid, density = kde_counts(values, bins)
+        kde_line.set_data(grid, density)
+        _set_limits(ax, grid, np.append(counts, 0))
+
+
+class MovingAverageChart(ChartTemplate):
+    """收盘价与移动平均线、每月收益率（对应 time_series_analysis）"""
+
+    name = 'moving_average'
+
+    def __init__(self, figsize=(14, 10), dpi=100):
+        super().__init__(figsize, dpi)
+        self.price_ax, self.monthly_ax = self.figure.subplots(2, 1)
+        self.close_line, = self.price_ax.plot([], [], label='收盘价', alpha=0.5)
+        self.ma_lines = {}
+        self.price_ax.set_ylabel('价格')
+        self.monthly_bars = _add_bars(self.monthly_ax, color='blue', alpha=0.7)
+        self.monthly_ax.set_ylabel('收益率 (%)')
+        for ax in (self.price_ax, self.monthly_ax):
+            ax.grid(True)
+            ax.xaxis_date()
+
+    def update(self, data, symbol, analysis):
+        x = date_to_num(data.index)
+        pixels = pixel_width(self.price_ax)
+        self.close_line.set_data(*downsample_line(x, analysis.close, pixels))
+        for w in analysis.windows:
+            if w not in self.ma_lines:
+                self.ma_lines[w], = self.price_ax.plot([], [], label=f'{w}日移动平均线', linewidth=1.5)
+                self.price_ax.legend()
+            self.ma_lines[w].set_data(*downsample_line(x, analysis.values(f'MA{w}'), pixels))
+        self.price_ax.set_title(f'{symbol} 收盘价与移动平均线')
+        _set_limits(self.price_ax, x, analysis.close)
+
+        # 每月一根柱子，画在月末日期上
+        monthly = analysis.monthly_returns()
+        months = date_to_num(monthly.index)
+        values = np.nan_to_num(monthly.to_numpy())
+        self.monthly_bars.set_verts(_bar_verts(months - 10, 20, values))
+        self.monthly_ax.set_title(f'{symbol} 每月收益率')
+        _set_limits(self.monthly_ax, months, values, include_zero=True)
+
+
+class CandlestickChart(ChartTemplate):
+    """
+    最近一段时间的K线图（对应 analyze_specific_timeframe）
+
+    参数:
+        days (int): 显示最近多少天
+    """
+
+    name = 'candlestick'
+
+    def __init__(self, figsize=(12, 6), dpi=100, days=365):
+        super().__init__(figsize, dpi)
+        self.days = days
+        self.ax = self.figure.subplots()
+        self.wicks = LineCollection([], linewidths=1)
+        self.bodies = LineCollection([], linewidths=4)
+        self.ax.add_collection(self.wicks)
+        self.ax.add_collection(self.bodies)
+        self.ax.set_ylabel('价格')
+        self.ax.grid(True)
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', rotation=45)
+
+    def update(self, data, symbol, analysis):
+        period = data.loc[data.index >= data.index[-1] - pd.Timedelta(days=self.days)] if len(data) else data
+        wick_segments, body_segments, colors = candlestick_segments(period)
+        self.wicks.set_segments(wick_segments)
+        self.wicks.set_color(colors)
+        self.bodies.set_segments(body_segments)
+        self.bodies.set_color(colors)
+        if len(period):
+            start, end = period.index[0].strftime('%Y-%m-%d'), period.index[-1].strftime('%Y-%m-%d')
+            self.ax.set_title(f'{symbol} 在 {start} 至 {end} 期间的价格走势')
+            _set_limits(self.ax, wick_segments[:, 0, 0], wick_segments[:, :, 1].ravel())
+
+
+DEFAULT_CHARTS = (PriceChart, OverviewChart, MovingAverageChart, CandlestickChart)
+
+
+class ReportRenderer:
+    """
+    把一只股票的全部图表写成 PNG/SVG 文件和一个 HTML 报告
+
+    每种图表只创建一个模板，渲染下一只股票时原地更新，所以同一个渲染器应当依次处理多只股票。
+
+    参数:
+        charts (tuple[type]): 图表模板类
+        formats (tuple[str]): 输出格式，'png'、'svg'、'html' 的任意组合；
+                              HTML 报告内嵌图表（有 svg 时内嵌SVG，否则内嵌PNG），可以单独打开
+        dpi (int): PNG 分辨率
+    """
+
+    def __init__(self, charts=DEFAULT_CHARTS, formats=('png', 'html'), dpi=100):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"不支持的输出格式: {sorted(unknown)}")
+        self.formats = tuple(formats)
+        self.charts = [chart(dpi=dpi) for chart in charts]
+
+    def render(self, data, symbol, output_dir, analysis=None):
+        """
+        生成一只股票的报告
+
+        参数:
+            data (pd.DataFrame): 股票历史数据
+            symbol (str): 股票代码
+            output_dir (str): 输出目录，图片写入 output_dir/symbol/，HTML 报告为 output_dir/symbol.html
+            analysis (StockAnalysis | None): 分析结果，为None时新建
+
+        返回:
+            list[str]: 写出的文件路径
+        """
+        if analysis is None:
+            analysis = StockAnalysis(data, symbol)
+        chart_dir = os.path.join(output_dir, symbol)
+        os.makedirs(chart_dir, exist_ok=True)
+
+        files, embedded = [], []
+        image_formats = [fmt for fmt in ('png', 'svg') if fmt in self.formats]
+        embed_format = 'svg' if 'svg' in self.formats else 'png'
+        for chart in self.charts:
+            chart.update(data, symbol, analysis)
+            rendered = {}
+            for fmt in image_formats:
+                rendered[fmt] = chart.render(fmt)
+                path = os.path.join(chart_dir, f'{chart.name}.{fmt}')
+                with open(path, 'wb') as f:
+                    f.write(rendered[fmt])
+                files.append(path)
+            if 'html' in self.formats:
+                image = rendered.get(embed_format) or chart.render(embed_format)
+                embedded.append(_embed_image(image, embed_format))
+
+        if 'html' in self.formats:
+            path = os.path.join(output_dir, f'{symbol}.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(_report_html(symbol, analysis, embedded))
+            files.append(path)
+        return files
+
+
+def generate_reports(symbols, load, output_dir, charts=DEFAULT_CHARTS, formats=('png', 'html'),
+                     max_workers=None, mp_context=None, dpi=100):
+    """
+    用多个进程批量生成股票报告
+
+    每个子进程使用 Agg 后端并持有一个 ReportRenderer，图表模板在子进程的整个生命周期内复用，
+    股票之间只更新图形数据。主进程只分发股票代码，数据由子进程自己调用 load 读取。
+
+    参数:
+        symbols (list[str]): 股票代码
+        load (callable): load(symbol) -> pd.DataFrame，必须可以被 pickle（模块级函数、
+                         functools.partial 或 OHLCVCache.get 这样的绑定方法）
+        output_dir (str): 输出目录
+        charts (tuple[type]): 图表模板类
+        formats (tuple[str]): 输出格式，见 ReportRenderer
+        max_workers (int | None): 进程数，None 表示CPU核数；为1时在当前进程中顺序生成
+        mp_context (str | None): 进程启动方式，例如 'spawn'、'fork'，None 表示系统默认
+        dpi (int): PNG 分辨率
+
+    返回:
+        tuple: (生成的文件 {股票代码: [路径]}, 失败信息 {股票代码: 错误描述})
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    init_args = (load, charts, formats, dpi)
+    files, errors = {}, {}
+    if max_workers == 1 or len(symbols) <= 1:
+        # 模板直接使用 Figure，不需要切换后端，也就不会影响调用方的 pyplot 图形
+        _set_renderer(*init_args)
+        outcomes = (_render_in_worker((symbol, output_dir)) for symbol in symbols)
+        _collect(outcomes, files, errors)
+    else:
+        ctx = mp.get_context(mp_context)
+        with ctx.Pool(min(max_workers, len(symbols)), initializer=_init_worker, initargs=init_args) as pool:
+            tasks = ((symbol, output_dir) for symbol in symbols)
+            _collect(pool.imap_unordered(_render_in_worker, tasks), files, errors)
+
+    if 'html' in formats:
+        with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(_index_html(sorted(files), errors))
+    return files, errors
+
+
+def _init_worker(load, charts, formats, dpi):
+    # 子进程中没有显示设备，强制使用 Agg 后端
+    import matplotlib
+    matplotlib.use('Agg')
+    _set_renderer(load, charts, formats, dpi)
+
+
+def _set_renderer(load, charts, formats, dpi):
+    global _worker_renderer, _worker_load
+    _worker_load = load
+    _worker_renderer = ReportRenderer(charts, formats, dpi)
+
+
+def _render_in_worker(task):
+    symbol, output_dir = task
+    t0 = time.perf_counter()
+    try:
+        data = _worker_load(symbol)
+        if data is None or len(data) == 0:
+            raise ValueError("没有数据")
+        files = _worker_renderer.render(data, symbol, output_dir)
+    except Exception as exc:
+        return symbol, None, f"{type(exc).__name__}: {exc}"
+    return symbol, files, time.perf_counter() - t0
+
+
+def _collect(outcomes, files, errors):
+    for symbol, written, detail in outcomes:
+        if written is None:
+            errors[symbol] = detail
+        else:
+            files[symbol] = written
+
+
+def _add_bars(ax, **kwargs):
+    # 柱状图用一个 PolyCollection 表示，柱子数量变化时只需要 set_verts
+    bars = PolyCollection([], **kwargs)
+    ax.add_collection(bars)
+    return bars
+
+
+def _bar_verts(left, width, height):
+    # 每根柱子四个顶点，形状为 (柱子数, 4, 2)
+    left = np.broadcast_to(np.asarray(left, dtype=float), np.shape(height))
+    right = left + width
+    height = np.asarray(height, dtype=float)
+    zeros = np.zeros_like(height)
+    xs = np.stack([left, left, right, right], axis=1)
+    ys = np.stack([zeros, height, height, zeros], axis=1)
+    return np.stack([xs, ys], axis=2)
+
+
+def _set_limits(ax, x, y, include_zero=False, margin=0.05):
+    # 集合不参与 autoscale，所以坐标范围直接由数据计算
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x, y = x[np.isfinite(x)], y[np.isfinite(y)]
+    if len(x):
+        pad = (x.max() - x.min()) * margin or 1
+        ax.set_xlim(x.min() - pad, x.max() + pad)
+    if len(y):
+        low, high = (min(y.min(), 0), max(y.max(), 0)) if include_zero else (y.min(), y.max())
+        pad = (high - low) * margin or 1
+        ax.set_ylim(low - pad, high + pad)
+
+
+def _embed_image(image, fmt):
+    if fmt == 'svg':
+        # 去掉XML声明和DOCTYPE，直接嵌入HTML
+        svg = image.decode('utf-8')
+        return svg[svg.index('<svg'):]
+    return f'<img src="data:image/png;base64,{base64.b64encode(image).decode("ascii")}">'
+
+
+def _report_html(symbol, analysis, images):
+    close, daily_return = analysis.close_stats, analysis.return_stats
+    period = analysis.period_summary(analysis.index[-1] - pd.Timedelta(days=365))
+    rows = [
+        ('数据区间', f"{analysis.index[0]:%Y-%m-%d} 至 {analysis.index[-1]:%Y-%m-%d}（{len(analysis.index)} 行）"),
+        ('收盘价 均值 / 标准差', f"{close.mean:.2f} / {close.std:.2f}"),
+        ('收盘价 最小值 / 最大值', f"{close.min:.2f} / {close.max:.2f}"),
+        ('日收益率 均值 / 标准差', f"{daily_return.mean:.2f}% / {daily_return.std:.2f}%"),
+        ('最近一年收益率', f"{period['return']:.2f}%"),
+        ('最近一年最高价 / 最低价', f"{period['high']:.2f} / {period['low']:.2f}"),
+    ]
+    table = ''.join(f'<tr><th>{html.escape(name)}</th><td>{html.escape(value)}</td></tr>' for name, value in rows)
+    charts = ''.join(f'<div class="chart">{image}</div>' for image in images)
+    title = html.escape(symbol)
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title>'
+            f'<style>th{{text-align:left;padding-right:1em}} .chart svg, .chart img{{max-width:100%;height:auto}}</style>'
+            f'</head><body><h1>{title}</h1><table>{table}</table>{charts}</body></html>\n')
+
+
+def _index_html(symbols, errors):
+    links = ''.join(f'<li><a href="{html.escape(s)}.html">{html.escape(s)}</a></li>' for s in symbols)
+    failed = ''.join(f'<li>{html.escape(s)}: {html.escape(e)}</li>' for s, e in sorted(errors.items()))
+    body = f'<h1>股票报告</h1><ul>{links}</ul>'
+    if failed:
+        body += f'<h2>失败</h2><ul>{failed}</ul>'
+    return f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>股票报告</title></head><body>{body}</body></html>\n'
@@ -0,0 +1,421 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from array_utils import as_2d, restore
+from indicators import SMA, RollingStd
+
+
+class RollingCovariance:
+    """
+    滚动窗口协方差矩阵，增量更新
+
+    维护窗口内收益率的叉积矩阵 X'X 和列和，新数据进入、旧数据离开窗口时各做一次秩 k 更新
+    （一次矩阵乘法，交给 BLAS），不需要对每个窗口重新计算整个协方差矩阵。每累计 window 行
+    从缓冲区重新求和一次，避免浮点误差累积。
+
+    出现缺失值后改为按成对有效样本计算（与 pandas 的 rolling(window).cov() 一致），额外维护
+    X'V 和 V'V 两个矩阵（V 为有效值的指示矩阵）。
+
+    参数:
+        window (int): 窗口长度
+        min_periods (int | None): 计算协方差所需的最少有效样本数，默认为 window
+        ddof (int): 自由度修正
+    """
+
+    def __init__(self, window=252, min_periods=None, ddof=1):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.ddof = ddof
+        self.buffer = None
+        self.pos = 0
+        self.size = 0
+        self.pairwise = False
+        self._since_resum = 0
+
+    def update(self, rows):
+        """
+        加入一行或多行收益率（按时间顺序），窗口之外的旧数据自动移除
+
+        参数:
+            rows (np.ndarray): (股票,) 或 (行数, 股票) 的收益率
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        if self.buffer is None:
+            self.buffer = np.full((self.window, rows.shape[1]), np.nan)
+            self._resum()
+        if len(rows) >= self.window:
+            self.buffer[:] = rows[-self.window:]
+            self.pos, self.size = 0, self.window
+            self._resum()
+            return
+
+        slots = (self.pos + np.arange(len(rows))) % self.window
+        # 窗口未填满时，前面的空位没有要移除的旧数据
+        old = self.buffer[slots][min(len(rows), self.window - self.size):]
+        self.buffer[slots] = rows
+        self.pos = (self.pos + len(rows)) % self.window
+        self.size = min(self.size + len(rows), self.window)
+        if not self.pairwise and np.isnan(rows).any():
+            # 第一次出现缺失值时切换到成对计算，由缓冲区重建
+            self.pairwise = True
+            self._resum()
+            return
+        self._accumulate(rows, old)
+        self._since_resum += len(rows)
+        if self._since_resum >= self.window:
+            self._resum()
+
+    def cov(self):
+        """
+        当前窗口的协方差矩阵
+
+        返回:
+            np.ndarray: (股票, 股票) 协方差矩阵，有效样本不足 min_periods 的位置为NaN
+        """
+        min_count = max(self.min_periods, self.ddof + 1)
+        if self.pairwise:
+            counts = self._counts
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cov = (self._cross - self._sums * self._sums.T / counts) / (counts - self.ddof)
+            return np.where(counts >= min_count, cov, np.nan)
+        if self._n < min_count:
+            return np.full(self._cross.shape, np.nan)
+        # (X'X - S S' / n) / (n - ddof)，原地计算，只遍历一次矩阵
+        scale = 1.0 / (self._n - self.ddof)
+        cov = self._cross * scale
+        cov -= np.outer(self._sums, self._sums * (scale / self._n))
+        return cov
+
+    def corr(self):
+        """
+        当前窗口的相关系数矩阵
+
+        返回:
+            np.ndarray: (股票, 股票) 相关系数矩阵
+        """
+        return cov_to_corr(self.cov())
+
+    def _accumulate(self, rows, old=None):
+        # 加入 rows、移除 old：把两者叠在一起（old 取负号）做一次矩阵乘法
+        if old is None:
+            old = rows[:0]
+        stacked = np.vstack([rows, old])
+        signs = np.concatenate([np.ones(len(rows)), -np.ones(len(old))])[:, None]
+        if self.pairwise:
+            valid = (~np.isnan(stacked)).astype(float)
+            filled = np.nan_to_num(stacked)
+            self._cross += filled.T @ (filled * signs)
+            # _sums[i, j] 为股票 i 在股票 j 也有数据的行上的收益率之和
+            self._sums += filled.T @ (valid * signs)
+            self._counts += valid.T @ (valid * signs)
+        else:
+            self._cross += stacked.T @ (stacked * signs)
+            self._sums += (stacked * signs).sum(axis=0)
+            self._n += len(rows) - len(old)
+
+    def _resum(self):
+        n_assets = self.buffer.shape[1]
+        # 窗口填满之前数据位于缓冲区开头
+        filled = self.buffer[:self.size]
+        self.pairwise = self.pairwise or bool(np.isnan(filled).any())
+        self._cross = np.zeros((n_assets, n_assets))
+        if self.pairwise:
+            self._sums = np.zeros((n_assets, n_assets))
+            self._counts = np.zeros((n_assets, n_assets))
+        else:
+            self._sums = np.zeros(n_assets)
+            self._n = 0.0
+        self._accumulate(filled)
+        self._since_resum = 0
+
+
+class EWCovariance:
+    """
+    指数加权协方差矩阵（RiskMetrics 方式），增量更新
+
+    维护收益率和叉积的指数加权平均，协方差为 E[xx'] - E[x]E[x]'。一次加入 k 行时，k 行的权重
+    按衰减系数分配，合并为一次加权矩阵乘法。缺失的收益率按0处理（停牌期间价格不变）。
+
+    参数:
+        halflife (float | None): 半衰期（行数）
+        alpha (float | None): 平滑系数，提供 halflife 时忽略
+        min_periods (int): 计算协方差所需的最少行数
+    """
+
+    def __init__(self, halflife=None, alpha=None, min_periods=1):
+        if halflife is not None:
+            alpha = 1 - np.exp(np.log(0.5) / halflife)
+        if alpha is None:
+            raise ValueError("需要提供 halflife 或 alpha")
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.count = 0
+        self._mean = None
+        self._cross = None
+
+    def update(self, rows):
+        """
+        加入一行或多行收益率（按时间顺序）
+
+        参数:
+            rows (np.ndarray): (股票,) 或 (行数, 股票) 的收益率
+        """
+        rows = np.nan_to_num(np.atleast_2d(np.asarray(rows, dtype=float)))
+        if not len(rows):
+            return
+        if self._mean is None:
+            self._mean = rows[0].copy()
+            self._cross = np.outer(rows[0], rows[0])
+            self.count = 1
+            rows = rows[1:]
+        k = len(rows)
+        decay = 1 - self.alpha
+        weights = self.alpha * decay ** np.arange(k - 1, -1, -1)
+        self._mean = decay ** k * self._mean + weights @ rows
+        self._cross = decay ** k * self._cross + (rows * weights[:, None]).T @ rows
+        self.count += k
+
+    def cov(self):
+        """
+        当前的协方差矩阵
+
+        返回:
+            np.ndarray: (股票, 股票) 协方差矩阵，行数不足 min_periods 时全为NaN
+        """
+        cov = self._cross - np.outer(self._mean, self._mean)
+        return cov if self.count >= self.min_periods else np.full(cov.shape, np.nan)
+
+    def corr(self):
+        """
+        当前的相关系数矩阵
+
+        返回:
+            np.ndarray: (股票, 股票) 相关系数矩阵
+        """
+        return cov_to_corr(self.cov())
+
+
+def rolling_covariances(returns, window=252, at=None, min_periods=None, halflife=None):
+    """
+    逐个时间点产生协方差矩阵，相邻时间点之间的数据作为一个批次增量更新
+
+    参数:
+        returns (np.ndarray): (时间, 股票) 收益率
+        window (int): 窗口长度（halflife 为None时使用）
+        at (array-like | None): 需要协方差矩阵的行号（升序），默认为窗口填满之后的每一行
+        min_periods (int | None): 最少有效样本数，默认为 window
+        halflife (float | None): 提供时改用指数加权协方差
+
+    返回:
+        generator: 产生 (行号, 协方差矩阵)
+    """
+    returns = np.asarray(returns, dtype=float)
+    if halflife is not None:
+        tracker = EWCovariance(halflife=halflife, min_periods=min_periods or 1)
+    else:
+        tracker = RollingCovariance(window, min_periods)
+    if at is None:
+        at = range(tracker.min_periods - 1, len(returns))
+    done = 0
+    for row in at:
+        tracker.update(returns[done:row + 1])
+        done = row + 1
+        yield row, tracker.cov()
+
+
+def cov_to_corr(cov):
+    """
+    协方差矩阵转换为相关系数矩阵
+
+    参数:
+        cov (np.ndarray): 协方差矩阵
+
+    返回:
+        np.ndarray: 相关系数矩阵
+    """
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+    return corr
+
+
+def portfolio_volatility(returns, weights, window=252, ddof=1, block=256):
+    """
+    组合收益率的滚动标准差，即每个时间点的 sqrt(w' Σ w)，Σ 为截止到该点的窗口协方差
+
+    权重不变时等价于组合收益率序列的滚动标准差；权重随时间变化时，每 block 个时间点把所需的
+    历史收益率和这些时间点的权重做一次矩阵乘法，再取出各自的窗口，不需要构造协方差矩阵。
+    缺失的收益率按0处理。
+
+    参数:
+        returns (np.ndarray): (时间, 股票) 收益率
+        weights (np.ndarray): (股票,) 固定权重，或 (时间, 股票) 每个时间点的权重
+        window (int): 窗口长度
+        ddof (int): 自由度修正
+        block (int): 每批处理的时间点数
+
+    返回:
+        np.ndarray: (时间,) 组合波动率，窗口未填满的位置为NaN
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    weights = np.asarray(weights, dtype=float)
+    if weights.ndim == 1:
+        return RollingStd(window, ddof).run(returns @ weights)[f'std_{window}']
+
+    n_rows = len(returns)
+    result = np.full(n_rows, np.nan)
+    offsets = np.arange(window)
+    for start in range(window - 1, n_rows, block):
+        stop = min(start + block, n_rows)
+        history = returns[start - window + 1:stop]
+        # values[i, b] 为第 start + b 个时间点的权重下，history 第 i 行的组合收益率
+        values = history @ weights[start:stop].T
+        days = np.arange(stop - start)
+        windows = values[days[:, None] + offsets, days[:, None]]
+        result[start:stop] = windows.std(axis=1, ddof=ddof)
+    return result
+
+
+def rolling_beta(returns, benchmark, window=252, min_periods=None):
+    """
+    所有股票相对基准的滚动贝塔，用累加和一次计算
+
+    协方差和基准方差都在成对有效的样本上计算（即窗口内的最小二乘回归斜率），没有缺失值时
+    与 pandas 的 rolling(window).cov(基准) / 基准.rolling(window).var() 一致。
+
+    参数:
+        returns (np.ndarray): (时间,) 或 (时间, 股票) 收益率
+        benchmark (np.ndarray): (时间,) 基准收益率
+        window (int): 窗口长度
+        min_periods (int | None): 最少成对有效样本数，默认为 window
+
+    返回:
+        np.ndarray: 与 returns 形状相同的贝塔
+    """
+    x, squeeze = as_2d(returns)
+    y = np.asarray(benchmark, dtype=float)[:, None]
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    def rolling_sum(values):
+        cs = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        out = cs[1:].copy()
+        out[window:] -= cs[1:-window]
+        return out
+
+    n = rolling_sum(valid.astype(float))
+    sx, sy = rolling_sum(x), rolling_sum(y)
+    sxy, syy = rolling_sum(x * y), rolling_sum(y * y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = (sxy - sx * sy / n) / (syy - sy * sy / n)
+    return restore(np.where(n >= max(min_periods, 2), beta, np.nan), squeeze)
+
+
+def historical_var(returns, alpha=0.05, window=None):
+    """
+    历史模拟法的在险价值（VaR）与条件在险价值（CVaR）
+
+    VaR 为收益率的 α 分位数（线性插值，与 np.quantile 一致）取负；CVaR 为最差的 ⌊α(n-1)⌋+1 个
+    收益率的平均值取负。滚动计算时每批窗口用 np.partition 只找出需要的两个位置，不做完整排序。
+
+    参数:
+        returns (np.ndarray): (时间,) 或 (时间, 股票) 收益率
+        alpha (float): 尾部概率，例如 0.05 表示 95% 置信水平
+        window (int | None): 滚动窗口长度（窗口内需全部有效），None 表示使用全部样本（跳过NaN）
+
+    返回:
+        tuple: (VaR, CVaR)，以正数表示损失；window 为None时每只股票一个值，否则为每个时间点的值
+    """
+    x, squeeze = as_2d(returns)
+    if window is None:
+        var, cvar = _tail_risk(np.sort(x, axis=0).T, alpha)
+        return _scalar_or(var, squeeze), _scalar_or(cvar, squeeze)
+
+    var = np.full(x.shape, np.nan)
+    cvar = np.full(x.shape, np.nan)
+    if len(x) < window:
+        return restore(var, squeeze), restore(cvar, squeeze)
+    pos = alpha * (window - 1)
+    lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+    missing = np.cumsum(np.vstack([np.zeros((1, x.shape[1])), np.isnan(x)]), axis=0)
+    complete = (missing[window:] - missing[:-window]) == 0
+    windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+    # 每批最多约800万个元素，控制内存
+    block = max(1, 8_000_000 // max(1, x.shape[1] * window))
+    for start in range(0, len(windows), block):
+        chunk = np.partition(windows[start:start + block], (lo, hi), axis=-1)
+        quantile = chunk[..., lo] + (chunk[..., hi] - chunk[..., lo]) * (pos - lo)
+        rows = slice(window - 1 + start, window - 1 + start + len(chunk))
+        var[rows] = -quantile
+        cvar[rows] = -chunk[..., :lo + 1].mean(axis=-1)
+    valid = np.zeros(x.shape, dtype=bool)
+    valid[window - 1:] = complete
+    var[~valid] = np.nan
+    cvar[~valid] = np.nan
+    return restore(var, squeeze), restore(cvar, squeeze)
+
+
+def parametric_var(returns, alpha=0.05, window=None):
+    """
+    正态分布假设下的在险价值与条件在险价值
+
+    VaR = -(μ + zσ)，CVaR = -(μ - σφ(z)/α)，其中 z 为标准正态分布的 α 分位数。
+
+    参数:
+        returns (np.ndarray): (时间,) 或 (时间, 股票) 收益率
+        alpha (float): 尾部概率
+        window (int | None): 滚动窗口长度（窗口内需全部有效），None 表示使用全部样本（跳过NaN）
+
+    返回:
+        tuple: (VaR, CVaR)，以正数表示损失
+    """
+    x, squeeze = as_2d(returns)
+    if window is None:
+        mean, std = np.nanmean(x, axis=0), np.nanstd(x, axis=0, ddof=1)
+    else:
+        mean = SMA(window).run(x)[f'sma_{window}']
+        std = RollingStd(window).run(x)[f'std_{window}']
+    normal = NormalDist()
+    z = normal.inv_cdf(alpha)
+    var = -(mean + z * std)
+    cvar = -(mean - std * normal.pdf(z) / alpha)
+    if window is None:
+        return _scalar_or(var, squeeze), _scalar_or(cvar, squeeze)
+    return restore(var, squeeze), restore(cvar, squeeze)
+
+
+def drawdown(returns):
+    """
+    回撤序列：净值相对历史最高点的跌幅，以及截止到每个时间点的最大回撤
+
+    参数:
+        returns (np.ndarray): (时间,) 或 (时间, 股票) 收益率，缺失值按0处理
+
+    返回:
+        tuple: (回撤, 最大回撤)，均为与 returns 形状相同的非正数数组
+    """
+    x, squeeze = as_2d(returns)
+    wealth = np.cumprod(1 + np.nan_to_num(x), axis=0)
+    dd = wealth / np.maximum.accumulate(wealth, axis=0) - 1
+    return restore(dd, squeeze), restore(np.minimum.accumulate(dd, axis=0), squeeze)
+
+
+def _tail_risk(ordered, alpha):
+    # ordered 每行已升序排列（NaN 在最后）
+    count = np.sum(~np.isnan(ordered), axis=1)
+    pos = alpha * np.maximum(count - 1, 0)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    rows = np.arange(len(ordered))
+    quantile = ordered[rows, lo] + (ordered[rows, hi] - ordered[rows, lo]) * (pos - lo)
+    cvar = -np.cumsum(np.nan_to_num(ordered), axis=1)[rows, lo] / (lo + 1)
+    valid = count > 0
+    return np.where(valid, -quantile, np.nan), np.where(valid, cvar, np.nan)
+
+
+def _scalar_or(values, squeeze):
+    return float(values[0]) if squeeze else values
@@ -0,0 +1,298 @@
+import ast
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from indicators import EMA, RSI, SMA, RollingStd
+from panel import _cross_sectional_rank
+
+
+def _shifted(x, n):
+    out = np.full(x.shape, np.nan)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+
+def _rolling_extreme(x, n, reduce):
+    out = np.full(x.shape, np.nan)
+    if n <= len(x):
+        out[n - 1:] = reduce(np.lib.stride_tricks.sliding_window_view(x, n, axis=0), axis=-1)
+    return out
+
+
+def _crossed(a, b, above):
+    diff = a - b
+    prev = _shifted(diff, 1)
+    with np.errstate(invalid='ignore'):
+        return (diff > 0) & (prev <= 0) if above else (diff < 0) & (prev >= 0)
+
+
+# 函数名 -> (数组参数个数, 回看行数（由整数参数决定，None 表示需要全部历史）, 实现)
+# 回看行数函数的参数就是函数接受的整数参数，解析时按它的签名检查参数个数
+# 实现接收数组参数和整数参数，返回与输入等长的数组，开头数据不足的行为NaN
+FUNCTIONS = {
+    'ma': (1, lambda n: n - 1, lambda x, n: SMA(n).run(x)[f'sma_{n}']),
+    'std': (1, lambda n: n - 1, lambda x, n: RollingStd(n).run(x)[f'std_{n}']),
+    'ema': (1, lambda n: None, lambda x, n: EMA(n).run(x)[f'ema_{n}']),
+    'rsi': (1, lambda n=14: None, lambda x, n=14: RSI(n).run(x)['rsi']),
+    'shift': (1, lambda n=1: n, lambda x, n=1: _shifted(x, n)),
+    'ret': (1, lambda n=1: n, lambda x, n=1: x / _shifted(x, n) - 1),
+    'highest': (1, lambda n: n - 1, lambda x, n: _rolling_extreme(x, n, np.max)),
+    'lowest': (1, lambda n: n - 1, lambda x, n: _rolling_extreme(x, n, np.min)),
+    'crossed_above': (2, lambda: 1, lambda a, b: _crossed(a, b, above=True)),
+    'crossed_below': (2, lambda: 1, lambda a, b: _crossed(a, b, above=False)),
+    'rank': (1, lambda: 0, lambda x: _cross_sectional_rank(x, pct=True)),
+    'abs': (1, lambda: 0, np.abs),
+    'log': (1, lambda: 0, np.log),
+}
+
+_BINARY = {
+    ast.Add: ('+', np.add), ast.Sub: ('-', np.subtract), ast.Mult: ('*', np.multiply),
+    ast.Div: ('/', np.divide), ast.Pow: ('**', np.power),
+    ast.BitAnd: ('&', np.logical_and), ast.BitOr: ('|', np.logical_or),
+}
+_COMPARE = {
+    ast.Gt: ('>', np.greater), ast.GtE: ('>=', np.greater_equal), ast.Lt: ('<', np.less),
+    ast.LtE: ('<=', np.less_equal), ast.Eq: ('==', np.equal), ast.NotEq: ('!=', np.not_equal),
+}
+_OPERATORS = {name: func for name, func in list(_BINARY.values()) + list(_COMPARE.values())}
+_OPERATORS['neg'] = np.negative
+_OPERATORS['not'] = np.logical_not
+
+
+def parse(expression, definitions=None):
+    """
+    把筛选表达式解析为表达式树
+
+    表达式使用 Python 语法的一个子集：面板字段（close、volume 等，不区分大小写）、数字、
+    四则运算和乘方、比较（可以连写，例如 0 < x < 1）、and / or / not（或 & / | / ~），以及
+    FUNCTIONS 中的函数，函数的窗口等参数必须是整数常量，例如:
+        crossed_above(close, ma(close, 200)) and volume > ma(volume, 20)
+
+    表达式树由元组组成，相同的子表达式得到相等的元组，因此可以作为缓存键在多条规则间共用。
+
+    参数:
+        expression (str): 表达式
+        definitions (dict[str, str] | None): 可以在表达式中引用的命名子表达式，例如 {'ma200': 'ma(close, 200)'}
+
+    返回:
+        tuple: 表达式树
+    """
+    trees = {}
+    for name, text in (definitions or {}).items():
+        trees[name.lower()] = _build(ast.parse(text, mode='eval').body, trees)
+    try:
+        return _build(ast.parse(expression, mode='eval').body, trees)
+    except SyntaxError as exc:
+        raise ValueError(f"无法解析表达式 {expression!r}: {exc.msg}") from None
+
+
+def _build(node, definitions):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return ('const', float(node.value))
+    if isinstance(node, ast.Name):
+        name = node.id.lower()
+        return definitions.get(name, ('field', name.capitalize()))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        return _op(_BINARY[type(node.op)][0], _build(node.left, definitions), _build(node.right, definitions))
+    if isinstance(node, ast.BoolOp):
+        op = '&' if isinstance(node.op, ast.And) else '|'
+        tree = _build(node.values[0], definitions)
+        for value in node.values[1:]:
+            tree = _op(op, tree, _build(value, definitions))
+        return tree
+    if isinstance(node, ast.UnaryOp):
+        operand = _build(node.operand, definitions)
+        if isinstance(node.op, ast.USub):
+            return _op('neg', operand)
+        if isinstance(node.op, (ast.Not, ast.Invert)):
+            return _op('not', operand)
+    if isinstance(node, ast.Compare):
+        # a < b < c 等价于 (a < b) & (b < c)
+        terms = [_build(node.left, definitions)] + [_build(c, definitions) for c in node.comparators]
+        tree = None
+        for op, left, right in zip(node.ops, terms, terms[1:]):
+            if type(op) not in _COMPARE:
+                break
+            compare = _op(_COMPARE[type(op)][0], left, right)
+            tree = compare if tree is None else _op('&', tree, compare)
+        else:
+            return tree
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id.lower() in FUNCTIONS:
+        name = node.func.id.lower()
+        n_arrays = FUNCTIONS[name][0]
+        if len(node.args) < n_arrays or node.keywords:
+            raise ValueError(f"函数 {name} 需要 {n_arrays} 个数据参数，窗口等参数只能按位置给出")
+        arrays = tuple(_build(arg, definitions) for arg in node.args[:n_arrays])
+        params = []
+        for arg in node.args[n_arrays:]:
+            if not (isinstance(arg, ast.Constant) and isinstance(arg.value, int)):
+                raise ValueError(f"函数 {name} 的参数必须是整数常量: {ast.unparse(arg)}")
+            params.append(arg.value)
+        required, total = _param_count(name)
+        if not required <= len(params) <= total:
+            expected = required if required == total else f'{required}~{total}'
+            raise ValueError(f"函数 {name} 需要 {expected} 个整数参数: {ast.unparse(node)}")
+        return ('call', name, arrays, tuple(params))
+    raise ValueError(f"不支持的表达式: {ast.unparse(node)}")
+
+
+def _op(name, *operands):
+    # 只有常量参与的运算在解析时直接算出结果，求值时所有 'op' 节点都至少有一个数组参数
+    if all(operand[0] == 'const' for operand in operands):
+        with np.errstate(all='ignore'):
+            return ('const', float(_OPERATORS[name](*(operand[1] for operand in operands))))
+    return ('op', name) + operands
+
+
+def _param_count(name):
+    # 整数参数的个数范围（必需的个数，最多的个数），由回看行数函数的签名给出
+    params = inspect.signature(FUNCTIONS[name][1]).parameters.values()
+    return sum(p.default is p.empty for p in params), len(params)
+
+
+def _children(tree):
+    if tree[0] == 'op':
+        return tree[2:]
+    if tree[0] == 'call':
+        return tree[2]
+    return ()
+
+
+def _lookback(tree):
+    if tree[0] != 'call':
+        return 0
+    return FUNCTIONS[tree[1]][1](*tree[3])
+
+
+class Screener:
+    """
+    横截面筛选器：一组命名的规则在整个面板（所有股票）上一次性向量化求值
+
+    所有规则的表达式树合并成一张图，相同的子表达式（例如多条规则都用到的 ma(close, 200)）只计算一次。
+    每个节点只计算它的使用者需要的最后若干行：只看最新一根K线时，ma(close, 200) 只读取最后 200 行，
+    ret(ma(close, 50), 5) 中的均线只计算最后 6 行。需要全部历史的函数（ema、rsi）读取全部行。
+
+    参数:
+        rules (dict[str, str]): {规则名称: 表达式}，表达式语法见 parse；结果可以是布尔值（筛选条件）
+                                也可以是数值（例如用于排序的得分）
+        definitions (dict[str, str] | None): 规则中可以引用的命名子表达式
+    """
+
+    def __init__(self, rules, definitions=None):
+        self.rules = {name: parse(expression, definitions) for name, expression in rules.items()}
+        self._order = _topological(self.rules.values())
+        # references 为不合并相同子表达式时需要计算的节点数
+        self.stats = {'rules': len(self.rules), 'nodes': len(self._order),
+                      'references': sum(_size(tree) for tree in self.rules.values())}
+
+    def evaluate(self, panel, rows=1, names=None):
+        """
+        计算规则在最后 rows 行上的值
+
+        参数:
+            panel (Panel): 面板数据
+            rows (int | None): 计算的行数，None 表示全部行
+            names (list[str] | None): 只计算这些规则（以及它们用到的子表达式），None 表示全部规则
+
+        返回:
+            dict[str, np.ndarray]: {规则名称: (rows, 股票) 数组}
+        """
+        rules = self.rules if names is None else {name: self.rules[name] for name in names}
+        order = self._order if names is None else _topological(rules.values())
+        n_rows = len(panel.index)
+        rows = n_rows if rows is None else min(rows, n_rows)
+        # 从规则往下确定每个节点需要计算的行数
+        need = dict.fromkeys(order, 0)
+        for tree in rules.values():
+            need[tree] = rows
+        for tree in reversed(order):
+            if need[tree] == 0 or tree[0] in ('field', 'const'):
+                continue
+            lookback = _lookback(tree)
+            child_rows = n_rows if lookback is None else min(n_rows, need[tree] + lookback)
+            for child in _children(tree):
+                need[child] = max(need[child], child_rows)
+
+        values = {}
+        for tree in order:
+            kind = tree[0]
+            if kind == 'const':
+                values[tree] = tree[1]
+            elif kind == 'field':
+                values[tree] = panel[tree[1]][n_rows - need[tree]:]
+            else:
+                # 对齐到末尾：每个子节点取最后 m 行，m 为本节点需要的行数加上回看行数
+                lookback = _lookback(tree)
+                m = n_rows if lookback is None else min(n_rows, need[tree] + lookback)
+                args = [values[child] if child[0] == 'const' else values[child][len(values[child]) - m:]
+                        for child in _children(tree)]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    if kind == 'op':
+                        result = _OPERATORS[tree[1]](*args)
+                    else:
+                        result = FUNCTIONS[tree[1]][2](*[np.asarray(a, dtype=float) for a in args], *tree[3])
+                values[tree] = result[len(result) - need[tree]:]
+        results = {}
+        for name, tree in rules.items():
+            value = values[tree]
+            if tree[0] == 'const':
+                value = np.full((rows, len(panel.symbols)), value)
+            elif tree[0] == 'field':
+                # 字段是面板数组的视图，复制一份，避免调用方修改结果时改动面板
+                value = value[len(value) - rows:].copy()
+            else:
+                # 同时被其他规则用到的子表达式计算了更多行，只返回最后 rows 行
+                value = value[len(value) - rows:]
+            results[name] = value
+        return results
+
+    def screen(self, panel):
+        """
+        在最新一根K线上求值
+
+        参数:
+            panel (Panel): 面板数据
+
+        返回:
+            pd.DataFrame: 每只股票一行、每条规则一列
+        """
+        results = self.evaluate(panel, rows=1)
+        return pd.DataFrame({name: value[-1] for name, value in results.items()}, index=pd.Index(panel.symbols))
+
+    def matches(self, panel, rule):
+        """
+        在最新一根K线上满足某条规则的股票
+
+        参数:
+            panel (Panel): 面板数据
+            rule (str): 规则名称
+
+        返回:
+            list[str]: 股票代码
+        """
+        mask = self.evaluate(panel, rows=1, names=[rule])[rule][-1]
+        return [symbol for symbol, ok in zip(panel.symbols, mask) if ok]
+
+
+def _topological(trees):
+    # 后序遍历：子表达式排在使用它的表达式之前，相同的子表达式只出现一次
+    order, seen = [], set()
+
+    def visit(tree):
+        if tree in seen:
+            return
+        for child in _children(tree):
+            visit(child)
+        seen.add(tree)
+        order.append(tree)
+
+    for tree in trees:
+        visit(tree)
+    return order
+
+
+def _size(tree):
+    return 1 + sum(_size(child) for child in _children(tree))
@@ -0,0 +1,395 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_providers import make_synthetic_ohlcv
+from incremental_stats import RunningStats
+from indicators import INDICATORS
+
+# 数据源发出的字段（小写，与 Indicator.inputs 一致）
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# 数据流结束的标记
+_END = object()
+
+
+class ReplaySource:
+    """
+    回放历史K线的数据源，例如 OHLCVCache.get 或 get_stock_data_many 的结果
+
+    多只股票的K线按时间戳合并后依次发出，同一时间戳按股票顺序。每根K线是一个字典：
+    symbol、timestamp（int64 UTC纳秒）以及 open/high/low/close/volume。
+
+    参数:
+        frames (dict[str, pd.DataFrame] | pd.DataFrame): {代码: 历史数据}，或单只股票的历史数据
+        symbol (str): frames 为单个DataFrame时的股票代码
+        speed (float | None): 回放速度倍数（按K线时间间隔等待，60 表示1分钟的K线间隔等待1秒）；
+                              None 表示不等待，尽快回放
+    """
+
+    def __init__(self, frames, symbol='asset', speed=None):
+        if isinstance(frames, pd.DataFrame):
+            frames = {symbol: frames}
+        self.frames = frames
+        self.speed = speed
+        self.tz = next((data.index.tz for data in frames.values()), None)
+
+    async def __aiter__(self):
+        symbols, timestamps, columns = self._merge()
+        last = None
+        for i in range(len(timestamps)):
+            ts = int(timestamps[i])
+            if self.speed and last is not None and ts > last:
+                await asyncio.sleep((ts - last) / 1e9 / self.speed)
+            last = ts
+            bar = {'symbol': symbols[i], 'timestamp': ts}
+            for field in BAR_FIELDS:
+                bar[field] = float(columns[field][i])
+            yield bar
+
+    def _merge(self):
+        # 先把所有股票的列拼接成数组再按时间排序，回放时不需要逐行访问DataFrame
+        names, stamps, columns = [], [], {field: [] for field in BAR_FIELDS}
+        for symbol, data in self.frames.items():
+            names.append(np.full(len(data), symbol, dtype=object))
+            stamps.append(data.index.asi8 if data.index.tz is None else data.index.tz_convert('UTC').asi8)
+            for field in BAR_FIELDS:
+                column = field.capitalize()
+                columns[field].append(data[column].to_numpy(dtype=float) if column in data
+                                      else np.full(len(data), np.nan))
+        if not stamps:
+            return [], np.empty(0, dtype=np.int64), {field: np.empty(0) for field in BAR_FIELDS}
+        stamps = np.concatenate(stamps)
+        order = np.argsort(stamps, kind='stable')
+        symbols = np.concatenate(names)[order].tolist()
+        return symbols, stamps[order], {field: np.concatenate(v)[order] for field, v in columns.items()}
+
+
+class SimulatedSource(ReplaySource):
+    """
+    本地模拟的实时行情，使用 make_synthetic_ohlcv 生成的K线
+
+    参数:
+        symbols (list[str]): 股票代码
+        start (str | datetime): 开始时间
+        end (str | datetime): 结束时间（不包含）
+        freq (str): K线频率，例如 'min'
+        seed (int): 随机种子
+        speed (float | None): 回放速度倍数，None 表示尽快发出
+    """
+
+    def __init__(self, symbols, start, end, freq='min', seed=0, speed=None):
+        frames = {symbol: make_synthetic_ohlcv(symbol, start, end, freq=freq, seed=seed, base_date=start)
+                  for symbol in symbols}
+        super().__init__(frames, speed=speed)
+
+
+class Stage:
+    """
+    处理阶段的基类：每个股票各自维护增量状态，process 在K线字典上增加字段后返回
+
+    process 返回 None 时丢弃这根K线，后面的阶段和输出都不会收到它。
+    """
+
+    def process(self, bar):
+        raise NotImplementedError
+
+
+class IndicatorStage(Stage):
+    """
+    增量计算技术指标（indicators.INDICATORS 中的任意指标），每只股票一个指标实例
+
+    参数:
+        name (str): 指标名称，例如 'sma'、'rsi'
+        prefix (str): 输出字段的前缀，默认不加前缀（例如 sma_50）
+        **params: 指标参数，例如 windows=(50, 200)
+    """
+
+    def __init__(self, name, prefix='', **params):
+        self.factory = INDICATORS[name]
+        self.params = params
+        self.prefix = prefix
+        self._states = {}
+
+    def process(self, bar):
+        indicator = self._states.get(bar['symbol'])
+        if indicator is None:
+            indicator = self.factory(**self.params)
+            # 从空历史开始，之后每根K线都是 O(1) 的增量更新
+            indicator.run(**{field: np.empty(0) for field in indicator.inputs})
+            self._states[bar['symbol']] = indicator
+        values = indicator.update(**{field: bar[field] for field in indicator.inputs})
+        for key, value in values.items():
+            bar[self.prefix + key] = value
+        return bar
+
+
+class ReturnsStage(Stage):
+    """
+    计算相对上一根K线的收益率（百分比，与 pct_change() * 100 一致），字段名为 return
+
+    参数:
+        field (str): 价格字段
+    """
+
+    def __init__(self, field='close'):
+        self.field = field
+        self._previous = {}
+
+    def process(self, bar):
+        price = bar[self.field]
+        previous = self._previous.get(bar['symbol'])
+        bar['return'] = (price / previous - 1) * 100 if previous else np.nan
+        if not np.isnan(price):
+            self._previous[bar['symbol']] = price
+        return bar
+
+
+class StatsStage(Stage):
+    """
+    用 RunningStats 维护每只股票某个字段的流式统计，并把当前的均值和标准差写入K线
+
+    参数:
+        field (str): 统计的字段，通常是 ReturnsStage 计算的 return
+    """
+
+    def __init__(self, field='return'):
+        self.field = field
+        self.stats = {}
+
+    def process(self, bar):
+        stats = self.stats.get(bar['symbol'])
+        if stats is None:
+            stats = self.stats[bar['symbol']] = RunningStats()
+        stats.update(bar[self.field])
+        bar[f'{self.field}_mean'] = stats.mean
+        bar[f'{self.field}_std'] = stats.std
+        return bar
+
+
+class Sink:
+    """
+    输出的基类。write 可以是普通函数或协程；close 在数据流结束时调用
+    """
+
+    def write(self, bar):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ConsoleSink(Sink):
+    """
+    把K线打印到控制台
+
+    参数:
+        fields (tuple[str] | None): 打印的字段，None 表示全部
+        every (int): 每隔多少根K线打印一次
+        tz (str | None): 显示时间使用的时区
+    """
+
+    def __init__(self, fields=None, every=1, tz=None):
+        self.fields = fields
+        self.every = every
+        self.tz = tz
+        self.count = 0
+
+    def write(self, bar):
+        self.count += 1
+        if self.count % self.every:
+            return
+        time_text = pd.Timestamp(bar['timestamp'], tz='UTC').tz_convert(self.tz)
+        fields = self.fields or [k for k in bar if k not in ('symbol', 'timestamp', '_t0', '_pending')]
+        values = ' '.join(f"{k}={bar[k]:.4f}" for k in fields)
+        print(f"{time_text} {bar['symbol']} {values}")
+
+
+class FileSink(Sink):
+    """
+    把K线按CSV格式写入文件
+
+    参数:
+        path (str): 文件路径
+        fields (tuple[str]): 写入的字段（除 symbol 和时间以外）
+        buffer_size (int): 攒够多少行再写入文件
+    """
+
+    def __init__(self, path, fields=('close',), buffer_size=1000):
+        self.path = path
+        self.fields = tuple(fields)
+        self.buffer_size = buffer_size
+        self._rows = []
+        self._file = open(path, 'w')
+        self._file.write(','.join(('symbol', 'timestamp') + self.fields) + '\n')
+
+    def write(self, bar):
+        values = ','.join(str(bar.get(field, np.nan)) for field in self.fields)
+        self._rows.append(f"{bar['symbol']},{np.datetime64(bar['timestamp'], 'ns')},{values}\n")
+        if len(self._rows) >= self.buffer_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._file.close()
+
+    def _flush(self):
+        self._file.writelines(self._rows)
+        self._file.flush()
+        self._rows = []
+
+
+class PlotSink(Sink):
+    """
+    实时更新一只股票的折线图（只保留最近 window 根K线）
+
+    参数:
+        ax (matplotlib.axes.Axes): 绘图的坐标轴
+        symbol (str): 股票代码
+        fields (tuple[str]): 绘制的字段，例如 ('close', 'sma_50')
+        window (int): 显示的K线数量
+        every (int): 每隔多少根K线重绘一次
+    """
+
+    def __init__(self, ax, symbol, fields=('close',), window=500, every=50):
+        self.ax = ax
+        self.symbol = symbol
+        self.fields = tuple(fields)
+        self.window = window
+        self.every = every
+        self._values = {field: np.full(window, np.nan) for field in self.fields}
+        self._lines = {field: ax.plot(np.arange(window), self._values[field], label=field)[0]
+                       for field in self.fields}
+        self._count = 0
+        ax.legend(loc='upper left')
+
+    def write(self, bar):
+        if bar['symbol'] != self.symbol:
+            return
+        pos = self._count % self.window
+        for field in self.fields:
+            self._values[field][pos] = bar.get(field, np.nan)
+        self._count += 1
+        if self._count % self.every == 0:
+            self._redraw()
+
+    def close(self):
+        self._redraw()
+
+    def _redraw(self):
+        # 环形缓冲区按时间顺序展开后更新曲线数据，不重新创建图形对象
+        shift = self._count % self.window if self._count >= self.window else 0
+        for field, line in self._lines.items():
+            line.set_ydata(np.roll(self._values[field], -shift))
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.ax.figure.canvas.draw_idle()
+        self.ax.figure.canvas.flush_events()
+
+
+class Pipeline:
+    """
+    基于 asyncio 的流式K线处理管道：数据源 -> 处理阶段 -> 多个输出
+
+    数据源、处理阶段和每个输出分别运行在独立的任务中，相互之间用有界队列连接。某个输出
+    处理不过来时它的队列会被填满，上游的 put 随之等待，形成反压，内存占用不会无限增长。
+
+    每根K线从数据源发出时记录时间，所有输出都处理完后计算端到端延迟，统计结果在 latency
+    （RunningStats，单位微秒）中。尽快回放时队列始终是满的，延迟主要是排队时间；按实际速度
+    回放（speed）时队列基本为空，延迟才反映处理一根K线本身的耗时。
+
+    参数:
+        source: 数据源，可异步迭代、产生K线字典的对象，例如 ReplaySource、SimulatedSource
+        stages (list[Stage]): 处理阶段，按顺序执行
+        sinks (list[Sink]): 输出
+        queue_size (int): 每个队列的容量
+    """
+
+    def __init__(self, source, stages=(), sinks=(), queue_size=1000):
+        self.source = source
+        self.stages = list(stages)
+        self.sinks = list(sinks)
+        self.queue_size = queue_size
+        self.latency = RunningStats()
+        self.stats = {'bars': 0, 'dropped': 0, 'elapsed': 0.0}
+
+    def run(self):
+        """
+        运行管道直到数据源结束（在没有事件循环的同步代码中调用）
+
+        返回:
+            dict: 运行统计，见 run_async
+        """
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """
+        运行管道直到数据源结束
+
+        返回:
+            dict: K线数量、丢弃数量、耗时、每秒K线数，以及端到端延迟的中位数/p99/最大值（微秒）
+        """
+        stage_queue = asyncio.Queue(self.queue_size)
+        sink_queues = [asyncio.Queue(self.queue_size) for _ in self.sinks]
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            self._produce(stage_queue),
+            self._process(stage_queue, sink_queues),
+            *(self._consume(sink, queue) for sink, queue in zip(self.sinks, sink_queues)),
+        )
+        elapsed = time.perf_counter() - t0
+        self.stats['elapsed'] = elapsed
+        self.stats['bars_per_sec'] = self.stats['bars'] / elapsed if elapsed > 0 else np.nan
+        self.stats['latency_p50_us'] = self.latency.median
+        self.stats['latency_p99_us'] = self.latency.quantile(0.99)
+        self.stats['latency_max_us'] = self.latency.max
+        return self.stats
+
+    async def _produce(self, queue):
+        async for bar in self.source:
+            bar['_t0'] = time.perf_counter()
+            await queue.put(bar)
+        await queue.put(_END)
+
+    async def _process(self, queue, sink_queues):
+        while True:
+            bar = await queue.get()
+            if bar is _END:
+                break
+            self.stats['bars'] += 1
+            for stage in self.stages:
+                bar = stage.process(bar)
+                if bar is None:
+                    break
+            if bar is None:
+                self.stats['dropped'] += 1
+                continue
+            if not sink_queues:
+                self._finish(bar)
+                continue
+            bar['_pending'] = len(sink_queues)
+            for sink_queue in sink_queues:
+                await sink_queue.put(bar)
+        for sink_queue in sink_queues:
+            await sink_queue.put(_END)
+
+    async def _consume(self, sink, queue):
+        while True:
+            bar = await queue.get()
+            if bar is _END:
+                break
+            result = sink.write(bar)
+            if asyncio.iscoroutine(result):
+                await result
+            # 所有输出都处理完这根K线才算结束
+            bar['_pending'] -= 1
+            if bar['_pending'] == 0:
+                self._finish(bar)
+        result = sink.close()
+        if asyncio.iscoroutine(result):
+            await result
+
+    def _finish(self, bar):
+        self.latency.update((time.perf_counter() - bar['_t0']) * 1e6)
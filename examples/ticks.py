@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+
+# 逐笔数据在内存中的格式：{'timestamp': int64 UTC纳秒, 'price': float64, 'size': float64}
+TICK_FIELDS = ('timestamp', 'price', 'size')
+
+BAR_KINDS = ('time', 'volume', 'dollar')
+
+
+def make_synthetic_ticks(n_ticks, start='2024-01-02 09:30', tz='America/New_York', seed=0,
+                         mean_interval_ms=50.0, price=100.0, chunksize=2_000_000):
+    """
+    分块生成确定性的模拟逐笔成交数据（价格为随机游走，成交间隔服从指数分布）
+
+    每块使用独立的随机流，价格和时间在块之间连续，所以总量很大（例如1亿笔）时
+    也只需要一块的内存。
+
+    参数:
+        n_ticks (int): 总笔数
+        start (str | datetime): 第一笔成交的时间
+        tz (str): start 没有时区时使用的时区
+        seed (int): 随机种子
+        mean_interval_ms (float): 平均成交间隔（毫秒）
+        price (float): 初始价格
+        chunksize (int): 每块的笔数
+
+    返回:
+        generator: 逐块产生 {'timestamp', 'price', 'size'} 数组字典
+    """
+    start = pd.Timestamp(start)
+    start = start.tz_localize(tz) if start.tzinfo is None else start
+    last_ts = start.tz_convert('UTC').value
+    log_price = np.log(price)
+    for k, lo in enumerate(range(0, n_ticks, chunksize)):
+        n = min(chunksize, n_ticks - lo)
+        rng = np.random.default_rng([seed, k])
+        # 间隔至少1纳秒，保证时间戳严格递增
+        gaps = np.maximum(rng.exponential(mean_interval_ms * 1e6, n).astype(np.int64), 1)
+        timestamps = last_ts + np.cumsum(gaps)
+        log_prices = log_price + np.cumsum(rng.normal(0.0, 2e-5, n))
+        sizes = rng.geometric(0.01, n).astype(np.float64)
+        last_ts, log_price = int(timestamps[-1]), float(log_prices[-1])
+        # 价格保留到分，与真实成交价一致
+        yield {'timestamp': timestamps, 'price': np.round(np.exp(log_prices), 2), 'size': sizes}
+
+
+def read_tick_csv(path, chunksize=1_000_000, time_col='timestamp', price_col='price', size_col='size',
+                  tz='UTC'):
+    """
+    分块读取逐笔成交或报价的CSV文件，整个文件不会同时放在内存中
+
+    参数:
+        path (str): CSV文件路径，需要按时间排序
+        chunksize (int): 每块的行数
+        time_col (str): 时间列，可以是时间字符串或 int64 纳秒时间戳
+        price_col (str | tuple[str, str]): 价格列；报价数据可以给出 (买价列, 卖价列)，取中间价
+        size_col (str | None): 成交量列，报价数据没有成交量时为 None（视为0）
+        tz (str): 时间列没有时区时使用的时区
+
+    返回:
+        generator: 逐块产生 {'timestamp', 'price', 'size'} 数组字典
+    """
+    price_cols = [price_col] if isinstance(price_col, str) else list(price_col)
+    usecols = [time_col] + price_cols + ([size_col] if size_col else [])
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        times = chunk[time_col]
+        if pd.api.types.is_integer_dtype(times):
+            timestamps = times.to_numpy(dtype=np.int64)
+        else:
+            times = pd.DatetimeIndex(pd.to_datetime(times))
+            times = times.tz_localize(tz) if times.tz is None else times
+            timestamps = times.tz_convert('UTC').asi8
+        prices = chunk[price_cols].to_numpy(dtype=np.float64).mean(axis=1)
+        sizes = chunk[size_col].to_numpy(dtype=np.float64) if size_col else np.zeros(len(chunk))
+        yield {'timestamp': timestamps, 'price': prices, 'size': sizes}
+
+
+def reduce_segments(starts, price, size, timestamps):
+    """
+    分段归约内核：把连续的逐笔数据按段起点一次性聚合为K线，不对每根K线单独分组
+
+    参数:
+        starts (np.ndarray): 每段第一笔的下标（递增，第一个为0）
+        price (np.ndarray): 价格
+        size (np.ndarray): 成交量
+        timestamps (np.ndarray): int64 时间戳
+
+    返回:
+        dict: 每段的 open/high/low/close/volume/dollar/trades/first/last 数组
+    """
+    ends = np.append(starts[1:], len(price))
+    return {
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[ends - 1],
+        'volume': np.add.reduceat(size, starts),
+        'dollar': np.add.reduceat(price * size, starts),
+        'trades': ends - starts,
+        'first': timestamps[starts],
+        'last': timestamps[ends - 1],
+    }
+
+
+class BarResampler:
+    """
+    分块把逐笔数据合成为K线：时间K线（固定时长）、成交量K线或成交额K线
+
+    每块数据先算出每一笔所属的K线编号，再用 reduce_segments 一次性聚合；最后一根K线可能还没有
+    结束，会保留为状态，和下一块开头属于同一根K线的部分合并。因此分块处理的结果与一次处理全部
+    数据一致（成交额和VWAP只有浮点舍入的差别），内存占用只取决于块的大小。
+
+    时间K线按UTC纪元对齐（与 pandas resample 对 1s/1min/5min/1h 等能整除一天的周期一致），
+    索引为K线开始时间，没有成交的时间段不产生K线。成交量/成交额K线在累计量达到 threshold 时
+    结束（最后一笔可以使累计量超过阈值），索引为最后一笔的时间。
+
+    参数:
+        kind (str): 'time'、'volume' 或 'dollar'
+        freq (str): 时间K线的周期，例如 '1s'、'1min'、'5min'
+        threshold (float): 成交量/成交额K线的阈值
+        tz (str): 输出索引的时区
+    """
+
+    def __init__(self, kind='time', freq='1min', threshold=None, tz='UTC'):
+        if kind not in BAR_KINDS:
+            raise ValueError(f"未知的K线类型: {kind}")
+        if kind != 'time' and not threshold:
+            raise ValueError(f"{kind} K线需要提供 threshold")
+        self.kind = kind
+        self.freq_ns = pd.Timedelta(freq).value if kind == 'time' else None
+        self.threshold = threshold
+        self.tz = tz
+        self._partial = None
+        self._partial_id = None
+        self._cumulative = 0.0
+
+    def update(self, chunk):
+        """
+        处理一块逐笔数据
+
+        参数:
+            chunk (dict): {'timestamp', 'price', 'size'} 数组字典，时间戳递增
+
+        返回:
+            pd.DataFrame: 这一块中已经结束的K线
+        """
+        timestamps = np.asarray(chunk['timestamp'], dtype=np.int64)
+        if len(timestamps) == 0:
+            return self._frame(None)
+        price = np.asarray(chunk['price'], dtype=np.float64)
+        size = np.asarray(chunk['size'], dtype=np.float64)
+
+        bar_id = self._bar_ids(timestamps, price, size)
+        starts = np.flatnonzero(np.diff(bar_id)) + 1
+        starts = np.concatenate([[0], starts])
+        bars = reduce_segments(starts, price, size, timestamps)
+        bars['id'] = bar_id[starts]
+
+        if self._partial is not None:
+            bars = self._merge_partial(bars)
+        # 最后一根K线可能在下一块继续，留到下一次再输出
+        self._partial = {key: values[-1:] for key, values in bars.items()}
+        self._partial_id = bars['id'][-1]
+        return self._frame({key: values[:-1] for key, values in bars.items()})
+
+    def flush(self):
+        """
+        数据结束时输出最后一根（可能未满的）K线
+
+        返回:
+            pd.DataFrame: 最后一根K线
+        """
+        partial, self._partial = self._partial, None
+        return self._frame(partial)
+
+    def _bar_ids(self, timestamps, price, size):
+        if self.kind == 'time':
+            return timestamps // self.freq_ns
+        amount = size if self.kind == 'volume' else price * size
+        # 每一笔之前的累计量决定它属于哪根K线，使得跨过阈值的那一笔仍属于当前K线
+        cumulative = self._cumulative + np.cumsum(amount)
+        before = np.concatenate([[self._cumulative], cumulative[:-1]])
+        self._cumulative = float(cumulative[-1])
+        return np.floor(before / self.threshold).astype(np.int64)
+
+    def _merge_partial(self, bars):
+        partial = self._partial
+        if bars['id'][0] != self._partial_id:
+            return {key: np.concatenate([partial[key], values]) for key, values in bars.items()}
+        # 上一块的最后一根K线和这一块的第一根K线是同一根
+        merged = {key: values.copy() for key, values in bars.items()}
+        merged['open'][0] = partial['open'][0]
+        merged['first'][0] = partial['first'][0]
+        merged['high'][0] = max(partial['high'][0], bars['high'][0])
+        merged['low'][0] = min(partial['low'][0], bars['low'][0])
+        for key in ('volume', 'dollar', 'trades'):
+            merged[key][0] += partial[key][0]
+        return merged
+
+    def _frame(self, bars):
+        if bars is None or len(bars['open']) == 0:
+            index = pd.DatetimeIndex([], name='Date', tz='UTC').tz_convert(self.tz)
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume', 'VWAP', 'Trades'],
+                                index=index, dtype=float)
+        stamps = bars['id'] * self.freq_ns if self.kind == 'time' else bars['last']
+        index = pd.DatetimeIndex(stamps.view('datetime64[ns]'), name='Date').tz_localize('UTC').tz_convert(self.tz)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = bars['dollar'] / bars['volume']
+        return pd.DataFrame({
+            'Open': bars['open'],
+            'High': bars['high'],
+            'Low': bars['low'],
+            'Close': bars['close'],
+            'Volume': bars['volume'],
+            'VWAP': vwap,
+            'Trades': bars['trades'],
+        }, index=index)
+
+
+def resample_ticks(chunks, kind='time', freq='1min', threshold=None, tz='UTC'):
+    """
+    把（分块的）逐笔数据合成为K线
+
+    参数:
+        chunks (iterable[dict] | dict): 逐笔数据块，例如 read_tick_csv 或 make_synthetic_ticks 的结果
+        kind (str): 'time'、'volume' 或 'dollar'
+        freq (str): 时间K线的周期
+        threshold (float): 成交量/成交额K线的阈值
+        tz (str): 输出索引的时区
+
+    返回:
+        pd.DataFrame: 列为 Open/High/Low/Close/Volume/VWAP/Trades 的K线
+    """
+    if isinstance(chunks, dict):
+        chunks = [chunks]
+    resampler = BarResampler(kind, freq, threshold, tz)
+    frames = [resampler.update(chunk) for chunk in chunks]
+    frames.append(resampler.flush())
+    return pd.concat([frame for frame in frames if len(frame)] or frames[-1:])
+
+
+def resample_bars(data, freq):
+    """
+    把日内K线合成为更大周期的K线（例如1分钟合成为5分钟），周期不超过1小时时结果与
+    resample(freq).agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    去掉空K线后一致
+
+    参数:
+        data (pd.DataFrame): 日内K线，索引为 DatetimeIndex
+        freq (str): 目标周期，例如 '5min'、'1h'
+
+    返回:
+        pd.DataFrame: 合成后的K线
+    """
+    if data.empty:
+        return data[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
+    index = data.index if data.index.tz is not None else data.index.tz_localize('UTC')
+    # 按当地时间取整，使周期按当地时间对齐（与 pandas 对带时区索引的 resample 一致）
+    utc_ns = index.asi8
+    offset = index.tz_localize(None).asi8 - utc_ns
+    freq_ns = pd.Timedelta(freq).value
+    bar_id = (utc_ns + offset) // freq_ns
+    # 夏令时结束时同一个本地小时会出现两次，时区偏移变化处也要断开
+    boundary = (np.diff(bar_id) != 0) | (np.diff(offset) != 0)
+    starts = np.concatenate([[0], np.flatnonzero(boundary) + 1])
+    ends = np.append(starts[1:], len(data))
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+    # K线开始时间换回UTC时使用该K线第一行的时区偏移，避免夏令时切换时本地时间有歧义
+    labels = pd.DatetimeIndex((bar_id[starts] * freq_ns - offset[starts]).view('datetime64[ns]'),
+                              name=data.index.name).tz_localize('UTC').tz_convert(index.tz)
+    if data.index.tz is None:
+        labels = labels.tz_localize(None)
+    return pd.DataFrame({
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(high, starts),
+        'Low': np.minimum.reduceat(low, starts),
+        'Close': data['Close'].to_numpy()[ends - 1],
+        'Volume': np.add.reduceat(data['Volume'].to_numpy(), starts),
+    }, index=labels)
@@ -0,0 +1,385 @@
+import datetime
+import functools
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from panel import DEFAULT_FIELDS, Panel
+
+# 因突发事件临时休市的日期（国葬、飓风、911等），无法由规则推算
+NYSE_SPECIAL_CLOSURES = (
+    '1985-09-27', '1994-04-27', '2001-09-11', '2001-09-12', '2001-09-13', '2001-09-14',
+    '2004-06-11', '2007-01-02', '2012-10-29', '2012-10-30', '2018-12-05', '2025-01-09',
+)
+
+
+def easter(year):
+    """
+    公历复活节日期（匿名格里高利算法）
+
+    参数:
+        year (int): 年份
+
+    返回:
+        datetime.date: 复活节日期
+    """
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def nyse_holidays(start_year, end_year):
+    """
+    纽约证券交易所的全天休市日
+
+    按现行规则推算：固定日期的节日遇周六提前到周五、遇周日顺延到周一（元旦遇周六不补休），
+    马丁·路德·金纪念日从1998年起、六月节从2022年起休市，另外加上 NYSE_SPECIAL_CLOSURES。
+
+    参数:
+        start_year (int): 开始年份
+        end_year (int): 结束年份（包含）
+
+    返回:
+        pd.DatetimeIndex: 休市日期（不带时区）
+    """
+    days = []
+    for year in range(start_year, end_year + 1):
+        new_year = datetime.date(year, 1, 1)
+        if new_year.weekday() != 5:
+            days.append(_observed(new_year))
+        if year >= 1998:
+            days.append(_nth_weekday(year, 1, 0, 3))
+        days.append(_nth_weekday(year, 2, 0, 3))
+        days.append(easter(year) - datetime.timedelta(days=2))
+        days.append(_nth_weekday(year, 5, 0, -1))
+        if year >= 2022:
+            days.append(_observed(datetime.date(year, 6, 19)))
+        days.append(_observed(datetime.date(year, 7, 4)))
+        days.append(_nth_weekday(year, 9, 0, 1))
+        days.append(_nth_weekday(year, 11, 3, 4))
+        days.append(_observed(datetime.date(year, 12, 25)))
+    holidays = pd.DatetimeIndex(days).union(pd.DatetimeIndex(NYSE_SPECIAL_CLOSURES))
+    return holidays[(holidays.year >= start_year) & (holidays.year <= end_year)]
+
+
+def nyse_early_closes(start_year, end_year):
+    """
+    纽约证券交易所13:00提前收盘的交易日：独立日前一天、感恩节次日、平安夜（均限周一至周四，感恩节次日除外）
+
+    参数:
+        start_year (int): 开始年份
+        end_year (int): 结束年份（包含）
+
+    返回:
+        pd.DatetimeIndex: 提前收盘的日期（不带时区）
+    """
+    days = []
+    for year in range(start_year, end_year + 1):
+        for day in (datetime.date(year, 7, 3), datetime.date(year, 12, 24)):
+            if day.weekday() < 4:
+                days.append(day)
+        days.append(_nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1))
+    return pd.DatetimeIndex(days).difference(pd.DatetimeIndex(NYSE_SPECIAL_CLOSURES))
+
+
+class TradingCalendar:
+    """
+    交易所交易日历，预先计算好所有交易日及其开盘、收盘时间，不需要联网
+
+    交易日保存为 int64 数组（交易所时区当天零点的UTC纳秒，与 yfinance 日K线的时间戳一致），
+    日期和交易日序号之间的转换、区间截取都是在这些数组上的二分查找，可以一次处理一整列时间戳。
+    日内时间戳按交易所时区的日期归属到对应交易日。
+
+    参数:
+        holidays (pd.DatetimeIndex): 全天休市日
+        early_closes (pd.DatetimeIndex): 提前收盘的交易日
+        start (str): 日历的第一天
+        end (str): 日历的最后一天
+        tz (str): 交易所时区
+        open_time (str): 开盘时间
+        close_time (str): 收盘时间
+        early_close_time (str): 提前收盘日的收盘时间
+    """
+
+    def __init__(self, holidays, early_closes=(), start='1990-01-01', end='2035-12-31', tz='America/New_York',
+                 open_time='09:30', close_time='16:00', early_close_time='13:00'):
+        self.tz = tz
+        days = pd.bdate_range(start, end).difference(pd.DatetimeIndex(holidays))
+        self.sessions = days.tz_localize(tz).rename('Date')
+        self.session_ns = self.sessions.asi8
+        early = days.isin(pd.DatetimeIndex(early_closes))
+        self.early_closes = self.sessions[early]
+        self.opens = (days + pd.Timedelta(open_time + ':00')).tz_localize(tz).asi8
+        closes = np.where(early, (days + pd.Timedelta(early_close_time + ':00')).asi8,
+                          (days + pd.Timedelta(close_time + ':00')).asi8)
+        self.closes = pd.DatetimeIndex(closes.view('datetime64[ns]')).tz_localize(tz).asi8
+
+    def __len__(self):
+        return len(self.session_ns)
+
+    def session_index(self, timestamps, side='exact'):
+        """
+        把时间戳转换为交易日序号
+
+        参数:
+            timestamps (pd.DatetimeIndex | array-like): 时间戳，日内时间按交易所时区的日期归属交易日
+            side (str): 'exact'（非交易日返回 -1）、'previous'（非交易日取之前最近的交易日，
+                        早于日历第一天时返回 -1）或 'next'（取之后最近的交易日，晚于日历最后一天时返回 len(self)）
+
+        返回:
+            np.ndarray: int64 交易日序号
+        """
+        days = self._session_dates(timestamps)
+        if side == 'next':
+            return np.searchsorted(self.session_ns, days, side='left')
+        rows = np.searchsorted(self.session_ns, days, side='right') - 1
+        if side == 'previous':
+            return rows
+        if side != 'exact':
+            raise ValueError(f"未知的 side: {side}")
+        hit = (rows >= 0) & (self.session_ns[np.maximum(rows, 0)] == days)
+        return np.where(hit, rows, -1)
+
+    def is_session(self, dates):
+        """
+        判断日期是否为交易日
+
+        参数:
+            dates (pd.DatetimeIndex | array-like): 日期
+
+        返回:
+            np.ndarray: 布尔数组
+        """
+        return self.session_index(dates) >= 0
+
+    def session(self, date, side='previous'):
+        """
+        返回某个日期对应的交易日
+
+        参数:
+            date (str | datetime): 日期
+            side (str): 不是交易日时取之前（'previous'）还是之后（'next'）最近的交易日
+
+        返回:
+            pd.Timestamp: 交易日（交易所时区零点）
+        """
+        return self.sessions[self._checked(self.session_index([date], side)[0], date)]
+
+    def offset(self, date, n):
+        """
+        某个日期之后（n 为负时为之前）第 n 个交易日，非交易日先归到之前最近的交易日
+
+        参数:
+            date (str | datetime): 日期
+            n (int): 交易日个数
+
+        返回:
+            pd.Timestamp: 交易日
+        """
+        i = self._checked(self.session_index([date], 'previous')[0], date)
+        return self.sessions[self._checked(i + n, f'{date} 之后第 {n} 个交易日')]
+
+    def trailing(self, n_sessions, end=None):
+        """
+        截止到 end（默认为今天）的最近 n_sessions 个交易日的首尾日期
+
+        参数:
+            n_sessions (int): 交易日个数，例如一年约252个交易日
+            end (str | datetime | None): 结束日期
+
+        返回:
+            tuple: (第一个交易日, 最后一个交易日)
+        """
+        end = pd.Timestamp.now(tz=self.tz) if end is None else end
+        last = self._checked(self.session_index([end], 'previous')[0], end)
+        first = self._checked(last - n_sessions + 1, f'截止到 {end} 的 {n_sessions} 个交易日')
+        return self.sessions[first], self.sessions[last]
+
+    def _checked(self, i, what):
+        # 交易日序号超出日历范围时报错，避免负数序号从数组末尾取值
+        if not 0 <= i < len(self):
+            raise ValueError(f"{what} 超出交易日历的范围 {self.sessions[0].date()} ~ {self.sessions[-1].date()}")
+        return int(i)
+
+    def sessions_between(self, start=None, end=None):
+        """
+        [start, end] 之间的交易日
+
+        参数:
+            start (str | datetime | None): 开始日期
+            end (str | datetime | None): 结束日期（包含）
+
+        返回:
+            pd.DatetimeIndex: 交易日
+        """
+        i, j = self._session_range(start, end)
+        return self.sessions[i:j]
+
+    def slice_locs(self, timestamps, start=None, end=None):
+        """
+        已排序的时间戳中落在 [start 所在交易日, end 所在交易日] 之内的位置范围
+
+        参数:
+            timestamps (pd.DatetimeIndex | np.ndarray): 升序时间戳（np.ndarray 为 int64 UTC纳秒，
+                                                        不带时区的索引视为交易所时区）
+            start (str | datetime | None): 开始日期
+            end (str | datetime | None): 结束日期（包含整个交易日，日内数据也适用）
+
+        返回:
+            tuple: (i, j)，timestamps[i:j] 即为区间内的数据
+        """
+        stamps = timestamps if isinstance(timestamps, np.ndarray) else self._utc_ns(timestamps)
+        i, j = self._session_range(start, end)
+        lo = self.session_ns[i] if i < len(self) else np.iinfo(np.int64).max
+        # 结束边界取下一个交易日的零点，包含 end 当天的全部日内数据
+        hi = self.session_ns[j] if j < len(self) else np.iinfo(np.int64).max
+        return int(np.searchsorted(stamps, lo, 'left')), int(np.searchsorted(stamps, hi, 'left'))
+
+    @traced
+    def slice(self, data, start=None, end=None):
+        """
+        截取一只股票在 [start, end] 交易日之间的数据（不复制）
+
+        参数:
+            data (pd.DataFrame): 历史数据
+            start (str | datetime | None): 开始日期
+            end (str | datetime | None): 结束日期（包含）
+
+        返回:
+            pd.DataFrame: 截取后的数据
+        """
+        i, j = self.slice_locs(data.index, start, end)
+        return data.iloc[i:j]
+
+    def slice_many(self, frames, start=None, end=None):
+        """
+        截取多只股票的同一时间段，区间边界只换算一次，每只股票只做两次二分查找
+
+        参数:
+            frames (dict[str, pd.DataFrame]): {代码: 历史数据}
+            start (str | datetime | None): 开始日期
+            end (str | datetime | None): 结束日期（包含）
+
+        返回:
+            dict[str, pd.DataFrame]: {代码: 截取后的数据}
+        """
+        i, j = self._session_range(start, end)
+        bounds = np.array([self.session_ns[k] if k < len(self) else np.iinfo(np.int64).max for k in (i, j)])
+        result = {}
+        for symbol, data in frames.items():
+            lo, hi = np.searchsorted(self._utc_ns(data.index), bounds, 'left')
+            result[symbol] = data.iloc[lo:hi]
+        return result
+
+    def align(self, frames, start=None, end=None, fields=DEFAULT_FIELDS):
+        """
+        把多只日K线数据对齐到同一个交易日历上，构建面板
+
+        所有股票的时间戳拼接后只做一次二分查找得到行号，再按字段整体散列写入二维数组；
+        某只股票在某个交易日没有数据时为NaN，不在日历中的时间戳被丢弃。
+
+        参数:
+            frames (dict[str, pd.DataFrame]): {代码: 日K线数据}
+            start (str | datetime | None): 开始日期，默认为所有股票中最早的日期
+            end (str | datetime | None): 结束日期（包含），默认为所有股票中最晚的日期
+            fields (tuple[str]): 需要的字段
+
+        返回:
+            Panel: 以交易日为索引的面板
+        """
+        symbols = list(frames)
+        lengths = [len(frames[symbol]) for symbol in symbols]
+        stamps = np.concatenate([self._utc_ns(frames[symbol].index) for symbol in symbols]) if symbols else \
+            np.empty(0, dtype=np.int64)
+        columns = np.repeat(np.arange(len(symbols)), lengths)
+        rows = self.session_index(pd.DatetimeIndex(stamps.view('datetime64[ns]')).tz_localize('UTC'))
+
+        valid = rows >= 0
+        if start is None and valid.any():
+            start = self.sessions[rows[valid].min()]
+        if end is None and valid.any():
+            end = self.sessions[rows.max()]
+        i, j = self._session_range(start, end)
+        # 在展平的二维数组中的目标位置只计算一次，各字段共用
+        source = np.flatnonzero((rows >= i) & (rows < j))
+        target = (rows[source] - i) * len(symbols) + columns[source]
+
+        arrays = {}
+        for field in fields:
+            values = np.full((j - i, len(symbols)), np.nan)
+            if symbols:
+                column = np.concatenate([
+                    frames[symbol][field].to_numpy(dtype=float) if field in frames[symbol]
+                    else np.full(n, np.nan) for symbol, n in zip(symbols, lengths)
+                ])
+                values.reshape(-1)[target] = column[source]
+            arrays[field] = values
+        return Panel(self.sessions[i:j], symbols, arrays)
+
+    def _localized(self, timestamps):
+        # 不带时区的时间戳视为交易所时区的本地时间
+        index = timestamps if isinstance(timestamps, pd.DatetimeIndex) else pd.DatetimeIndex(timestamps)
+        return index.tz_localize(self.tz) if index.tz is None else index
+
+    def _utc_ns(self, timestamps):
+        return self._localized(timestamps).asi8
+
+    def _session_dates(self, timestamps):
+        index = self._localized(timestamps)
+        stamps = index.asi8
+        # 日K线的时间戳本身就是交易日零点，直接命中时省去按时区换算日期（大数组上很慢）
+        rows = np.minimum(np.searchsorted(self.session_ns, stamps), max(len(self) - 1, 0))
+        other = self.session_ns[rows] != stamps
+        if other.any():
+            stamps = stamps.copy()
+            stamps[other] = index[other].tz_convert(self.tz).normalize().asi8
+        return stamps
+
+    def _session_range(self, start, end):
+        # [start, end] 对应的交易日序号范围 [i, j)
+        i = 0 if start is None else int(self.session_index([start], 'next')[0])
+        j = len(self) if end is None else int(self.session_index([end], 'previous')[0]) + 1
+        return i, max(i, j)
+
+
+@functools.lru_cache(maxsize=None)
+def nyse_calendar(start='1990-01-01', end='2035-12-31'):
+    """
+    纽约证券交易所的交易日历（进程内只构建一次）
+
+    参数:
+        start (str): 日历的第一天
+        end (str): 日历的最后一天
+
+    返回:
+        TradingCalendar: 交易日历
+    """
+    start_year, end_year = pd.Timestamp(start).year, pd.Timestamp(end).year
+    return TradingCalendar(nyse_holidays(start_year, end_year), nyse_early_closes(start_year, end_year),
+                           start=start, end=end)
+
+
+def _observed(day):
+    # 周六的节日提前到周五，周日的顺延到周一
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+
+def _nth_weekday(year, month, weekday, n):
+    # 某月第 n 个星期几（n=-1 表示最后一个）
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
@@ -0,0 +1,295 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from array_utils import ffill
+from instrumentation import traced
+from panel import DEFAULT_FIELDS, Panel
+
+CHECKS = (
+    'duplicate_timestamp',  # 同一时间戳出现多次，或时间戳不是升序
+    'off_calendar',         # K线落在非交易日（周末、假日）
+    'missing_session',      # 首尾K线之间缺少的交易日
+    'non_positive_price',   # 开高低收中有 <= 0 的价格
+    'ohlc_inconsistent',    # 最高价低于最低价，或开盘/收盘价超出最高最低价范围
+    'zero_volume',          # 有价格但成交量为0
+    'outlier_return',       # 收益率相对该股票的中位数偏离超过 outlier_z 个稳健标准差
+    'stale_price',          # 收盘价连续 stale_sessions 个交易日完全不变
+)
+
+
+class ValidationReport:
+    """
+    数据质量检查结果
+
+    参数:
+        issues (pd.DataFrame): 每个问题一行，列为 check、symbol、date、value
+        symbols (list[str]): 被检查的股票代码
+        n_rows (int): 检查的时间点数量
+        repaired (Panel | pd.DataFrame | None): 修复后的数据，没有要求修复时为None
+    """
+
+    def __init__(self, issues, symbols, n_rows, repaired=None):
+        self.issues = issues
+        self.symbols = list(symbols)
+        self.n_rows = n_rows
+        self.repaired = repaired
+
+    def __len__(self):
+        return len(self.issues)
+
+    @property
+    def ok(self):
+        return len(self.issues) == 0
+
+    def counts(self):
+        """
+        每种检查发现的问题数
+
+        返回:
+            pd.Series: 以检查名称为索引，包含所有检查（没有问题的为0）
+        """
+        return self.issues['check'].value_counts(sort=False).reindex(list(CHECKS), fill_value=0)
+
+    def by_symbol(self):
+        """
+        每只股票每种检查发现的问题数，只包含有问题的股票
+
+        返回:
+            pd.DataFrame: 行为股票代码，列为检查名称
+        """
+        table = pd.crosstab(self.issues['symbol'], self.issues['check'])
+        return table.reindex(columns=list(CHECKS), fill_value=0)
+
+    def __str__(self):
+        counts = self.counts()
+        affected = self.issues['symbol'].nunique()
+        lines = [f"数据质量检查: {len(self.symbols)} 只股票 × {self.n_rows} 个时间点，"
+                 f"{len(self.issues)} 个问题，涉及 {affected} 只股票"]
+        lines += [f"  {check:<20} {n:>8}" for check, n in counts.items() if n]
+        return '\n'.join(lines)
+
+
+def validate_panel(panel, calendar=None, outlier_z=10.0, min_outlier_return=5.0, stale_sessions=5,
+                   repair=False):
+    """
+    对整个面板一次性执行所有检查，每项检查都是 (时间, 股票) 二维数组上的向量化运算
+
+    提供交易日历时，面板先按日历重新排列：不在日历中的K线报告为 off_calendar 并去掉，日历中缺少的
+    交易日补为NaN，这样缺失交易日的检查与面板本身的时间索引无关。
+
+    修复（repair=True）的内容：最高价/最低价扩展到包含开盘价和收盘价；价格非正的K线、一天后反向回落的
+    异常收益（尖峰）去掉；去掉的K线和缺失的交易日用前一个收盘价填充价格、成交量记为0。
+    持续不变的价格无法判断真实值，不做修改。
+
+    参数:
+        panel (Panel): 面板数据，至少包含 Close
+        calendar (TradingCalendar | None): 交易日历，为None时不检查 off_calendar 和日历中的缺失交易日，
+                                          只检查面板时间索引内的缺口
+        outlier_z (float): 异常收益的稳健Z分数阈值（基于中位数绝对偏差）
+        min_outlier_return (float): 异常收益的最小绝对值（百分比），避免波动很小的股票误报
+        stale_sessions (int): 收盘价连续多少个交易日不变时报告
+        repair (bool): 是否同时生成修复后的面板（保存在报告的 repaired 中）
+
+    返回:
+        ValidationReport: 检查结果
+    """
+    found = []
+    if calendar is not None:
+        panel, off_calendar = _to_calendar(panel, calendar)
+        found.append(('off_calendar',) + off_calendar)
+
+    close = panel['Close']
+    present = ~np.isnan(close)
+    rows = np.arange(len(close))[:, None]
+    # 每只股票第一根和最后一根K线之间的位置才算缺失
+    first = np.where(present.any(axis=0), np.argmax(present, axis=0), len(close))
+    last = len(close) - 1 - np.argmax(present[::-1], axis=0)
+    live = (rows >= first) & (rows <= last)
+    masks = {'missing_session': (~present & live, None)}
+
+    prices = [panel[field] for field in ('Open', 'High', 'Low', 'Close') if field in panel]
+    with np.errstate(invalid='ignore'):
+        masks['non_positive_price'] = (np.logical_or.reduce([p <= 0 for p in prices]), close)
+        if all(field in panel for field in ('Open', 'High', 'Low')):
+            high, low = panel['High'], panel['Low']
+            body_high = np.fmax(panel['Open'], close)
+            body_low = np.fmin(panel['Open'], close)
+            masks['ohlc_inconsistent'] = ((high < low) | (high < body_high) | (low > body_low), high - low)
+        if 'Volume' in panel:
+            masks['zero_volume'] = (present & (panel['Volume'] == 0), None)
+
+        previous = np.full(close.shape, np.nan)
+        previous[1:] = ffill(close)[:-1]
+        returns = (close / previous - 1) * 100
+        z = _robust_z(returns)
+        outlier = (np.abs(z) > outlier_z) & (np.abs(returns) > min_outlier_return)
+        masks['outlier_return'] = (outlier, returns)
+
+        run = _run_length(close[1:] == close[:-1])
+        stale = np.zeros(close.shape, dtype=bool)
+        stale[1:] = run >= stale_sessions - 1
+        masks['stale_price'] = (stale, None)
+
+    stamps = panel.index.asi8
+    for check, (mask, values) in masks.items():
+        r, c = np.nonzero(mask)
+        found.append((check, stamps[r], c, values[r, c] if values is not None else np.full(len(r), np.nan)))
+
+    repaired = None
+    if repair:
+        # 尖峰：异常收益后一天又出现反向的异常收益
+        spike = np.zeros(close.shape, dtype=bool)
+        spike[:-1] = outlier[:-1] & outlier[1:] & (np.sign(returns[:-1]) != np.sign(returns[1:]))
+        repaired = _repair(panel, masks['non_positive_price'][0] | spike, live)
+
+    issues = _issues_frame(found, panel.symbols, panel.index.tz)
+    return ValidationReport(issues, panel.symbols, len(panel.index), repaired)
+
+
+def validate_frames(frames, calendar=None, fields=DEFAULT_FIELDS, **options):
+    """
+    检查多只股票的DataFrame：先检查重复或乱序的时间戳（重复的保留最后一条），再构建面板做其余检查
+
+    参数:
+        frames (dict[str, pd.DataFrame]): {代码: 历史数据}
+        calendar (TradingCalendar | None): 交易日历
+        fields (tuple[str]): 需要检查的字段
+        **options: 传给 validate_panel 的参数
+
+    返回:
+        ValidationReport: 检查结果，修复后的数据为面板
+    """
+    found = []
+    clean = {}
+    for j, (symbol, data) in enumerate(frames.items()):
+        stamps = data.index.asi8
+        bad = np.flatnonzero(np.diff(stamps) <= 0) + 1
+        if len(bad):
+            found.append(('duplicate_timestamp', stamps[bad], np.full(len(bad), j), np.full(len(bad), np.nan)))
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+        clean[symbol] = data
+
+    report = validate_panel(Panel.from_frames(clean, fields), calendar, **options)
+    if found:
+        duplicates = _issues_frame(found, list(frames), next(iter(frames.values())).index.tz)
+        issues = pd.concat([duplicates, report.issues], ignore_index=True)
+        issues['check'] = issues['check'].astype(pd.CategoricalDtype(CHECKS))
+        issues['symbol'] = issues['symbol'].astype(pd.CategoricalDtype(list(frames)))
+        report.issues = issues
+    return report
+
+
+@traced
+def validate_frame(data, symbol='', calendar=None, **options):
+    """
+    检查一只股票的数据
+
+    参数:
+        data (pd.DataFrame): 历史数据
+        symbol (str): 股票代码
+        calendar (TradingCalendar | None): 交易日历
+        **options: 传给 validate_panel 的参数
+
+    返回:
+        ValidationReport: 检查结果，修复后的数据为只包含开高低收和成交量的DataFrame
+    """
+    fields = tuple(field for field in DEFAULT_FIELDS if field in data)
+    report = validate_frames({symbol: data}, calendar, fields, **options)
+    if report.repaired is not None:
+        repaired = report.repaired.symbol_frame(symbol)
+        if 'Volume' in repaired and not repaired['Volume'].isna().any():
+            repaired['Volume'] = repaired['Volume'].astype(data['Volume'].dtype)
+        report.repaired = repaired
+    return report
+
+
+def _to_calendar(panel, calendar):
+    # 把面板放到交易日历上：非交易日的K线丢弃并记录，缺失的交易日为NaN
+    sessions = calendar.session_index(panel.index)
+    on = sessions >= 0
+    if on.all() and (len(sessions) == 0 or sessions[-1] - sessions[0] == len(sessions) - 1):
+        # 已经是日历上连续的交易日（例如 TradingCalendar.align 的结果），不需要重新排列
+        empty = np.empty(0, dtype=np.int64)
+        return panel, (empty, empty, np.empty(0))
+    off_r, off_c = np.nonzero(~on[:, None] & ~np.isnan(panel['Close']))
+    off_calendar = (panel.index.asi8[off_r], off_c, panel['Close'][off_r, off_c])
+    if not on.any():
+        return Panel(panel.index[:0], panel.symbols, {k: v[:0] for k, v in panel.fields.items()}), off_calendar
+    first, last = sessions[on].min(), sessions[on].max()
+    index = calendar.sessions[first:last + 1]
+    if panel.index.tz is None:
+        index = index.tz_localize(None)
+    fields = {}
+    for name, values in panel.fields.items():
+        grid = np.full((last - first + 1, len(panel.symbols)), np.nan)
+        grid[sessions[on] - first] = values[on]
+        fields[name] = grid
+    return Panel(index, panel.symbols, fields), off_calendar
+
+
+def _robust_z(values):
+    # (x - 中位数) / (1.4826 × 中位数绝对偏差)，每只股票单独计算，不受异常值本身影响
+    median = _nanmedian(values)
+    mad = _nanmedian(np.abs(values - median)) * 1.4826
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values - median) / np.where(mad > 0, mad, np.nan)
+
+
+def _nanmedian(values):
+    # 按列排序后直接取中间位置（NaN 排在最后），比 np.nanmedian 对每列单独处理快
+    ordered = np.sort(values, axis=0)
+    count = np.sum(~np.isnan(values), axis=0)
+    cols = np.arange(values.shape[1])
+    lo, hi = np.maximum((count - 1) // 2, 0), np.maximum(count // 2, 0)
+    if not len(values):
+        return np.full(values.shape[1], np.nan)
+    return np.where(count > 0, (ordered[lo, cols] + ordered[hi, cols]) / 2, np.nan)
+
+
+def _run_length(equal):
+    # 每个位置向前连续为 True 的个数（沿时间轴）
+    rows = np.arange(1, len(equal) + 1)[:, None]
+    last_break = np.maximum.accumulate(np.where(equal, 0, rows), axis=0)
+    return rows - last_break
+
+
+def _repair(panel, drop, live):
+    fields = {name: values.copy() for name, values in panel.fields.items()}
+    price_fields = [name for name in ('Open', 'High', 'Low', 'Close') if name in fields]
+    for name in price_fields:
+        fields[name][drop] = np.nan
+    if 'High' in fields and 'Low' in fields:
+        stacked = np.stack([fields[name] for name in price_fields])
+        # 整列为NaN的位置 nanmax 会发出警告，结果（NaN）是正确的
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            fields['High'] = np.nanmax(stacked, axis=0)
+            fields['Low'] = np.nanmin(stacked, axis=0)
+
+    close = fields['Close']
+    fill = np.isnan(close) & live
+    filled = np.where(fill, ffill(close), close)
+    for name in price_fields:
+        fields[name] = np.where(fill, filled, fields[name])
+    if 'Volume' in fields:
+        fields['Volume'] = np.where(fill, 0.0, fields['Volume'])
+    return Panel(panel.index, panel.symbols, fields)
+
+
+def _issues_frame(found, symbols, tz):
+    # found 中每项为 (检查名称, int64 时间戳, 股票列号, 数值)
+    checks = np.concatenate([np.full(len(c), CHECKS.index(check)) for check, _, c, _ in found] + [[]])
+    stamps = np.concatenate([s for _, s, _, _ in found] + [[]]).astype(np.int64)
+    cols = np.concatenate([c for _, _, c, _ in found] + [[]]).astype(np.int64)
+    values = np.concatenate([np.asarray(v, dtype=float) for _, _, _, v in found] + [[]])
+    dates = pd.DatetimeIndex(stamps.view('datetime64[ns]'), name='Date')
+    if tz is not None:
+        dates = dates.tz_localize('UTC').tz_convert(tz)
+    return pd.DataFrame({
+        'check': pd.Categorical.from_codes(checks.astype(np.int64), CHECKS),
+        'symbol': pd.Categorical.from_codes(cols, pd.Index(symbols, dtype=object)),
+        'date': dates,
+        'value': values,
+    })